@@ -1,7 +1,77 @@
+import time
 from flask import Blueprint, request, jsonify
+from models import db, Resume, JobDescription, AnalysisResult
+from match_scoring import get_shared_scorer
+from embedding_store import ensure_embedding
+from job_parser import document_embedding_tag
+from log_config import get_logger
 
 analysis_blueprint = Blueprint('analysis', __name__)
+logger = get_logger("analysis_route")
+
+
+def _parsed_resume(resume):
+    # Uploads are normally parsed already, only parse here if that never happened
+    parsed = resume.get_parsed_data()
+    if not parsed and resume.file_path:
+        from resume_paser import get_shared_parser
+        parsed = get_shared_parser().parse_resume(resume.file_path, resume.user_id)
+        resume.set_parsed_data(parsed)
+    return parsed
+
+
+def _parsed_job(job):
+    parsed = job.get_parsed_data()
+    if not parsed and job.content:
+        from job_parser import get_shared_job_parser
+        parsed = get_shared_job_parser().parse(job.content)
+        job.set_parsed_data(parsed)
+    return parsed
+
 
 @analysis_blueprint.route('/api/analysis/compare', methods=['POST'])
 def analysis_compare():
-    return jsonify({"message": "Comparison completed successfully"})
\ No newline at end of file
+    data = request.get_json(silent=True) or {}
+    resume = db.session.get(Resume, data.get('resume_id')) if data.get('resume_id') is not None else None
+    job = db.session.get(JobDescription, data.get('job_id')) if data.get('job_id') is not None else None
+    if resume is None or job is None:
+        return jsonify({'message': 'resume_id and job_id must refer to an existing resume and job description'}), 404
+
+    try:
+        parsed_resume = _parsed_resume(resume)
+        parsed_job = _parsed_job(job)
+    except Exception as e:
+        return jsonify({'message': f'Parsing failed: {e}'}), 422
+    if not parsed_resume or not parsed_job:
+        return jsonify({'message': 'Resume or job description has no content to compare'}), 409
+
+    # Stored vectors. Parse workers and saveDes store them on save, they're only computed here for
+    # rows saved before embeddings were kept or when the model wasn't available at save time
+    tag = document_embedding_tag()
+    resume_vector = ensure_embedding(resume, parsed_resume.get('raw_text', ''), tag)
+    job_vector = ensure_embedding(job, job.content, tag)
+
+    # From here on it's set lookups and small matrix products on already parsed data
+    start = time.perf_counter()
+    scores = get_shared_scorer().score(parsed_resume, parsed_job, job.content, resume_vector, job_vector)
+    result = AnalysisResult(
+        user_id=data.get('user_id') or resume.user_id,
+        resume_id=resume.id,
+        job_id=job.id,
+        match_percentage=scores['match_percentage'],
+        keywords_match=scores['keywords_match'],
+        skills_allignment=scores['skills_allignment'],
+        format_compatibality=scores['format_compatibality'],
+    )
+    result.set_improvements(scores['improvements'])
+    db.session.add(result)
+    db.session.commit()
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+    logger.info("Resume compared", extra={"fields": {"resume_id": resume.id, "job_id": job.id, "total_ms": elapsed_ms}})
+
+    return jsonify({
+        'message': 'Comparison completed successfully',
+        'analysis_id': result.id,
+        'elapsed_ms': elapsed_ms,
+        **scores,
+    })
@@ -0,0 +1,142 @@
+#Fast inference benchmark and accuracy check.
+#Runs a fixture set of job descriptions through the fp32 BERT and through the int8 quantized one that
+#RESUMEAI_FAST_INFERENCE=1 turns on, and reports how much faster the quantized model embeds them and how far
+#the skill match scores move:
+#   score drift       largest and mean absolute difference of the cosine score against every skill prompt
+#   match agreement   overlap (Jaccard) of the skills scoring above SEMANTIC_MATCH_THRESHOLD, per posting
+#   top-5 agreement   share of every posting's 5 best skills that are the same in both
+#it exits with 1 when the drift or the agreement is worse than the tolerances, so it can gate turning
+#fast mode on for a deployment (and should be rerun after changing the model or the skill list).
+#
+#usage (from the backend folder):
+#   python bench_fast_inference.py
+#   python bench_fast_inference.py --fixtures postings.jsonl --threads 4 --runs 5
+#
+#a fixtures file has one JSON object with a "text" key per line, or one posting per line of plain text
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+FIXTURE_POSTINGS = [
+    "Senior backend engineer. 5+ years building services in Python and Go, PostgreSQL and Redis, "
+    "deploying with Docker and Kubernetes on AWS. You will mentor junior developers and lead design reviews.",
+    "Frontend developer to build our customer dashboard in React and TypeScript. Strong CSS and HTML, "
+    "experience with REST APIs and a good eye for design. Collaboration with product and UX is daily.",
+    "Data scientist: build machine learning models with scikit-learn and PyTorch, analyze large datasets "
+    "with pandas and SQL, present findings to stakeholders. Master's degree in statistics or related field.",
+    "DevOps engineer to own our CI/CD pipelines in Jenkins, infrastructure as code with Terraform and Ansible, "
+    "monitoring and on-call for services running on Azure and GCP.",
+    "Junior Java developer, 0-2 years. Spring and Hibernate, MySQL, unit testing. Great communication skills "
+    "and willingness to learn. Recent graduates welcome.",
+    "Mobile engineer for iOS and Android. Swift and Kotlin, experience publishing apps, integrating payment "
+    "SDKs and working with designers on accessibility.",
+    "Engineering manager to lead a team of eight. Project management, hiring, performance reviews and "
+    "roadmap planning with product. Background in distributed systems and Elasticsearch a plus.",
+    "Business analyst: gather requirements, build reports in Tableau and Power BI, write SQL against our "
+    "Oracle warehouse. Analytical thinking, problem solving and negotiation with stakeholders.",
+]
+
+
+def load_fixtures(path: str) -> List[str]:
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                texts.append(json.loads(line)["text"] if line.startswith("{") else line)
+    return texts
+
+
+def skill_scores(parser, texts: List[str]) -> np.ndarray:
+    #cosine score of every posting (rows) against every skill prompt (columns), what semantic matching uses
+    from job_parser import _normalize_rows
+    skill_matrix, _ = parser.get_skill_matrix()
+    return _normalize_rows(parser.embed_documents(texts)) @ skill_matrix.T
+
+
+def time_embedding(parser, texts: List[str], runs: int) -> float:
+    #best of runs, seconds for the whole fixture set
+    parser.embed_documents(texts[:1]) #first call pays for lazy initialization
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        parser.embed_documents(texts)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare(texts: List[str], runs: int = 3) -> Dict:
+    from job_parser import AdvancedJobDescriptionParser, SEMANTIC_MATCH_THRESHOLD
+    exact = AdvancedJobDescriptionParser(fast=False)
+    fast = AdvancedJobDescriptionParser(fast=True)
+
+    exact_scores = skill_scores(exact, texts)
+    fast_scores = skill_scores(fast, texts)
+    drift = np.abs(exact_scores - fast_scores)
+
+    match_agreement = []
+    top5_agreement = []
+    for exact_row, fast_row in zip(exact_scores, fast_scores):
+        exact_matches = set(np.flatnonzero(exact_row > SEMANTIC_MATCH_THRESHOLD))
+        fast_matches = set(np.flatnonzero(fast_row > SEMANTIC_MATCH_THRESHOLD))
+        union = exact_matches | fast_matches
+        match_agreement.append(len(exact_matches & fast_matches) / len(union) if union else 1.0)
+        top5_agreement.append(len(set(np.argsort(-exact_row)[:5]) & set(np.argsort(-fast_row)[:5])) / 5)
+
+    exact_seconds = time_embedding(exact, texts, runs)
+    fast_seconds = time_embedding(fast, texts, runs)
+    return {
+        "postings": len(texts),
+        "fp32_seconds": round(exact_seconds, 4),
+        "int8_seconds": round(fast_seconds, 4),
+        "speedup": round(exact_seconds / fast_seconds, 2) if fast_seconds else None,
+        "max_score_drift": round(float(drift.max()), 4),
+        "mean_score_drift": round(float(drift.mean()), 4),
+        "match_agreement": round(float(np.mean(match_agreement)), 4),
+        "top5_agreement": round(float(np.mean(top5_agreement)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the int8 fast inference mode against fp32 BERT")
+    parser.add_argument("--fixtures", default=None, help="postings to use instead of the built-in set")
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per model, the best one counts")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (default: RESUMEAI_TORCH_THREADS)")
+    parser.add_argument("--max-drift", type=float, default=0.05, help="largest allowed score difference")
+    parser.add_argument("--min-agreement", type=float, default=0.9, help="smallest allowed match agreement")
+    parser.add_argument("--json", action="store_true", help="print the raw numbers as JSON")
+    args = parser.parse_args()
+
+    os.environ["RESUMEAI_INFERENCE"] = "local" #both models have to run in this process
+    import model_registry
+    from log_config import configure_logging
+    configure_logging(quiet=True)
+    model_registry.configure_torch_threads(args.threads) #same thread count for both, or the timing is unfair
+
+    texts = load_fixtures(args.fixtures) if args.fixtures else FIXTURE_POSTINGS
+    result = compare(texts, args.runs)
+    passed = result["max_score_drift"] <= args.max_drift and result["match_agreement"] >= args.min_agreement
+    result["passed"] = passed
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"{result['postings']} postings, embedding time fp32 {result['fp32_seconds']:.3f}s, "
+              f"int8 {result['int8_seconds']:.3f}s ({result['speedup']}x faster)")
+        print(f"skill score drift: max {result['max_score_drift']:.4f} (allowed {args.max_drift}), "
+              f"mean {result['mean_score_drift']:.4f}")
+        print(f"matched skills agreement {result['match_agreement']:.1%} (required {args.min_agreement:.0%}), "
+              f"top-5 agreement {result['top5_agreement']:.1%}")
+        print("PASS" if passed else "FAIL: fast mode changes skill matching more than allowed")
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
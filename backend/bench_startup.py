@@ -0,0 +1,91 @@
+#Startup benchmark for the Flask app.
+#It runs `python -X importtime` in a fresh interpreter, builds the app with create_app(),
+#and reports how long the imports and the app factory took, the slowest imported modules,
+#and whether any of the heavy ML libraries were pulled in at startup (they shouldn't be).
+#
+#usage (from the backend folder):
+#   python bench_startup.py
+#   python bench_startup.py --runs 5 --top 15
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+HEAVY_MODULES = ["torch", "transformers", "sklearn", "nltk", "spacy", "pdfplumber", "fitz", "docx"]
+
+#this is what the child interpreter runs, it prints its measurements on the last line of stdout
+_CHILD_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app()
+created = time.perf_counter()
+heavy = [name for name in %r if name in sys.modules]
+print(json.dumps({"import_s": imported - start, "create_app_s": created - imported,
+                  "app_ok": app is not None, "heavy_loaded": heavy}))
+""" % (HEAVY_MODULES,)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    #turns the -X importtime output into (module, self_us, cumulative_us) rows
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line.split("|", 2)
+            self_us = int(self_us.replace("import time:", "").strip())
+            rows.append((name.strip(), self_us, int(cumulative_us.strip())))
+        except ValueError:
+            continue
+    return rows
+
+
+def run_once() -> Tuple[Dict, List[Tuple[str, int, int]]]:
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD_SCRIPT],
+        cwd=backend_dir, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{result.stderr[-2000:]}")
+    measurements = json.loads(result.stdout.strip().splitlines()[-1])
+    return measurements, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Flask app startup and import cost")
+    parser.add_argument("--runs", type=int, default=3, help="number of fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=10, help="how many of the slowest imports to show")
+    args = parser.parse_args()
+
+    totals = []
+    last_imports = []
+    last = {}
+    for _ in range(max(1, args.runs)):
+        last, last_imports = run_once()
+        totals.append(last["import_s"] + last["create_app_s"])
+
+    print(f"runs: {len(totals)}")
+    print(f"startup (import main + create_app): best {min(totals):.3f}s, worst {max(totals):.3f}s")
+    print(f"last run: import {last['import_s']:.3f}s, create_app {last['create_app_s']:.3f}s, app ok: {last['app_ok']}")
+
+    #only top-level packages, otherwise torch shows up a hundred times
+    top_level = [row for row in last_imports if "." not in row[0].strip()]
+    top_level.sort(key=lambda row: row[2], reverse=True)
+    print("\nslowest top-level imports (cumulative):")
+    for name, _, cumulative_us in top_level[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    if last["heavy_loaded"]:
+        print(f"\nWARNING heavy modules imported at startup: {', '.join(last['heavy_loaded'])}")
+        sys.exit(1)
+    print("\nno heavy ML/PDF modules imported at startup")
+
+
+if __name__ == "__main__":
+    main()
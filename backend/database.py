@@ -1,19 +1,50 @@
+from sqlalchemy import inspect, text
 from models import db
 
+# Columns added to a model after its table already existed, as (table, column, SQL type).
+# db.create_all() only creates missing tables and never alters an existing one, so without this step
+# every database created before the column was added fails each query with "no such column".
+# New nullable columns go at the end of this list; each one is added once and skipped after that.
+SCHEMA_UPGRADES = [
+    ("description", "parsed_data", "TEXT"),
+    ("resume", "embedding", "BLOB"),
+    ("resume", "embedding_model", "VARCHAR(200)"),
+    ("description", "embedding", "BLOB"),
+    ("description", "embedding_model", "VARCHAR(200)"),
+]
+
+def upgrade_schema():
+    # Idempotent: only adds the columns a table is still missing
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    existing = {}
+    with db.engine.begin() as connection:
+        for table, column, sql_type in SCHEMA_UPGRADES:
+            if table not in tables:
+                continue  # create_all just made it with every column
+            if table not in existing:
+                existing[table] = {info['name'] for info in inspector.get_columns(table)}
+            if column not in existing[table]:
+                connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {sql_type}'))
+                existing[table].add(column)
+                print(f"Added column {table}.{column}")
+
 def init_db(app):
-    
+
     # Configure database settings
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///resume_ai.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
+
     # Initialize the database with the app
     db.init_app(app)
-    
+
     # Create tables within app context
     with app.app_context():
         # Import all models to ensure they're registered with SQLAlchemy
         from models import User, Resume, JobDescription, AnalysisResult
         db.create_all()
+        # Bring tables created by older versions up to date with the models
+        upgrade_schema()
         print("Database tables created successfully!")
-    
+
     return db
\ No newline at end of file
@@ -0,0 +1,85 @@
+#Streaming DOCX text extraction.
+#A .docx file is a zip archive and the text lives in word/document.xml. Instead of building python-docx's
+#whole object model we stream that XML with iterparse and drop every element as soon as it has been read,
+#so memory stays flat no matter how big the document is, and python-docx doesn't have to be installed.
+#
+#Unlike doc.paragraphs this also picks up text in tables (one line per row, cells separated by tabs),
+#which a lot of resume templates use for skills and dates, and text in text boxes.
+
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterator, List
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+_PARAGRAPH = _W + "p"
+_TEXT = _W + "t"
+_TAB = _W + "tab"
+_BREAKS = (_W + "br", _W + "cr")
+_ROW = _W + "tr"
+_CELL = _W + "tc"
+_DOCUMENT_PART = "word/document.xml"
+
+
+def iter_docx_lines(docx_path: str) -> Iterator[str]:
+    """Yield the text of a .docx one paragraph (or table row) at a time, in document order"""
+    paragraphs: List[List[str]] = [] #text runs of each open paragraph, text box paragraphs nest inside
+    cells: List[List[str]] = [] #paragraphs of each open table cell
+    rows: List[List[str]] = [] #cell texts of each open table row
+    elements = [] #open elements, so finished ones can be removed from their parent
+    fallback_depth = 0 #text boxes are stored twice (modern + VML fallback), we skip the fallback copy
+
+    with zipfile.ZipFile(docx_path) as archive, archive.open(_DOCUMENT_PART) as xml_file:
+        for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                elements.append(elem)
+                if tag == _MC_FALLBACK:
+                    fallback_depth += 1
+                elif fallback_depth:
+                    pass
+                elif tag == _PARAGRAPH:
+                    paragraphs.append([])
+                elif tag == _CELL:
+                    cells.append([])
+                elif tag == _ROW:
+                    rows.append([])
+                continue
+
+            elements.pop()
+            line = None
+            if tag == _MC_FALLBACK:
+                fallback_depth -= 1
+            elif fallback_depth:
+                pass
+            elif tag == _TEXT and paragraphs:
+                paragraphs[-1].append(elem.text or "")
+            elif tag == _TAB and paragraphs:
+                paragraphs[-1].append("\t")
+            elif tag in _BREAKS and paragraphs:
+                paragraphs[-1].append("\n")
+            elif tag == _PARAGRAPH:
+                line = "".join(paragraphs.pop())
+            elif tag == _CELL:
+                text = " ".join(part for part in cells.pop() if part.strip())
+                if rows:
+                    rows[-1].append(text)
+            elif tag == _ROW:
+                line = "\t".join(rows.pop()).rstrip("\t")
+
+            if line is not None:
+                #a paragraph inside a table cell belongs to the cell, everything else is a line of its own
+                if cells:
+                    cells[-1].append(line)
+                else:
+                    yield line
+
+            #everything we need from this element has been read, drop it so the tree never grows
+            if elements:
+                elements[-1].remove(elem)
+
+
+def extract_docx_text(docx_path: str) -> str:
+    #one join at the end instead of growing a string paragraph by paragraph
+    return "".join(line + "\n" for line in iter_docx_lines(docx_path))
@@ -0,0 +1,352 @@
+#Interchangeable embedding backends for the job parser.
+#Full BERT is more than many high-volume, low-value comparisons need, so the parser's embedding step goes
+#through one of these instead of calling BERT directly:
+#   bert      bert-base-uncased CLS vectors, the default and what every stored vector so far was made with
+#   distil    distilbert-base-uncased CLS vectors: 6 layers instead of 12, about twice as fast, slightly less accurate
+#   hashing   hashed word and word-pair counts (the hashing trick), NumPy only: no torch, no model download,
+#             orders of magnitude faster. It is lexical, not semantic: "js" and "javascript" don't meet
+#all three hand out the same things (truncated embeddings, per-window chunk embeddings with character spans,
+#pooled document embeddings), so everything built on top works with any of them. Each backend has its own
+#tag, stored vectors made by one are never compared with another's.
+#
+#the deployment default is RESUMEAI_EMBEDDING_BACKEND (bert), a single call can pick another:
+#   parser.embed_documents(texts, backend="hashing")
+#   parser.parse(text, backend="distil")
+
+import abc
+import os
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import model_registry
+from inference_server import get_inference_client #optional shared BERT process with micro-batching
+from log_config import get_logger
+
+logger = get_logger("embedding_backends")
+
+BERT_MODEL_NAME = 'bert-base-uncased'
+DISTIL_MODEL_NAME = 'distilbert-base-uncased'
+#opt-in CPU fast mode: transformers with int8 dynamically quantized linear layers and pinned torch threads
+#(model_registry.get_bert). Vectors differ slightly from fp32 ones, so they are stored under their own tag.
+#python bench_fast_inference.py measures the speedup and checks skill match scores against fp32
+FAST_INFERENCE = os.environ.get("RESUMEAI_FAST_INFERENCE", "0") == "1"
+DEFAULT_BACKEND = os.environ.get("RESUMEAI_EMBEDDING_BACKEND", "bert")
+HASHING_FEATURES = 4096
+HASHING_VERSION = 1 #bump when the hashing tokenization or weighting changes
+
+#cosine score above which a skill prompt counts as matched. CLS vectors of any two texts are already very
+#similar, hashed counts of a document and a one-word skill are not
+SEMANTIC_MATCH_THRESHOLD = 0.7
+HASHING_MATCH_THRESHOLD = 0.05
+
+BERT_MAX_LENGTH = 512
+#long postings are cut into overlapping windows instead of being truncated at 512 tokens,
+#510 leaves room for the [CLS] and [SEP] tokens every window gets
+CHUNK_WINDOW_TOKENS = BERT_MAX_LENGTH - 2
+CHUNK_OVERLAP_TOKENS = 128
+CHUNK_POOLING_MODES = ("mean", "max")
+
+
+def pool_chunks(chunk_vectors: np.ndarray, pooling: str) -> np.ndarray:
+    #combines the window vectors of one document into a single vector, the same way embed_documents does
+    if pooling == "mean":
+        return chunk_vectors.mean(axis=0)
+    if pooling == "max":
+        return chunk_vectors.max(axis=0)
+    raise ValueError(f"Unsupported chunk pooling: {pooling} (expected one of {CHUNK_POOLING_MODES})")
+
+
+def _inference_mode():
+    #inference_mode skips autograd bookkeeping entirely, older torch builds only have no_grad
+    import torch
+    return getattr(torch, "inference_mode", torch.no_grad)()
+
+
+def forward_token_ids(bert_model, pad_id: int, id_lists: List[List[int]], batch_size: int = 32,
+                      max_tokens: Optional[int] = 8192) -> np.ndarray:
+    #runs already tokenized sequences (special tokens included) through the model and returns their CLS vectors.
+    #sequences are sorted by length first so each batch only pads up to its own longest member,
+    #and a batch is closed early once batch rows * longest length would go past max_tokens
+    hidden_size = bert_model.config.hidden_size
+    output = np.empty((len(id_lists), hidden_size), dtype=np.float32)
+    if not id_lists:
+        return output
+
+    order = sorted(range(len(id_lists)), key=lambda i: len(id_lists[i]))
+    batches = []
+    current = []
+    for i in order:
+        #lengths only grow inside a sorted run, so the newest item sets the padded width
+        if current and (len(current) >= batch_size or
+                        (max_tokens and (len(current) + 1) * len(id_lists[i]) > max_tokens)):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+
+    import torch #used to run the model
+    with _inference_mode():
+        for batch in batches:
+            width = max(len(id_lists[i]) for i in batch)
+            input_ids = torch.full((len(batch), width), pad_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), width), dtype=torch.long)
+            for row, i in enumerate(batch):
+                ids = id_lists[i]
+                input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+                attention_mask[row, :len(ids)] = 1
+            outputs = bert_model(input_ids=input_ids, attention_mask=attention_mask)
+            output[batch] = outputs.last_hidden_state[:, 0, :].float().cpu().numpy()
+    return output
+
+
+class EmbeddingBackend(abc.ABC):
+    """What the job parser needs from an embedding model
+
+    embed_chunks covers a whole text in overlapping windows and says which characters every window covers,
+    embed_documents pools those windows into one row per text, embed_many embeds short texts in one window.
+    A backend has to implement embed_many and embed_chunks, it can't be created without them.
+    """
+
+    name = ""
+    tag = "" #identifies the vectors, part of stored embedding tags and skill matrix cache keys
+    dim = 0
+    match_threshold = SEMANTIC_MATCH_THRESHOLD
+    cache_skill_matrix = True #worth keeping on disk, only when building it needs the model
+
+    def skill_prompt(self, skill: str) -> str:
+        return f"experience with {skill}"
+
+    @abc.abstractmethod
+    def embed_many(self, texts: List[str], batch_size: int = 32, max_tokens: Optional[int] = 8192) -> np.ndarray:
+        #one row per text, each text embedded as a single (truncated) window
+        ...
+
+    @abc.abstractmethod
+    def embed_chunks(self, text: str, window: int = CHUNK_WINDOW_TOKENS, overlap: int = CHUNK_OVERLAP_TOKENS,
+                     batch_size: int = 32) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+        #(one row per window, (start, end) character span of every window)
+        ...
+
+    def embed_documents(self, texts: List[str], pooling: str = "mean", window: int = CHUNK_WINDOW_TOKENS,
+                        overlap: int = CHUNK_OVERLAP_TOKENS, batch_size: int = 32) -> np.ndarray:
+        #every window of every text, pooled back into one row per text
+        output = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            output[row] = pool_chunks(self.embed_chunks(text, window, overlap, batch_size)[0], pooling)
+        return output
+
+
+class TransformerBackend(EmbeddingBackend):
+    """CLS vectors of a BERT-style model, run here or in the inference server when one is configured"""
+
+    def __init__(self, name: str, model_name: str, fast: bool = False):
+        self.name = name
+        self.model_name = model_name
+        self.fast = fast
+        self.tag = f"{model_name}-int8" if fast else model_name
+        #with an inference server configured (see inference_server.py) this process only needs the tokenizer
+        self._inference = get_inference_client(model_name, fast)
+        if self._inference is not None:
+            self.tokenizer, self.model = model_registry.get_tokenizer(model_name), None
+            self.dim = self._inference.hidden_size
+        else:
+            self.tokenizer, self.model = model_registry.get_bert(model_name, fast)
+            self.dim = self.model.config.hidden_size
+
+    def forward_token_ids(self, id_lists: List[List[int]], batch_size: int = 32,
+                          max_tokens: Optional[int] = 8192) -> np.ndarray:
+        #everything that needs the model goes through here, so the inference server can batch it with other callers'
+        inference = self._inference
+        if inference is not None:
+            if not id_lists:
+                return np.empty((0, self.dim), dtype=np.float32)
+            try:
+                return inference.forward(id_lists)
+            except ConnectionError as e:
+                #the server is gone and reconnecting failed, this backend runs BERT itself from now on
+                logger.warning("inference server unavailable, running BERT locally: %s", e)
+                self.model = model_registry.get_bert(self.model_name, self.fast)[1]
+                self._inference = None
+        return forward_token_ids(self.model, self.tokenizer.pad_token_id or 0, id_lists, batch_size, max_tokens)
+
+    def embed_many(self, texts: List[str], batch_size: int = 32, max_tokens: Optional[int] = 8192) -> np.ndarray:
+        #one CLS row per text in input order, each text is truncated at BERT_MAX_LENGTH
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        id_lists = self.tokenizer(list(texts), max_length=BERT_MAX_LENGTH, truncation=True)["input_ids"]
+        return self.forward_token_ids(id_lists, batch_size, max_tokens)
+
+    def chunk_token_windows(self, text: str, window: int = CHUNK_WINDOW_TOKENS,
+                            overlap: int = CHUNK_OVERLAP_TOKENS) -> Tuple[List[List[int]], List[Tuple[int, int]]]:
+        #splits the text into overlapping token windows, each wrapped in [CLS] ... [SEP],
+        #and remembers which characters of the original text every window covers
+        window = max(1, min(window, CHUNK_WINDOW_TOKENS))
+        step = max(1, window - overlap)
+        encoded = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        ids = encoded["input_ids"]
+        offsets = encoded["offset_mapping"]
+        cls_id = self.tokenizer.cls_token_id
+        sep_id = self.tokenizer.sep_token_id
+
+        if not ids:
+            return [[cls_id, sep_id]], [(0, 0)]
+
+        windows = []
+        spans = []
+        start = 0
+        while True:
+            end = min(start + window, len(ids))
+            windows.append([cls_id] + ids[start:end] + [sep_id])
+            spans.append((offsets[start][0], offsets[end - 1][1]))
+            if end >= len(ids):
+                break
+            start += step
+        return windows, spans
+
+    def embed_chunks(self, text: str, window: int = CHUNK_WINDOW_TOKENS, overlap: int = CHUNK_OVERLAP_TOKENS,
+                     batch_size: int = 32) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+        windows, spans = self.chunk_token_windows(text, window, overlap)
+        return self.forward_token_ids(windows, batch_size), spans
+
+    def embed_documents(self, texts: List[str], pooling: str = "mean", window: int = CHUNK_WINDOW_TOKENS,
+                        overlap: int = CHUNK_OVERLAP_TOKENS, batch_size: int = 32) -> np.ndarray:
+        #every window of every text goes through the model in one batched pass
+        all_windows = []
+        counts = []
+        for text in texts:
+            windows, _ = self.chunk_token_windows(text, window, overlap)
+            all_windows.extend(windows)
+            counts.append(len(windows))
+
+        chunk_vectors = self.forward_token_ids(all_windows, batch_size)
+        output = np.empty((len(texts), self.dim), dtype=np.float32)
+        start = 0
+        for row, count in enumerate(counts):
+            output[row] = pool_chunks(chunk_vectors[start:start + count], pooling)
+            start += count
+        return output
+
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+#the most frequent English function words, they would otherwise dominate the counts of short texts
+_HASHING_STOP_WORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my no nor not now of off on once only or
+other our ours out over own same she should so some such than that the their them then there these they
+this those through to too under until up very was we were what when where which while who whom why will
+with would you your yours our us within across per etc
+""".split())
+
+
+def _hashing_tag(n_features: int) -> str:
+    return f"hashing-{n_features}-v{HASHING_VERSION}"
+
+
+class HashingBackend(EmbeddingBackend):
+    """Signed hashed counts of words and word pairs, pure NumPy, needs no model
+
+    Every word and pair of neighbouring words is hashed (crc32) into one of n_features columns with a sign
+    from another hash bit, so collisions tend to cancel out instead of adding up. Counts are dampened with
+    1 + log(count). Nothing is fitted, so vectors of the same text never change.
+    """
+
+    name = "hashing"
+    match_threshold = HASHING_MATCH_THRESHOLD
+    cache_skill_matrix = False #building it takes a millisecond
+
+    def __init__(self, n_features: int = HASHING_FEATURES):
+        self.dim = n_features
+        self.tag = _hashing_tag(n_features)
+        self._hash_cache: Dict[str, Tuple[int, float]] = {}
+
+    def skill_prompt(self, skill: str) -> str:
+        return skill #"experience with" would be shared by every prompt and match every posting
+
+    def _tokens(self, text: str) -> Tuple[List[str], List[Tuple[int, int]]]:
+        words = []
+        spans = []
+        for match in _WORD.finditer(text.lower()):
+            if match.group() not in _HASHING_STOP_WORDS:
+                words.append(match.group())
+                spans.append(match.span())
+        return words, spans
+
+    def _hash(self, term: str) -> Tuple[int, float]:
+        cached = self._hash_cache.get(term)
+        if cached is None:
+            value = zlib.crc32(term.encode("utf-8"))
+            cached = (value % self.dim, 1.0 if value & 0x80000000 else -1.0)
+            if len(self._hash_cache) < 500_000: #vocabulary of real postings stays far below this
+                self._hash_cache[term] = cached
+        return cached
+
+    def _vectorize(self, word_lists: List[List[str]]) -> np.ndarray:
+        output = np.zeros((len(word_lists), self.dim), dtype=np.float32)
+        for row, words in enumerate(word_lists):
+            terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            if not terms:
+                continue
+            hashed = [self._hash(term) for term in terms]
+            columns = np.fromiter((column for column, _ in hashed), dtype=np.int64, count=len(hashed))
+            signs = np.fromiter((sign for _, sign in hashed), dtype=np.float32, count=len(hashed))
+            counts = np.zeros(self.dim, dtype=np.float32)
+            np.add.at(counts, columns, signs)
+            output[row] = np.sign(counts) * np.log1p(np.abs(counts))
+        return output
+
+    def embed_many(self, texts: List[str], batch_size: int = 32, max_tokens: Optional[int] = 8192) -> np.ndarray:
+        #no length limit here, the whole text is counted
+        return self._vectorize([self._tokens(text)[0] for text in texts])
+
+    def embed_chunks(self, text: str, window: int = CHUNK_WINDOW_TOKENS, overlap: int = CHUNK_OVERLAP_TOKENS,
+                     batch_size: int = 32) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+        #the same overlapping windows as the transformers, counted in words instead of word pieces
+        words, word_spans = self._tokens(text)
+        if not words:
+            return np.zeros((1, self.dim), dtype=np.float32), [(0, 0)]
+        step = max(1, window - overlap)
+        windows = []
+        spans = []
+        start = 0
+        while True:
+            end = min(start + window, len(words))
+            windows.append(words[start:end])
+            spans.append((word_spans[start][0], word_spans[end - 1][1]))
+            if end >= len(words):
+                break
+            start += step
+        return self._vectorize(windows), spans
+
+
+_TRANSFORMER_MODELS = {"bert": BERT_MODEL_NAME, "distil": DISTIL_MODEL_NAME}
+BACKENDS = tuple(_TRANSFORMER_MODELS) + ("hashing",)
+
+
+def backend_tag(name: Optional[str] = None, fast: Optional[bool] = None) -> str:
+    #the tag get_backend(name, fast) would have, without loading anything
+    name = name or DEFAULT_BACKEND
+    fast = FAST_INFERENCE if fast is None else fast
+    if name == "hashing":
+        return _hashing_tag(HASHING_FEATURES)
+    if name not in _TRANSFORMER_MODELS:
+        raise ValueError(f"Unknown embedding backend: {name} (expected one of {sorted(BACKENDS)})")
+    model_name = _TRANSFORMER_MODELS[name]
+    return f"{model_name}-int8" if fast else model_name
+
+
+def get_backend(name: Optional[str] = None, fast: Optional[bool] = None) -> EmbeddingBackend:
+    #the process-wide backend for name (default RESUMEAI_EMBEDDING_BACKEND), loaded the first time it's asked for.
+    #fast only applies to the transformers
+    name = name or DEFAULT_BACKEND
+    fast = FAST_INFERENCE if fast is None else fast
+    if name == "hashing":
+        return model_registry.get_or_load(("embedding_backend", name), HashingBackend)
+    if name not in _TRANSFORMER_MODELS:
+        raise ValueError(f"Unknown embedding backend: {name} (expected one of {sorted(BACKENDS)})")
+    return model_registry.get_or_load(("embedding_backend", name, fast),
+                                      lambda: TransformerBackend(name, _TRANSFORMER_MODELS[name], fast))
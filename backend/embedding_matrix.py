@@ -0,0 +1,258 @@
+#Append-only, memory-mapped embedding matrix.
+#Re-ranking against every job needs all job vectors in one contiguous array. Building that from the
+#per-row blobs copies everything, and every worker process would hold its own copy. This file keeps the
+#vectors on disk as one (count, dim) array that every worker maps read-only, so N workers share a single
+#copy in the page cache and scoring the whole corpus is one np.dot over the mapped view.
+#
+#layout of <name>:        256 byte header (magic, dim, dtype, count, model tag) then count rows of dim values
+#layout of <name>.ids:    count int64 ids, row i of the matrix belongs to id i
+#
+#rows are only ever appended. Re-adding an id appends a new row and the id points at the newest one, the
+#old row stays in the file (masked out of results) until compact() rewrites the file. Appends from several
+#processes are serialized with a file lock, and the count in the header is written last, so a reader never
+#sees a row that is only half written. The lock is on <name>.lock, which is never replaced, and create() and
+#compact() hold it while they swap the new file in, so an append never writes into a file that was just
+#swapped out.
+
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from log_config import get_logger
+
+try:
+    import fcntl #not on Windows, appends there are only safe from one process
+except ImportError:
+    fcntl = None
+
+logger = get_logger("embedding_matrix")
+
+MAGIC = b"RAIEMB01"
+HEADER_SIZE = 256
+_HEADER = struct.Struct("<8sIHHQ") #magic, dim, itemsize, reserved, count
+_COUNT_OFFSET = 16 #byte offset of count inside the header
+_TAG_SIZE = HEADER_SIZE - _HEADER.size
+_DTYPES = {2: np.dtype(np.float16), 4: np.dtype(np.float32)}
+
+
+def _pack_header(dim: int, dtype: np.dtype, count: int, model_tag: str) -> bytes:
+    tag = model_tag.encode("utf-8")
+    if len(tag) > _TAG_SIZE:
+        raise ValueError(f"model tag longer than {_TAG_SIZE} bytes: {model_tag}")
+    return _HEADER.pack(MAGIC, dim, dtype.itemsize, 0, count) + tag.ljust(_TAG_SIZE, b"\0")
+
+
+@contextmanager
+def _file_lock(path: str):
+    #exclusive lock shared by every process that appends to or rebuilds the matrix at path
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield #closing the file releases the lock
+
+
+def _check_rows(dim: int, dtype: str, ids: Optional[Sequence[int]],
+                vectors: Optional[np.ndarray]) -> Tuple[np.dtype, np.ndarray, np.ndarray]:
+    dtype = np.dtype(dtype)
+    if dtype.itemsize not in _DTYPES:
+        raise ValueError(f"Unsupported dtype: {dtype} (expected float16 or float32)")
+    ids = np.asarray(ids if ids is not None else [], dtype=np.int64)
+    vectors = np.asarray(vectors if vectors is not None else np.empty((0, dim)), dtype=dtype).reshape(-1, dim)
+    if len(ids) != len(vectors):
+        raise ValueError("ids and vectors must have the same length")
+    return dtype, ids, vectors
+
+
+class EmbeddingMatrixFile:
+    """One embedding matrix on disk, mapped read-only; mode "a" also allows appending rows"""
+
+    def __init__(self, path: str, mode: str = "r"):
+        if mode not in ("r", "a"):
+            raise ValueError(f"mode must be 'r' or 'a', got {mode}")
+        self.path = path
+        self.ids_path = path + ".ids"
+        self.mode = mode
+        self._lock = threading.RLock()
+        self._inode = None
+        self._open()
+
+    @classmethod
+    def create(cls, path: str, dim: int, model_tag: str, dtype: str = "float32",
+               ids: Optional[Sequence[int]] = None, vectors: Optional[np.ndarray] = None,
+               mode: str = "a") -> "EmbeddingMatrixFile":
+        #writes a new file (optionally with initial rows) next to the old one and swaps it in atomically,
+        #readers that still have the old file mapped keep working and pick up the new one on refresh().
+        #whatever the old file held is gone, see open_or_create for adding to a file other processes share
+        dtype, ids, vectors = _check_rows(dim, dtype, ids, vectors)
+        with _file_lock(path):
+            cls._write(path, dim, model_tag, dtype, ids, vectors)
+        return cls(path, mode)
+
+    @classmethod
+    def open_or_create(cls, path: str, dim: int, model_tag: str, dtype: str = "float32",
+                       ids: Optional[Sequence[int]] = None, vectors: Optional[np.ndarray] = None) -> "EmbeddingMatrixFile":
+        #the file at path opened for appending, with the rows among ids it doesn't have yet appended. Only when
+        #there is no file (or it holds another model's vectors) is a new one created, so rows other processes
+        #appended are never thrown away. The check and the write happen under the file lock
+        dtype, ids, vectors = _check_rows(dim, dtype, ids, vectors)
+        with _file_lock(path):
+            existing = None
+            if os.path.exists(path):
+                try:
+                    existing = cls(path, "a")
+                except (OSError, ValueError) as e:
+                    logger.warning("could not open embedding file %s, replacing it: %s", path, e)
+            if existing is not None and (existing.model_tag, existing.dim) == (model_tag, dim):
+                missing = np.array([item_id not in existing for item_id in ids.tolist()], dtype=bool)
+                if missing.any():
+                    existing._append_locked(ids[missing], vectors[missing])
+                return existing
+            cls._write(path, dim, model_tag, dtype, ids, vectors)
+        return cls(path, "a")
+
+    @staticmethod
+    def _write(path: str, dim: int, model_tag: str, dtype: np.dtype, ids: np.ndarray, vectors: np.ndarray):
+        #the caller holds the file lock
+        tmp_path, tmp_ids_path = path + ".tmp", path + ".ids.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_pack_header(dim, dtype, len(ids), model_tag))
+            f.write(np.ascontiguousarray(vectors).tobytes())
+        with open(tmp_ids_path, "wb") as f:
+            f.write(ids.tobytes())
+        #ids first: a reader that sees the new matrix always finds at least as many ids
+        os.replace(tmp_ids_path, path + ".ids")
+        os.replace(tmp_path, path)
+
+    def _read_header(self) -> Tuple[int, np.dtype, int, str]:
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        magic, dim, itemsize, _, count = _HEADER.unpack_from(header)
+        if magic != MAGIC or itemsize not in _DTYPES:
+            raise ValueError(f"{self.path} is not an embedding matrix file")
+        return dim, _DTYPES[itemsize], count, header[_HEADER.size:].rstrip(b"\0").decode("utf-8")
+
+    def _open(self):
+        self.dim, self.dtype, _, self.model_tag = self._read_header()
+        self._inode = os.stat(self.path).st_ino
+        self.count = 0
+        self._view = np.empty((0, self.dim), dtype=self.dtype)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._rows: Dict[int, int] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self.refresh()
+
+    def refresh(self):
+        #picks up rows appended by other processes (cheap when nothing changed: one header read)
+        with self._lock:
+            if os.stat(self.path).st_ino != self._inode:
+                self._open() #the file was rebuilt or compacted
+                return
+            count = self._read_header()[2]
+            if count == self.count:
+                return
+            self._view = np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=(count, self.dim))
+            new_ids = np.fromfile(self.ids_path, dtype=np.int64, count=count - self.count, offset=self.count * 8)
+            live = np.zeros(count, dtype=bool)
+            live[:self.count] = self._live
+            for row, item_id in enumerate(new_ids.tolist(), start=self.count):
+                old = self._rows.get(item_id)
+                if old is not None:
+                    live[old] = False
+                self._rows[item_id] = row
+                live[row] = True
+            self._ids = np.concatenate([self._ids, new_ids])
+            self._live = live
+            self.count = count
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._rows
+
+    @property
+    def matrix(self) -> np.ndarray:
+        #the mapped (count, dim) array, read-only. Includes superseded rows, see live_mask
+        return self._view
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids
+
+    @property
+    def live_mask(self) -> np.ndarray:
+        return self._live
+
+    def get(self, item_id: int) -> Optional[np.ndarray]:
+        row = self._rows.get(item_id)
+        return None if row is None else np.asarray(self._view[row], dtype=np.float32)
+
+    def append(self, ids: Sequence[int], vectors: np.ndarray):
+        if self.mode != "a":
+            raise PermissionError(f"{self.path} was opened read-only")
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        with self._lock, _file_lock(self.path): #same order as compact()
+            self._append_locked(ids, vectors)
+
+    def _append_locked(self, ids: np.ndarray, vectors: np.ndarray):
+        #the caller holds the file lock
+        with self._lock:
+            #another process may have rebuilt or compacted the file since we mapped it, reopen before writing
+            dim, dtype = self.dim, self.dtype
+            self.refresh()
+            if (self.dim, self.dtype) != (dim, dtype):
+                raise ValueError(f"{self.path} was rebuilt with {self.dim} {self.dtype} dims, expected {dim} {dtype}")
+            vectors = np.ascontiguousarray(np.asarray(vectors, dtype=self.dtype).reshape(-1, self.dim))
+            if len(ids) != len(vectors):
+                raise ValueError("ids and vectors must have the same length")
+            row_bytes = self.dim * self.dtype.itemsize
+            with open(self.path, "r+b") as data, open(self.ids_path, "r+b") as id_file:
+                #another process may have appended since we last looked, the header has the real count
+                data.seek(_COUNT_OFFSET)
+                count = struct.unpack("<Q", data.read(8))[0]
+                data.seek(HEADER_SIZE + count * row_bytes)
+                data.write(vectors.tobytes())
+                id_file.seek(count * 8)
+                id_file.write(ids.tobytes())
+                id_file.flush()
+                data.flush()
+                os.fsync(data.fileno())
+                data.seek(_COUNT_OFFSET)
+                data.write(struct.pack("<Q", count + len(ids))) #publish the new rows last
+                data.flush()
+            self.refresh()
+
+    def similarity(self, queries: np.ndarray) -> np.ndarray:
+        #dot products of every row with the query (dim,) or queries (n, dim), straight off the mapped view
+        queries = np.asarray(queries, dtype=self.dtype)
+        return np.asarray(np.dot(self._view, queries.T))
+
+    def top_k(self, query: np.ndarray, k: int = 10) -> List[Tuple[int, float]]:
+        scores = np.asarray(self.similarity(query), dtype=np.float32)
+        scores[~self._live] = -np.inf #rows that were replaced by a newer one
+        k = min(k, len(self._rows))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(self._ids[row]), float(scores[row])) for row in best]
+
+    def compact(self) -> "EmbeddingMatrixFile":
+        #rewrites the file with only the newest row of every id. Holds the file lock from reading the rows to
+        #the swap, so rows another process appends meanwhile aren't lost
+        with self._lock:
+            with _file_lock(self.path):
+                self.refresh()
+                rows = np.flatnonzero(self._live)
+                self._write(self.path, self.dim, self.model_tag, self.dtype, self._ids[rows],
+                            np.ascontiguousarray(self._view[rows]))
+            rebuilt = EmbeddingMatrixFile(self.path, self.mode)
+            logger.info("Embedding matrix compacted", extra={"fields": {"path": self.path, "rows": len(rows)}})
+            return rebuilt
@@ -0,0 +1,137 @@
+#Persisted document embeddings for JobDescription and Resume rows.
+#A document's BERT vector is computed once when it is saved and stored on its row as a small blob,
+#tagged with the model that produced it. Comparisons and recommendations read those blobs back in bulk
+#and never have to load BERT. Editing the content clears the vector (see the listeners in models.py),
+#and vectors with a different tag are treated as missing, so switching models re-embeds lazily.
+#
+#blobs are a 2 byte dtype code followed by the raw vector. float16 by default (768 dims -> 1.5KB),
+#RESUMEAI_EMBEDDING_DTYPE=float32 keeps full precision.
+
+import os
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from log_config import get_logger
+
+try:
+    import fcntl #not on Windows, there every worker may backfill at the same time
+except ImportError:
+    fcntl = None
+
+logger = get_logger("embedding_store")
+
+EMBEDDING_DTYPE = os.environ.get("RESUMEAI_EMBEDDING_DTYPE", "float16")
+_DTYPE_CODES = {"float16": b"f2", "float32": b"f4"}
+_CODE_DTYPES = {code: np.dtype(name) for name, code in _DTYPE_CODES.items()}
+_SQLITE_MAX_PARAMS = 900 #stay under sqlite's bound parameter limit when loading by id
+
+
+def encode_vector(vector: np.ndarray, dtype: Optional[str] = None) -> bytes:
+    dtype = dtype or EMBEDDING_DTYPE
+    if dtype not in _DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype} (expected float16 or float32)")
+    return _DTYPE_CODES[dtype] + np.asarray(vector, dtype=dtype).ravel().tobytes()
+
+
+def decode_vector(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=_CODE_DTYPES[bytes(blob[:2])], offset=2).astype(np.float32)
+
+
+def embed_with_shared_parser(texts: List[str]) -> np.ndarray:
+    #document vectors from the shared job parser, BERT is only loaded when something has to be embedded
+    from job_parser import get_shared_job_parser
+    return get_shared_job_parser().embed_documents(texts)
+
+
+def ensure_embedding(row, text: str, model_tag: str,
+                     embed: Callable[[List[str]], np.ndarray] = embed_with_shared_parser) -> Optional[np.ndarray]:
+    #the row's stored vector, computed and stored first if it's missing or stale. The caller commits.
+    #None when there's no text or the model isn't available
+    vector = row.get_embedding(model_tag)
+    if vector is None and text:
+        try:
+            vector = np.asarray(embed([text]), dtype=np.float32)[0]
+            row.set_embedding(vector, model_tag)
+        except Exception as e:
+            logger.warning("could not embed %s %s: %s", type(row).__name__, row.id, e)
+            return None
+    return vector
+
+
+def embed_missing(rows: Sequence, text_of: Callable, model_tag: str,
+                  embed: Callable[[List[str]], np.ndarray] = embed_with_shared_parser, batch_size: int = 32) -> int:
+    #computes and stores a vector for every row that has none for model_tag, in batches. The caller commits
+    missing = [row for row in rows if row.get_embedding(model_tag) is None and text_of(row)]
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        vectors = embed([text_of(row) for row in batch])
+        for row, vector in zip(batch, vectors):
+            row.set_embedding(vector, model_tag)
+    if missing:
+        logger.info("Embedded documents", extra={"fields": {"rows": len(missing), "model": model_tag}})
+    return len(missing)
+
+
+def backfill_embeddings(session, stale_query, text_of: Callable, model_tag: str, lock_path: Optional[str] = None,
+                        embed: Callable[[List[str]], np.ndarray] = embed_with_shared_parser, batch_size: int = 100) -> int:
+    #embeds every row stale_query() returns (rows without a vector for model_tag), committing after each
+    #batch, so rows saved before embeddings were kept or a model switch are caught up off the request path.
+    #with lock_path only one process runs it at a time, the others return 0 right away
+    lock_file = None
+    if lock_path is not None and fcntl is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+        lock_file = open(lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return 0 #another worker is already on it
+    total = 0
+    try:
+        while True:
+            batch = stale_query().limit(batch_size).all()
+            embedded = embed_missing(batch, text_of, model_tag, embed=embed)
+            if not embedded:
+                break
+            session.commit()
+            total += embedded
+    finally:
+        if lock_file is not None:
+            lock_file.close() #closing releases the lock
+    return total
+
+
+def load_ids(session, model_cls, model_tag: str) -> List[int]:
+    #ids of every row with a stored vector for model_tag, without reading the vectors
+    query = session.query(model_cls.id).filter(model_cls.embedding_model == model_tag, model_cls.embedding.isnot(None))
+    return [row_id for row_id, in query]
+
+
+def load_matrix(session, model_cls, model_tag: str,
+                ids: Optional[Iterable[int]] = None) -> Tuple[List[int], np.ndarray]:
+    #(ids, float32 matrix with one row per id) of every stored vector for model_tag, or only the given ids.
+    #reads just the id and blob columns, nothing else of the rows is loaded
+    columns = (model_cls.id, model_cls.embedding)
+    base = session.query(*columns).filter(model_cls.embedding_model == model_tag, model_cls.embedding.isnot(None))
+    if ids is None:
+        results = base.yield_per(1000)
+    else:
+        ids = list(ids)
+        results = []
+        for start in range(0, len(ids), _SQLITE_MAX_PARAMS):
+            results.extend(base.filter(model_cls.id.in_(ids[start:start + _SQLITE_MAX_PARAMS])).all())
+
+    found_ids: List[int] = []
+    blobs: List[bytes] = []
+    for row_id, blob in results:
+        found_ids.append(row_id)
+        blobs.append(blob)
+    if not blobs:
+        return [], np.empty((0, 0), dtype=np.float32)
+    dtype = _CODE_DTYPES[bytes(blobs[0][:2])]
+    if all(bytes(blob[:2]) == bytes(blobs[0][:2]) for blob in blobs):
+        #one buffer for the whole batch, decoded with a single conversion
+        matrix = np.frombuffer(b"".join(bytes(blob[2:]) for blob in blobs), dtype=dtype).reshape(len(blobs), -1)
+        return found_ids, matrix.astype(np.float32)
+    return found_ids, np.stack([decode_vector(blob) for blob in blobs])
@@ -0,0 +1,357 @@
+#Shared BERT inference with micro-batching.
+#When several Flask threads parse job descriptions at once, each runs its own small BERT forward pass and
+#they all fight over the same CPU threads. With an inference server there is one process holding BERT. It
+#collects the token sequences callers send for up to max_wait_ms (or until max_batch_size sequences are
+#waiting), runs them as padded batches and sends every caller back its own rows.
+#
+#the job parser only tokenizes, everything that needs BERT goes through TransformerBackend.forward_token_ids
+#(embedding_backends.py), which sends the token ids here when a server is configured:
+#   RESUMEAI_INFERENCE=local             BERT runs in the calling process (default)
+#   RESUMEAI_INFERENCE=server            the first parser starts a private server process and talks to it
+#   RESUMEAI_INFERENCE=host:port         connect to a standalone server, shared by every worker process:
+#                                        python inference_server.py --address 127.0.0.1:6010
+#   RESUMEAI_INFERENCE=/path/to/socket   same over a unix socket
+#   RESUMEAI_INFERENCE_MAX_BATCH         sequences per forward pass (default 32)
+#   RESUMEAI_INFERENCE_MAX_WAIT_MS       how long the first request of a batch waits for company (default 5)
+#   RESUMEAI_INFERENCE_AUTHKEY           shared secret between a standalone server and its clients, required by both:
+#                                        requests are pickled, so anyone who can connect could run code in the
+#                                        server. python -c "import secrets; print(secrets.token_hex(32))"
+#                                        makes one. The private server is connected to its parent over an
+#                                        anonymous pipe, it never listens and needs no key
+#   RESUMEAI_FAST_INFERENCE=1            the server runs the int8 model (clients only connect to a matching server)
+#
+#a client whose server goes away (restarted, or the private server died) reconnects once on its next request,
+#if that fails the caller gets a ConnectionError and TransformerBackend runs BERT locally from then on.
+
+import argparse
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import get_context
+from multiprocessing.connection import AuthenticationError, Client, Connection, Listener
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from log_config import get_logger
+
+logger = get_logger("inference_server")
+
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get("RESUMEAI_INFERENCE_MAX_BATCH", "32"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("RESUMEAI_INFERENCE_MAX_WAIT_MS", "5"))
+
+
+def shared_authkey() -> bytes:
+    #the standalone server's key, there is deliberately no default: a guessable key on a pickle protocol
+    #is remote code execution for anyone who can reach the port
+    key = os.environ.get("RESUMEAI_INFERENCE_AUTHKEY", "")
+    if not key:
+        raise ValueError("RESUMEAI_INFERENCE_AUTHKEY must be set to serve or connect to a standalone inference server")
+    return key.encode("utf-8")
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    #"host:port" becomes a TCP address, anything else is a unix socket path (or a Windows pipe name)
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+class MicroBatcher:
+    """Groups requests from many connections into batches for one forward function
+
+    forward takes a list of token id lists and returns one row per list. Requests are answered in arrival
+    order; a single request with more than max_batch_size sequences is run on its own.
+    """
+
+    def __init__(self, forward: Callable[[List[List[int]]], np.ndarray],
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.forward = forward
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._requests: "queue.Queue" = queue.Queue()
+        self.stats = {"requests": 0, "sequences": 0, "batches": 0}
+
+    def submit(self, reply: Callable[[object], None], id_lists: List[List[int]]):
+        #reply(rows) or reply(error message) is called from the batching thread once the batch has run
+        self._requests.put((reply, id_lists))
+
+    def _next_batch(self) -> List[Tuple[Callable, List[List[int]]]]:
+        batch = [self._requests.get()]
+        size = len(batch[0][1])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[1])
+        return batch
+
+    def run_forever(self):
+        while True:
+            self.run_once()
+
+    def run_once(self):
+        batch = self._next_batch()
+        id_lists = [ids for _, request_ids in batch for ids in request_ids]
+        try:
+            rows = self.forward(id_lists)
+        except Exception as e:
+            logger.warning("inference batch failed: %s", e)
+            for reply, _ in batch:
+                reply(f"{type(e).__name__}: {e}")
+            return
+        self.stats["requests"] += len(batch)
+        self.stats["sequences"] += len(id_lists)
+        self.stats["batches"] += 1
+        start = 0
+        for reply, request_ids in batch:
+            reply(rows[start:start + len(request_ids)])
+            start += len(request_ids)
+
+
+def _serve_connection(conn: Connection, batcher: MicroBatcher, hello: Dict):
+    #one client connection: requests go to the batcher, replies come back on the batching thread
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            try:
+                conn.send(message)
+            except (OSError, EOFError, ValueError):
+                pass #the client went away, nobody is waiting for this reply anymore
+
+    send(("hello", hello))
+    while True:
+        try:
+            request_id, id_lists = conn.recv()
+        except (EOFError, OSError):
+            conn.close()
+            return
+        batcher.submit(lambda rows, request_id=request_id: send((request_id, rows)), id_lists)
+
+
+def _load_forward(model_name: str, batch_size: int,
+                  quantized: bool) -> Tuple[Callable[[List[List[int]]], np.ndarray], Dict]:
+    import model_registry
+    from embedding_backends import forward_token_ids
+    tokenizer, model = model_registry.get_bert(model_name, quantized)
+    pad_id = tokenizer.pad_token_id or 0
+    hello = {"model": model_name, "quantized": quantized, "hidden_size": model.config.hidden_size}
+    return lambda id_lists: forward_token_ids(model, pad_id, id_lists, batch_size=batch_size), hello
+
+
+def _serve_parent(conn: Connection, batcher: MicroBatcher, hello: Dict):
+    #a private server only has its parent as a client, it exits when the parent does
+    _serve_connection(conn, batcher, hello)
+    os._exit(0)
+
+
+def serve(model_name: str, address: Optional[str] = None, conn: Optional[Connection] = None,
+          max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+          quantized: bool = False):
+    #runs the server until the process is killed: over one pipe (private server) or accepting any number
+    #of clients on address (standalone server)
+    from log_config import configure_logging
+    configure_logging()
+    authkey = shared_authkey() if conn is None else None #checked before spending seconds on loading BERT
+    forward, hello = _load_forward(model_name, max_batch_size, quantized)
+    batcher = MicroBatcher(forward, max_batch_size, max_wait_ms)
+    if conn is not None:
+        threading.Thread(target=_serve_parent, args=(conn, batcher, hello), daemon=True).start()
+    else:
+        listener = Listener(parse_address(address), authkey=authkey)
+
+        def accept():
+            while True:
+                try:
+                    client = listener.accept()
+                except (OSError, EOFError, AuthenticationError) as e:
+                    logger.warning("rejected inference client: %s", e)
+                    continue
+                threading.Thread(target=_serve_connection, args=(client, batcher, hello), daemon=True).start()
+
+        threading.Thread(target=accept, daemon=True).start()
+        logger.info("Inference server listening", extra={"fields": {"address": address, "model": model_name}})
+    batcher.run_forever()
+
+
+class InferenceClient:
+    """Thread-safe handle on an inference server, every thread can call forward() at the same time
+
+    connect opens a new connection and returns (conn, process), process being the private server or None.
+    It's called again to reconnect when the connection is lost.
+    """
+
+    def __init__(self, connect: Callable[[], Tuple[Connection, object]]):
+        self._connect = connect
+        self._connect_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self.model_name = None
+        self._open()
+
+    def _open(self):
+        conn, process = self._connect()
+        try:
+            _, hello = conn.recv()
+        except BaseException:
+            conn.close()
+            raise
+        if self.model_name is not None and (hello["model"], hello.get("quantized", False)) != (self.model_name, self.quantized):
+            conn.close()
+            raise ConnectionError(f"inference server now runs {hello['model']}, not {self.model_name}")
+        self.model_name = hello["model"]
+        self.quantized = hello.get("quantized", False)
+        self.hidden_size = hello["hidden_size"]
+        pending: Dict[int, Future] = {} #requests sent on this connection that haven't been answered yet
+        with self._pending_lock:
+            self._conn, self._process, self._pending, self._closed = conn, process, pending, None
+        threading.Thread(target=self._receive, args=(conn, pending), name="inference-client", daemon=True).start()
+
+    def _receive(self, conn: Connection, pending: Dict[int, Future]):
+        while True:
+            try:
+                request_id, payload = conn.recv()
+            except (EOFError, OSError) as e:
+                self._fail_pending(conn, pending, ConnectionError(f"inference server connection lost: {e}"))
+                return
+            with self._pending_lock:
+                future = pending.pop(request_id, None)
+            if future is None:
+                continue
+            if isinstance(payload, str):
+                future.set_exception(RuntimeError(payload))
+            else:
+                future.set_result(payload)
+
+    def _fail_pending(self, conn: Connection, pending: Dict[int, Future], error: Exception):
+        with self._pending_lock:
+            if self._conn is conn: #not an old connection we already replaced
+                self._closed = error
+            futures = list(pending.values())
+            pending.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    def _reconnect(self):
+        with self._connect_lock:
+            if self._closed is None:
+                return #another thread reconnected while we waited
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            try:
+                self._open()
+            except (OSError, EOFError) as e:
+                raise ConnectionError(f"could not reconnect to the inference server: {e}") from e
+            logger.info("reconnected to the inference server")
+
+    def forward(self, id_lists: List[List[int]], timeout: Optional[float] = None) -> np.ndarray:
+        #CLS vectors for already tokenized sequences, one float32 row each. A lost connection is reopened once,
+        #ConnectionError if that fails too
+        try:
+            return self._forward_once(id_lists, timeout)
+        except ConnectionError:
+            self._reconnect()
+            return self._forward_once(id_lists, timeout)
+
+    def _forward_once(self, id_lists: List[List[int]], timeout: Optional[float]) -> np.ndarray:
+        future: Future = Future()
+        with self._pending_lock:
+            if self._closed is not None:
+                raise self._closed
+            conn, pending = self._conn, self._pending
+            request_id = next(self._ids)
+            pending[request_id] = future
+        try:
+            with self._send_lock:
+                conn.send((request_id, id_lists))
+        except (OSError, EOFError, ValueError) as e:
+            error = ConnectionError(f"inference server connection lost: {e}")
+            self._fail_pending(conn, pending, error)
+            raise error
+        return future.result(timeout)
+
+
+def _start_private_server(model_name: str, quantized: bool) -> Tuple[Connection, object]:
+    #spawn, not fork, so the server doesn't inherit the web process's threads. The pipe is anonymous,
+    #only this process holds the other end
+    context = get_context("spawn")
+    parent_conn, child_conn = context.Pipe()
+    process = context.Process(target=serve, args=(model_name,), kwargs={"conn": child_conn, "quantized": quantized},
+                              name="resumeai-inference", daemon=True)
+    process.start()
+    child_conn.close()
+    return parent_conn, process
+
+
+def standalone_server_configured() -> bool:
+    #RESUMEAI_INFERENCE names a server every process connects to, not a private one per process
+    return os.environ.get("RESUMEAI_INFERENCE", "local") not in ("", "local", "server")
+
+
+def get_inference_client(model_name: str, quantized: bool = False) -> Optional[InferenceClient]:
+    #the process-wide client for RESUMEAI_INFERENCE, or None when BERT should run locally.
+    #an unreachable server is logged and treated as local, so parsing keeps working
+    mode = os.environ.get("RESUMEAI_INFERENCE", "local")
+    if mode in ("", "local"):
+        return None
+    import model_registry
+
+    def connect():
+        if mode == "server":
+            open_connection = lambda: _start_private_server(model_name, quantized)
+        else:
+            try:
+                authkey = shared_authkey()
+            except ValueError as e:
+                logger.error("%s, running BERT locally", e)
+                return None
+            open_connection = lambda: (Client(parse_address(mode), authkey=authkey), None)
+        try:
+            client = InferenceClient(open_connection)
+        except (OSError, EOFError, AuthenticationError) as e:
+            logger.warning("inference server %s unavailable, running BERT locally: %s", mode, e)
+            return None
+        if (client.model_name, client.quantized) != (model_name, quantized):
+            #its vectors wouldn't match the ones stored under this process's embedding tag
+            logger.warning("inference server runs %s (quantized=%s), not %s (quantized=%s), running BERT locally",
+                           client.model_name, client.quantized, model_name, quantized)
+            return None
+        return client
+
+    return model_registry.get_or_load(("inference_client", mode, model_name, quantized), connect)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve batched BERT embeddings to the job parsers of every worker")
+    parser.add_argument("--address", default="127.0.0.1:6010", help="host:port or unix socket path to listen on")
+    parser.add_argument("--model", default=None, help="Hugging Face model name (default: the job parser's)")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--fast", action="store_true", default=None,
+                        help="int8 quantized model (default: RESUMEAI_FAST_INFERENCE)")
+    args = parser.parse_args()
+    if not os.environ.get("RESUMEAI_INFERENCE_AUTHKEY"):
+        parser.error("set RESUMEAI_INFERENCE_AUTHKEY to a random secret, clients need the same value")
+
+    from embedding_backends import BERT_MODEL_NAME, FAST_INFERENCE
+    serve(args.model or BERT_MODEL_NAME, address=args.address, max_batch_size=args.max_batch_size,
+          max_wait_ms=args.max_wait_ms, quantized=FAST_INFERENCE if args.fast is None else args.fast)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#Bulk resume ingestion.
+#Parses a whole directory of resumes (or a manifest listing them) with a pool of worker processes, each with
+#its own ResumeParser and spaCy model, which run batches of files through nlp.pipe. One JSON object per file
+#is streamed to a JSON Lines output file.
+#A file that fails to parse is written as an error record instead of stopping the run, and running the
+#same command again skips every file that is already in the output, so a crashed backfill just picks up
+#where it stopped. With --retry-failed a file can appear more than once, the last record for a path wins.
+#
+#usage (from the backend folder):
+#   python ingest_resumes.py /data/resumes --output parsed.jsonl
+#   python ingest_resumes.py manifest.txt --output parsed.jsonl --workers 8
+#   python ingest_resumes.py /data/resumes --output parsed.jsonl --retry-failed
+#
+#a manifest is a text file with one path per line, or a .jsonl file with a "path" key per line
+#(and optionally "user_id"). Relative paths are resolved against the manifest's folder.
+
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".doc"}
+
+_worker_parser = None #the ResumeParser of this worker process, created once by _init_worker
+
+
+def iter_directory(root: str) -> Iterator[Tuple[str, Optional[int]]]:
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if Path(filename).suffix.lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.join(dirpath, filename), None
+
+
+def iter_manifest(manifest_path: str) -> Iterator[Tuple[str, Optional[int]]]:
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            user_id = None
+            if line.startswith("{"):
+                entry = json.loads(line)
+                line, user_id = entry["path"], entry.get("user_id")
+            yield os.path.join(base, line), user_id
+
+
+def load_done(output_path: str, retry_failed: bool) -> Set[str]:
+    #paths already in the output, a half written last line from a crash is ignored
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok" or not retry_failed:
+                done.add(record["path"])
+    return done
+
+
+def _init_worker(pdf_engine: Optional[str], use_cache: bool):
+    global _worker_parser
+    import pdf_engines
+    from log_config import configure_logging
+    from resume_paser import ResumeParser
+
+    configure_logging(quiet=True)
+    #the pool already keeps every core busy with whole files, page-parallel extraction would oversubscribe
+    pdf_engines.PARALLEL_PAGE_THRESHOLD = 0
+    _worker_parser = ResumeParser(pdf_engine=pdf_engine, use_cache=use_cache)
+
+
+def _parse_batch(tasks: List[Tuple[str, Optional[int]]]) -> List[Dict]:
+    #one batch of files, spaCy runs over all of them in a single nlp.pipe call
+    start = time.perf_counter()
+    results = _worker_parser.parse_resumes([path for path, _ in tasks], [user_id for _, user_id in tasks],
+                                           batch_size=len(tasks))
+    elapsed_ms = round((time.perf_counter() - start) * 1000 / len(tasks), 3) #per file, averaged over the batch
+    records = []
+    for (path, _), result in zip(tasks, results):
+        record = {"path": path, "pid": os.getpid()}
+        if isinstance(result, Exception):
+            record["status"] = "error"
+            record["error"] = f"{type(result).__name__}: {result}"
+        else:
+            record["status"] = "ok"
+            record["data"] = result
+        record["elapsed_ms"] = elapsed_ms
+        records.append(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a directory or manifest of resumes into JSON Lines")
+    parser.add_argument("source", help="directory to scan, or a manifest file listing resumes")
+    parser.add_argument("--output", "-o", required=True, help="JSON Lines file to append results to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--batch-size", type=int, default=16, help="files a worker parses (and runs through spaCy) at a time")
+    parser.add_argument("--pdf-engine", default=None, help="auto, pymupdf or pdfplumber")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the parse cache")
+    parser.add_argument("--retry-failed", action="store_true", help="parse files that failed last time again")
+    parser.add_argument("--progress-every", type=int, default=100, help="print throughput every N files")
+    args = parser.parse_args()
+
+    source_iter = iter_directory(args.source) if os.path.isdir(args.source) else iter_manifest(args.source)
+    done = load_done(args.output, args.retry_failed)
+    tasks: List[Tuple[str, Optional[int]]] = [task for task in source_iter if task[0] not in done]
+    print(f"{len(tasks)} files to parse ({len(done)} already in {args.output})", file=sys.stderr)
+    if not tasks:
+        return
+
+    ok = failed = 0
+    start = time.perf_counter()
+    with open(args.output, "a", encoding="utf-8") as out, \
+            Pool(max(1, args.workers), initializer=_init_worker,
+                 initargs=(args.pdf_engine, not args.no_cache)) as pool:
+        batch_size = max(1, args.batch_size)
+        batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+        next_report = args.progress_every
+        for records in pool.imap_unordered(_parse_batch, batches):
+            for record in records:
+                out.write(json.dumps(record, default=str) + "\n")
+                if record["status"] == "ok":
+                    ok += 1
+                else:
+                    failed += 1
+            out.flush() #a crash loses at most the batches still being parsed
+            processed = ok + failed
+            if processed >= next_report:
+                next_report += args.progress_every
+                rate = processed / (time.perf_counter() - start)
+                print(f"  {processed}/{len(tasks)} files, {rate:.1f} files/sec, {failed} failed", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f"done: {ok} parsed, {failed} failed in {elapsed:.1f}s ({(ok + failed) / elapsed:.1f} files/sec)",
+          file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
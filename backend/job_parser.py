@@ -1,48 +1,121 @@
+import os #used to find where the embedding cache lives on disk
 import re #for text cleaning
-import nltk #helps convert text into meaningful words
-import torch #used to run BERT
-from typing import Dict, List, Tuple
+import json #used to build a stable key out of the skill vocabulary
+import hashlib #turns that key into a short file name
+import time #times the batched keyword stage in parse_many
+import logging #used to check the log level before building the per-parse log fields
+from typing import Dict, List, Optional, Tuple
 from collections import Counter
-from transformers import AutoTokenizer, AutoModel #loads pre-trained BERT models
-from sklearn.metrics.pairwise import cosine_similarity #compares how two pieces of texts are similar
+from functools import lru_cache #remembers lemmas across job descriptions
 import numpy as np #numerical computation
+import model_registry #shares one copy of BERT and the nltk resources across every parser
+from log_config import configure_logging, get_logger, StageTimer #logging instead of print, with per-stage timings
+from profiling import record_stages #aggregates stage timings for /api/metrics
+from embedding_backends import (BERT_MODEL_NAME, CHUNK_OVERLAP_TOKENS, CHUNK_POOLING_MODES, CHUNK_WINDOW_TOKENS,
+                                FAST_INFERENCE, SEMANTIC_MATCH_THRESHOLD, EmbeddingBackend, backend_tag,
+                                get_backend, pool_chunks) #BERT, DistilBERT or hashing vectors behind one interface
+#torch, transformers and nltk are imported inside the methods that use them, importing this module
+#has to stay cheap because the Flask app imports it at startup
 
 
+#bump this whenever the way skill prompts are embedded changes, it invalidates every cached skill matrix
+SKILL_MATRIX_VERSION = 1
+#bump this whenever the way whole documents are embedded changes, it invalidates every stored document vector
+DOCUMENT_EMBEDDING_VERSION = 1
+EMBEDDING_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'embeddings')
 
+logger = get_logger("job_parser")
 
 
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+   #scales every row to length 1 so a plain dot product is the cosine similarity
+   norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+   norms[norms == 0] = 1.0
+   return matrix / norms
 
-try:
-   nltk.data.find('tokenizers/punkt')
-   nltk.data.find('corpora/stopwords')
-   nltk.data.find('taggers/averaged_perceptron_tagger')
-   nltk.data.find('corpora/wordnet')
-except LookupError:
-   nltk.download('punkt')
-   nltk.download('stopwords')
-   nltk.download('averaged_perceptron_tagger')
-   nltk.download('wordnet')
 
+def document_embedding_tag(pooling: str = "mean", fast: Optional[bool] = None, backend: Optional[str] = None) -> str:
+   #what stored document vectors are tagged with, vectors with any other tag are recomputed.
+   #a plain function so routes can read stored vectors without loading BERT
+   return f"{backend_tag(backend, fast)}/{pooling}/v{DOCUMENT_EMBEDDING_VERSION}"
 
 
+@lru_cache(maxsize=65536)
+def _lemmatize(word: str, pos: str) -> str:
+   #wordnet lookups are the slow part of keyword extraction and the same words come up in every posting,
+   #so each (word, part of speech) pair is lemmatized once per process
+   return model_registry.get_lemmatizer().lemmatize(word, pos)
 
-from nltk.corpus import stopwords #filler words are filtered out
-from nltk.tokenize import word_tokenize, sent_tokenize #breaks text into words
-from nltk.tag import pos_tag #breaks text into sentences
-from nltk.stem import WordNetLemmatizer #running -> run, turns words into their base root
-from nltk.chunk import ne_chunk #Named Entity Recognition (NER) using a shallow parser
 
+_TERM_SEPARATOR = re.compile(r'[\s\-/]+')
+_SPECIAL_CHARS = re.compile(r'[^\w\s\-\+\.]')
 
 
+def clean_and_preprocess(text: str) -> str:
+   #enhanced text cleaning and preprocessing, a plain function so code that only needs the cleaning
+   #(like the near-duplicate detector) doesn't have to load BERT by building a parser
+   text = text.lower()
+   text = _SPECIAL_CHARS.sub(' ', text) #removed special chars
+   text = ' '.join(text.split()) #removes extra whitespace
+   return text.strip()
+
+
+def _normalize_term(term: str) -> str:
+   #"Problem-Solving" and "problem  solving" both become "problem solving"
+   return ' '.join(part for part in _TERM_SEPARATOR.split(term.lower()) if part)
+
+
+class SkillMatcher:
+   #every technical and soft skill compiled into one alternation regex,
+   #so a document is scanned once no matter how many skills we know about
+   def __init__(self, technical_skills: Dict[str, List[str]], soft_skills: List[str]):
+       #normalized term -> every (kind, category, skill) it stands for
+       self._lookup: Dict[str, List[Tuple[str, str, str]]] = {}
+       for category, skills in technical_skills.items():
+           for skill in skills:
+               self._lookup.setdefault(_normalize_term(skill), []).append(("technical", category, skill))
+       for skill in soft_skills:
+           self._lookup.setdefault(_normalize_term(skill), []).append(("soft", "soft_skills", skill))
+
+       #longest terms first so "javascript" wins over "java" at the same position
+       terms = sorted(self._lookup, key=len, reverse=True)
+       alternation = '|'.join(r'[\s\-/]+'.join(re.escape(word) for word in term.split()) for term in terms)
+       #lookarounds instead of \b so skills ending in symbols like "c++" still match, ".js" is allowed as a suffix
+       self.pattern = re.compile(rf'(?<!\w)({alternation})(?:\.js)?(?!\w)', re.IGNORECASE)
+
+   def find_all(self, text: str) -> List[Dict]:
+       #one linear pass, every hit reports which skill it is, its category and its character span
+       mentions = []
+       for match in self.pattern.finditer(text):
+           for kind, category, skill in self._lookup.get(_normalize_term(match.group(1)), []):
+               mentions.append({
+                   "skill": skill,
+                   "kind": kind,
+                   "category": category,
+                   "start": match.start(1),
+                   "end": match.end(1),
+               })
+       return mentions
+
 
 class AdvancedJobDescriptionParser:
-   def __init__(self):
-       #initialize nltk componenets
-       self.stop_words = set(stopwords.words('english'))
-       self.lemmatizer = WordNetLemmatizer()
-       #initialize bert model
-       self.tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
-       self.bert_model = AutoModel.from_pretrained('bert-base-uncased')
+   def __init__(self, fast: Optional[bool] = None, backend: Optional[str] = None):
+       #initialize nltk componenets, the registry downloads missing nltk data the first time
+       self.stop_words = model_registry.get_stopwords('english')
+       self.lemmatizer = model_registry.get_lemmatizer()
+       #initialize the embedding backend (see embedding_backends.py), loaded once per process and shared by every
+       #parser instance. backend picks bert, distil or hashing (default RESUMEAI_EMBEDDING_BACKEND), fast=True
+       #uses the int8 quantized transformer (default RESUMEAI_FAST_INFERENCE). Every embedding method also
+       #takes a backend, so one call can use a cheaper (or better) model than the rest
+       self.fast = FAST_INFERENCE if fast is None else fast
+       self.backend = get_backend(backend, self.fast)
+       #the skill prompt embeddings never change between job descriptions, so they are built once per backend
+       self._skill_matrices: Dict[str, Tuple[np.ndarray, List[Tuple[str, str]]]] = {}
+       #how per-chunk vectors of a long document are combined into one, "mean" or "max"
+       self.chunk_pooling = "mean"
+       #built on first use from technical_skills and soft_skills, rebuilt if either list changes
+       self._skill_matcher: Optional[SkillMatcher] = None
+       self._skill_matcher_key = None
 
 
        self.technical_skills = {
@@ -96,106 +169,219 @@ class AdvancedJobDescriptionParser:
 
 
    def clean_and_preprocess(self, text: str) -> str:
-       #enhanced text cleaning and preprocessing
-       text = text.lower()
-
-
-       text = re.sub(r'[^\w\s\-\+\.]', ' ', text) #removed special chars
-       text = ' '.join(text.split()) #removes extra whitespace
-       return text.strip()
+       return clean_and_preprocess(text)
 
 
    def extract_keywords_nltk(self, text: str) -> Dict[str, List[str]]:
-       tokens = word_tokenize(text)
-       filtered_tokens = [
-           word for word in tokens
-           if word not in self.stop_words and len(word) > 2
+       return self.extract_keywords_nltk_many([text])[0]
+
+   def extract_keywords_nltk_many(self, texts: List[str]) -> List[Dict[str, List[str]]]:
+       #batched version for bulk imports: one pos_tag_sents call tags every document (the tagger is set up
+       #once instead of once per text) and lemmas come from _lemmatize's cache, job postings repeat most words
+       from nltk.tokenize import word_tokenize #breaks text into words
+       from nltk.tag import pos_tag_sents #tags each word of each document as noun, verb, adjective etc
+       filtered_docs = [
+           [word for word in word_tokenize(text) if word not in self.stop_words and len(word) > 2]
+           for text in texts
        ]
 
 
-       pos_tags = pos_tag(filtered_tokens)
-       nouns = [word for word, pos in pos_tags if pos.startswith('NN')]
-       adjectives = [word for word, pos in pos_tags if pos.startswith('JJ')]
-       verbs = [word for word, pos in pos_tags if pos.startswith('VB')]
-
+       results = []
+       for pos_tags in pos_tag_sents(filtered_docs):
+           lemmatized_nouns = [_lemmatize(word, 'n') for word, pos in pos_tags if pos.startswith('NN')]
+           lemmatized_verbs = [_lemmatize(word, 'v') for word, pos in pos_tags if pos.startswith('VB')]
+           adjectives = [word for word, pos in pos_tags if pos.startswith('JJ')]
 
-       lemmatized_nouns = [self.lemmatizer.lemmatize(word) for word in nouns]
-       lemmatized_verbs = [self.lemmatizer.lemmatize(word, 'v') for word in verbs]
 
+           noun_freq = Counter(lemmatized_nouns).most_common(10)
+           verb_freq = Counter(lemmatized_verbs).most_common(10)
 
-       noun_freq = Counter(lemmatized_nouns).most_common(10)
-       verb_freq = Counter(lemmatized_verbs).most_common(10)
-       adj_freq = Counter(adjectives).most_common(10)
 
+           results.append({
+               "nouns": [word for word, freq in noun_freq],
+               "verbs": [word for word, freq in verb_freq],
+               "all keywords": list(set(lemmatized_nouns + lemmatized_verbs + adjectives))
+           })
+       return results
+   def get_backend(self, backend: Optional[str] = None) -> EmbeddingBackend:
+       #this parser's backend, or the named one for a single call
+       if backend is None or backend == self.backend.name:
+           return self.backend
+       return get_backend(backend, self.fast)
 
-       return {
-           "nouns": [word for word, freq in noun_freq],
-           "verbs": [word for word, freq in verb_freq],
-           "all keywords": list(set(lemmatized_nouns + lemmatized_verbs + adjectives))
-       }
    #This function converts a piece of text into a numerical BERT embedding, which captures the semantic meaning of the sentence.
    # for example, it knows that java and javascript are different things
-   def get_bert_embeddings(Self, text: str) -> np.ndarray:
-       #get bert embeddings for understanding
-       inputs = self.tokenizer(text, return_tensors="pt",max_length = 512,
-                               truncation = True, padding= True)
-       with torch.no_grad():
-           outputs = self.bert_model(**inputs)
-      
-       embeddings = outputs.last_hidden_state[:, 0, :].numpy()
-       return embeddings
+   def get_bert_embeddings(self, text: str, backend: Optional[str] = None) -> np.ndarray:
+       #get bert embeddings for understanding, shape is (1, hidden_size) like before
+       return self.embed_many([text], backend=backend)
+
+   def embed_many(self, texts: List[str], batch_size: int = 32,
+                  max_tokens: Optional[int] = 8192, backend: Optional[str] = None) -> np.ndarray:
+       #embeds a whole list of texts and returns a contiguous float32 array, one row per text in input order.
+       #transformers truncate each text at BERT_MAX_LENGTH, use embed_documents for full coverage of long texts
+       return self.get_backend(backend).embed_many(list(texts), batch_size, max_tokens)
+
+   def embed_chunks(self, text: str, window: int = CHUNK_WINDOW_TOKENS, overlap: int = CHUNK_OVERLAP_TOKENS,
+                    batch_size: int = 32, backend: Optional[str] = None) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+       #returns one vector per window plus the (start, end) character span each window covers,
+       #so a match can be traced back to the part of the posting it came from
+       return self.get_backend(backend).embed_chunks(text, window, overlap, batch_size)
+
+   def embed_documents(self, texts: List[str], pooling: Optional[str] = None, window: int = CHUNK_WINDOW_TOKENS,
+                       overlap: int = CHUNK_OVERLAP_TOKENS, batch_size: int = 32,
+                       backend: Optional[str] = None) -> np.ndarray:
+       #full-document embeddings: every window of every text is embedded in one batched pass,
+       #then the windows of each text are pooled back into a single row
+       return self.get_backend(backend).embed_documents(list(texts), pooling or self.chunk_pooling,
+                                                        window, overlap, batch_size)
+
+   def document_embedding_tag(self, backend: Optional[str] = None) -> str:
+       return document_embedding_tag(self.chunk_pooling, self.fast, self.get_backend(backend).name)
+
+   def _skill_matrix_path(self, backend: EmbeddingBackend) -> str:
+       #the file name carries a hash of the model, the version and the whole skill list,
+       #so editing technical_skills or switching models never picks up a stale matrix
+       key = json.dumps({
+           "model": backend.tag,
+           "version": SKILL_MATRIX_VERSION,
+           "skills": self.technical_skills,
+       }, sort_keys=True)
+       digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+       return os.path.join(EMBEDDING_CACHE_DIR, f"skill_matrix_{digest}.npy")
+
+   def get_skill_matrix(self, backend: Optional[str] = None) -> Tuple[np.ndarray, List[Tuple[str, str]]]:
+       #returns one normalized row per (category, skill) prompt, loading it from disk when we can
+       embedder = self.get_backend(backend)
+       cached = self._skill_matrices.get(embedder.tag)
+       if cached is not None:
+           return cached
+
+       labels = [(category, skill) for category, skills in self.technical_skills.items() for skill in skills]
+       cache_path = self._skill_matrix_path(embedder)
+       #other parser instances in this process may already have built the same matrix
+       matrix = model_registry.get_or_load(("skill_matrix", cache_path),
+                                           lambda: self._load_or_build_skill_matrix(cache_path, labels, embedder))
+       self._skill_matrices[embedder.tag] = (matrix, labels)
+       return matrix, labels
+
+   def _load_or_build_skill_matrix(self, cache_path: str, labels: List[Tuple[str, str]],
+                                   embedder: EmbeddingBackend) -> np.ndarray:
+       matrix = None
+
+       if embedder.cache_skill_matrix and os.path.exists(cache_path):
+           try:
+               matrix = np.load(cache_path)
+               if matrix.shape[0] != len(labels):
+                   matrix = None
+           except (OSError, ValueError) as e:
+               logger.warning("skill matrix cache unreadable, rebuilding: %s", e)
+               matrix = None
+
+       if matrix is None:
+           prompts = [embedder.skill_prompt(skill) for _, skill in labels]
+           matrix = _normalize_rows(embedder.embed_many(prompts))
+           if embedder.cache_skill_matrix:
+               try:
+                   os.makedirs(EMBEDDING_CACHE_DIR, exist_ok=True)
+                   #write to a temp file first so a crash never leaves half a matrix behind
+                   tmp_path = cache_path + ".tmp"
+                   with open(tmp_path, "wb") as f:
+                       np.save(f, matrix)
+                   os.replace(tmp_path, cache_path)
+               except OSError as e:
+                   logger.warning("could not persist skill matrix: %s", e)
+
+       return np.ascontiguousarray(matrix, dtype=np.float32)
+
    #It uses BERT embeddings to compare the job description to predefined technical skills
    #and see which ones are semantically similar, even if not mentioned word-for-word.
-   def semantic_skill_matching(self, text: str) -> Dict[str, List[Tuple[str, float]]]:
-       text_embedding = self.get_bert_embeddings(text)
+   def semantic_skill_matching(self, text: str, pooling: Optional[str] = None,
+                               backend: Optional[str] = None) -> Dict[str, List[Tuple[str, float]]]:
+       return self.semantic_skill_analysis(text, pooling, backend)[0]
+
+   def semantic_skill_analysis(self, text: str, pooling: Optional[str] = None,
+                               backend: Optional[str] = None) -> Tuple[Dict[str, List[Tuple[str, float]]], Dict[str, Dict]]:
+       #scores the whole document (not just the first 512 tokens) and also reports, for every matched skill,
+       #the window where it scored best as {"category", "score", "span": (start, end)} in characters of text
+       pooling = pooling or self.chunk_pooling
+       embedder = self.get_backend(backend)
+       skill_matrix, labels = self.get_skill_matrix(embedder.name)
+       chunk_vectors, spans = embedder.embed_chunks(text)
+       document_vector = _normalize_rows(pool_chunks(chunk_vectors, pooling)[None, :])[0]
+       semantic_matches = self._matches_from_scores(skill_matrix @ document_vector, labels, embedder.match_threshold)
+
+       chunk_scores = _normalize_rows(chunk_vectors) @ skill_matrix.T
+       best_chunks = chunk_scores.argmax(axis=0)
+       label_index = {label: i for i, label in enumerate(labels)}
+       locations = {}
+       for category, matches in semantic_matches.items():
+           for skill, score in matches:
+               column = label_index[(category, skill)]
+               chunk = int(best_chunks[column])
+               locations[skill] = {
+                   "category": category,
+                   "score": float(chunk_scores[chunk, column]),
+                   "span": spans[chunk],
+               }
+       return semantic_matches, locations
+
+   def semantic_skill_matching_many(self, texts: List[str], batch_size: int = 32, pooling: Optional[str] = None,
+                                    backend: Optional[str] = None) -> List[Dict[str, List[Tuple[str, float]]]]:
+       #batched version for bulk re-scoring, every window of every text is embedded in padded batches
+       #and one matrix product scores all texts against all skills
+       embedder = self.get_backend(backend)
+       skill_matrix, labels = self.get_skill_matrix(embedder.name)
+       text_embeddings = _normalize_rows(self.embed_documents(texts, pooling=pooling, batch_size=batch_size,
+                                                              backend=embedder.name))
+       scores = text_embeddings @ skill_matrix.T
+       return [self._matches_from_scores(row, labels, embedder.match_threshold) for row in scores]
+
+   def _matches_from_scores(self, scores: np.ndarray, labels: List[Tuple[str, str]],
+                            threshold: float = SEMANTIC_MATCH_THRESHOLD) -> Dict[str, List[Tuple[str, float]]]:
        semantic_matches = {}
-       for category, skills in self.technical_skills.items():
-           matches = []
-           for skill in skills:
-               skill_embedding = self.get_bert_embeddings(f"experience with {skill}")
-               similarity = cosine_similarity(text_embedding, skill_embedding)[0][0]
-               if similarity > 0.7:
-                   matches.append((skill, float(similarity)))
-           if matches:
-               semantic_matches[category] = sorted(matches, key=lambda x: x[1], reverse=True)
+       for (category, skill), similarity in zip(labels, scores):
+           if similarity > threshold:
+               semantic_matches.setdefault(category, []).append((skill, float(similarity)))
+       for category in semantic_matches:
+           semantic_matches[category].sort(key=lambda x: x[1], reverse=True)
        return semantic_matches
   
-   def extract_technical_skills(self, text: str) -> Dict[str, List[str]]:
+   def _get_skill_matcher(self) -> SkillMatcher:
+       key = (json.dumps(self.technical_skills, sort_keys=True), tuple(self.soft_skills))
+       if self._skill_matcher is None or self._skill_matcher_key != key:
+           self._skill_matcher = SkillMatcher(self.technical_skills, self.soft_skills)
+           self._skill_matcher_key = key
+       return self._skill_matcher
+
+   def find_skill_mentions(self, text: str) -> List[Dict]:
+       #every technical and soft skill mention in the text with its category and (start, end) span
+       return self._get_skill_matcher().find_all(text)
+
+   def extract_technical_skills(self, text: str, mentions: Optional[List[Dict]] = None) -> Dict[str, List[str]]:
+       if mentions is None:
+           mentions = self.find_skill_mentions(text)
        found_skills = {}
-       for category, skills in self.technical_skills.items():
-           category_skills = []
-           for skill in skills:
-               patterns = [
-                   rf'\b{re.escape(skill)}\b',
-                   rf'{re.escape(skill)}\.js',
-                   rf'{re.escape(skill)}\s*(programming|development|framework)',
-               ]
-               for pattern in patterns:
-                   if re.search(pattern, text, re.IGNORECASE):
-                       category_skills.append(skill)
-                       break
-           if category_skills:
-               found_skills[category] = list(set(category_skills))
+       for mention in mentions:
+           if mention["kind"] != "technical":
+               continue
+           category_skills = found_skills.setdefault(mention["category"], [])
+           if mention["skill"] not in category_skills:
+               category_skills.append(mention["skill"])
        return found_skills
 
 
-   def extract_soft_skills(self, text: str) -> List[str]:
+   def extract_soft_skills(self, text: str, mentions: Optional[List[Dict]] = None) -> List[str]:
+       if mentions is None:
+           mentions = self.find_skill_mentions(text)
        found_soft_skills = []
-      
-       for skill in self.soft_skills:
-           patterns = [
-               rf'\b{re.escape(skill)}\b',
-               rf'excellent\s+{re.escape(skill)}',
-               rf'strong\s+{re.escape(skill)}',
-               rf'{re.escape(skill)}\s+skills?',
-           ]
-          
-           for pattern in patterns:
-               if re.search(pattern, text, re.IGNORECASE):
-                   found_soft_skills.append(skill)
-                   break
+       for mention in mentions:
+           if mention["kind"] == "soft" and mention["skill"] not in found_soft_skills:
+               found_soft_skills.append(mention["skill"])
+       return found_soft_skills
+
    def extract_responsibilities(self, text: str) -> Dict[str, List[str]]:
        responsibilities = {}
+       from nltk.tokenize import sent_tokenize #breaks text into sentences
        sentences = sent_tokenize(text)
       
        for category, keywords in self.responsibility_keywords.items():
@@ -268,33 +454,55 @@ class AdvancedJobDescriptionParser:
            return "low"
 
 
-   def parse(self, job_description: str) -> Dict:
-       print("start job desc parsing")
-       clean_text = self.clean_and_preprocess(job_description)
-       print("text preprocessing completed")
-       nltk_keywords = self.extract_keywords_nltk(clean_text)
-       print("nltk keyword extraction completed")
-       technical_skills = self.extract_technical_skills(clean_text)
-       soft_skills = self.extract_soft_skills(clean_text)   
-       print("skills extraction completed")
+   def parse(self, job_description: str, backend: Optional[str] = None) -> Dict:
+       return self.parse_many([job_description], backend=backend)[0]
+
+   def parse_many(self, job_descriptions: List[str], backend: Optional[str] = None) -> List[Dict]:
+       #same result as parse() for every description, with the nltk keyword stage run over all of them at once
+       timers = [StageTimer() for _ in job_descriptions] #adds up how long each stage takes, logged once per description
+       clean_texts = []
+       for job_description, timer in zip(job_descriptions, timers):
+           with timer.stage("preprocess"):
+               clean_texts.append(self.clean_and_preprocess(job_description))
+       start = time.perf_counter()
+       keywords = self.extract_keywords_nltk_many(clean_texts)
+       share = (time.perf_counter() - start) / max(1, len(job_descriptions)) #the batch's time is split evenly
+       for timer in timers:
+           timer.timings["nltk_keywords"] = share
+       return [self._parse_clean(job_description, clean_text, nltk_keywords, timer, backend)
+               for job_description, clean_text, nltk_keywords, timer
+               in zip(job_descriptions, clean_texts, keywords, timers)]
+
+   def _parse_clean(self, job_description: str, clean_text: str, nltk_keywords: Dict[str, List[str]],
+                    timer: StageTimer, backend: Optional[str]) -> Dict:
+       with timer.stage("skills"):
+           #one scan of the text finds both technical and soft skills
+           skill_mentions = self.find_skill_mentions(clean_text)
+           technical_skills = self.extract_technical_skills(clean_text, skill_mentions)
+           soft_skills = self.extract_soft_skills(clean_text, skill_mentions)
 
 
        try:
-           semantic_matches = self.semantic_skill_matching(clean_text)
-           print("bert semantic analysis completed")
+           with timer.stage("bert"):
+               semantic_matches, semantic_locations = self.semantic_skill_analysis(clean_text, backend=backend)
        except Exception as e:
-           print(f"BERT analysis failed: {e}")
+           logger.warning("BERT analysis failed: %s", e)
            semantic_matches = {}
+           semantic_locations = {}
 
 
-       experience_level = self.extract_experience_level(clean_text)
-       education_requirements = self.extract_education_requirements(clean_text)
-       responsibilities = self.extract_responsibilities(job_description)
+       with timer.stage("requirements"):
+           experience_level = self.extract_experience_level(clean_text)
+           education_requirements = self.extract_education_requirements(clean_text)
+           responsibilities = self.extract_responsibilities(job_description)
 
 
        parsed_data = {
            "technical_skills": technical_skills,
-           "soft_skills": semantic_matches,
+           "soft_skills": soft_skills,
+           "skill_mentions": skill_mentions,
+           "semantic_matches": semantic_matches,
+           "semantic_skill_locations": semantic_locations,
            "nltk_keywords": nltk_keywords,
            "experience_level": experience_level,
            "education_requirements": education_requirements,
@@ -306,7 +514,9 @@ class AdvancedJobDescriptionParser:
 
 
        parsed_data["job_complexity"] = self.analyze_job_complexity(parsed_data)
-       print("job desc parsing completed successfully")
+       record_stages("job", timer)
+       if logger.isEnabledFor(logging.INFO): #in quiet mode the fields are never built
+           logger.info("Job description parsed", extra={"fields": dict(text_length=len(job_description), **timer.as_fields())})
 
 
        return parsed_data
@@ -318,7 +528,13 @@ class AdvancedJobDescriptionParser:
                if pattern in text:
                    return level
        return "not specified"
-  
+
+
+def get_shared_job_parser() -> AdvancedJobDescriptionParser:
+   #one parser per process for the Flask routes, it keeps no per-posting state
+   return model_registry.get_or_load("job_parser", AdvancedJobDescriptionParser)
+
+
 def test_advanced_parser():
    sample_job = """
    Senior Full Stack Developer - Remote Opportunity
@@ -350,6 +566,7 @@ def test_advanced_parser():
   
    We offer competitive salary, flexible work arrangements, and excellent benefits.
    """
+   configure_logging()
    print("testing advanced job desc parser")
    print("=" * 50)
    parser = AdvancedJobDescriptionParser()
@@ -1,6 +1,139 @@
-from flask import Blueprint, request, jsonify
+import os
+import queue
+import threading
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import or_
+import model_registry
+from models import db, Resume, JobDescription
+from embedding_store import backfill_embeddings, ensure_embedding, load_ids, load_matrix
+from job_parser import document_embedding_tag
+from log_config import get_logger
+from reccomendation import JOB_INDEX_SYNC_SECONDS
 
 job_blueprint = Blueprint('job', __name__)
+logger = get_logger("job_route")
+
+_saved_jobs: "queue.Queue[int]" = queue.Queue()  # ids of jobs saved by this process, waiting for their parse and embedding
+
+
+def _load_jobs():
+    # (id, text) of every stored job, imported once into the near-duplicate store
+    for job_id, content in db.session.query(JobDescription.id, JobDescription.content).filter(JobDescription.content.isnot(None)).yield_per(1000):
+        yield job_id, content
+
+
+def _stale_jobs():
+    # Jobs saved before embeddings were stored (or with an older model)
+    return JobDescription.query.filter(
+        JobDescription.content.isnot(None), JobDescription.content != '',
+        or_(JobDescription.embedding.is_(None), JobDescription.embedding_model != document_embedding_tag()),
+    )
+
+
+def _load_job_vectors(ids=None):
+    # Stored job embeddings, every one or just ids. Nothing is embedded here, stale jobs are caught up by
+    # _embed_stale_jobs and reach the index through the next sync
+    return load_matrix(db.session, JobDescription, document_embedding_tag(), ids)
+
+
+def _load_job_ids():
+    return load_ids(db.session, JobDescription, document_embedding_tag())
+
+
+def _process_saved_job(job_id):
+    # The slow part of saving a job: parse it (unless it reused a duplicate's parse), embed it and add it
+    # to this process's recommendation index. Runs on the maintenance thread inside an app context
+    job = db.session.get(JobDescription, job_id)
+    if job is None:
+        return
+    if not job.parsed_data:
+        try:
+            from job_parser import get_shared_job_parser
+            parsed = get_shared_job_parser().parse(job.content)
+            job.set_parsed_data(parsed)
+            job.set_keywords(parsed['nltk_keywords'].get('all keywords', []))
+        except Exception as e:
+            # /api/analysis/compare parses it later if it has to
+            logger.warning("Job description %s parsing failed: %s", job_id, e)
+    tag = document_embedding_tag()
+    vector = ensure_embedding(job, job.content, tag)  # stored once here, read back by compare and recommend
+    db.session.commit()
+    from reccomendation import get_shared_recommender
+    recommender = get_shared_recommender(create=False, model_tag=tag)
+    if recommender is not None and vector is not None:
+        recommender.add_vectors([job.id], vector[None, :])
+
+
+def _run_step(app, description, step, *args):
+    # One unit of background work in its own app context; a failure is logged and the thread goes on
+    with app.app_context():
+        try:
+            return step(*args)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("%s failed: %s", description, e)
+        finally:
+            db.session.remove()
+
+
+def _build_recommender():
+    from reccomendation import get_shared_recommender
+    return get_shared_recommender(_load_job_vectors, model_tag=document_embedding_tag())
+
+
+def _import_job_signatures():
+    from similar import import_existing
+    import_existing('job', _load_jobs)
+
+
+def _embed_stale_jobs(lock_path):
+    # Only one worker at a time does the work (file lock), the others skip it
+    count = backfill_embeddings(db.session, _stale_jobs, lambda job: job.content, document_embedding_tag(),
+                                lock_path=lock_path)
+    if count:
+        logger.info("Embedded %d stale job descriptions", count)
+
+
+def _sync_recommender(recommender):
+    # Jobs saved through other workers (or embedded since) that this process's index doesn't have yet
+    recommender.sync(_load_job_ids, _load_job_vectors)
+
+
+def _catch_up(app):
+    # Jobs saved before near-duplicate signatures and embeddings were stored, or by a process that exited
+    # before it got to them. Its own thread, a long backfill doesn't hold up jobs saved meanwhile
+    _run_step(app, "Importing job signatures", _import_job_signatures)
+    _run_step(app, "Embedding stale job descriptions", _embed_stale_jobs,
+              os.path.join(app.instance_path, 'embeddings', 'backfill.lock'))
+
+
+def _job_maintenance(app):
+    # This process's background thread for everything slow behind the job routes: the recommendation index is
+    # built (or mapped) first so recommendations work as early as possible, then saved jobs are parsed and
+    # embedded as saveDes queues them, and the index is synced with the other workers in between
+    recommender = _run_step(app, "Building the job index", _build_recommender)
+    threading.Thread(target=_catch_up, args=(app,), name="job-catch-up", daemon=True).start()
+    while True:
+        try:
+            job_id = _saved_jobs.get(timeout=JOB_INDEX_SYNC_SECONDS)
+        except queue.Empty:
+            job_id = None
+        if job_id is not None:
+            _run_step(app, f"Processing job description {job_id}", _process_saved_job, job_id)
+        if recommender is None:
+            recommender = _run_step(app, "Building the job index", _build_recommender)
+        if recommender is not None:
+            _run_step(app, "Syncing the job index", _sync_recommender, recommender)
+
+
+def _start_job_maintenance(app):
+    def start():
+        thread = threading.Thread(target=_job_maintenance, args=(app,), name="job-maintenance", daemon=True)
+        thread.start()
+        return thread
+
+    return model_registry.get_or_load(("job_maintenance", document_embedding_tag()), start)
+
 
 @job_blueprint.route("/api/job/submitDes", methods = ['POST'])
 def submit_description():
@@ -8,4 +141,64 @@ def submit_description():
 
 @job_blueprint.route("/api/job/saveDes", methods = ['POST'])
 def save_description():
-    return jsonify({'message': 'Job description saved successfully'})
\ No newline at end of file
+    data = request.get_json(silent=True) or {}
+    missing = [field for field in ('user_id', 'title', 'company', 'content') if not data.get(field)]
+    if missing:
+        return jsonify({'message': f'Missing fields: {", ".join(missing)}'}), 400
+
+    job = JobDescription(user_id=data['user_id'], title=data['title'], company=data['company'], content=data['content'])
+
+    # A cross-posted copy of a job we already have reuses its parse and embedding. Everything else that's slow
+    # (parsing, BERT, the recommendation index) happens on the maintenance thread after the response
+    from similar import get_shared_index
+    _start_job_maintenance(current_app._get_current_object())
+    duplicates = get_shared_index('job')
+    signature = duplicates.hasher.signature(job.content)
+    duplicate = duplicates.find_duplicate(signature=signature)
+    original = db.session.get(JobDescription, duplicate[0]) if duplicate else None
+    tag = document_embedding_tag()
+    if original is not None and original.parsed_data:
+        job.parsed_data = original.parsed_data
+        job.keywords = original.keywords
+        if original.get_embedding(tag) is not None:
+            job.set_embedding(original.get_embedding(tag), tag)
+    db.session.add(job)
+    db.session.commit()
+    duplicates.add(job.id, signature=signature)
+    _saved_jobs.put(job.id)
+
+    return jsonify({
+        'message': 'Job description saved successfully',
+        'job_id': job.id,
+        'duplicate_of': {'job_id': duplicate[0], 'similarity': round(duplicate[1], 3)} if duplicate else None,
+    })
+
+@job_blueprint.route("/api/job/recommend", methods = ['GET'])
+def recommend_jobs():
+    resume = db.session.get(Resume, request.args.get('resume_id', type=int)) if request.args.get('resume_id') else None
+    if resume is None:
+        return jsonify({'message': 'resume_id must refer to an existing resume'}), 404
+    parsed = resume.get_parsed_data()
+    if not parsed:
+        return jsonify({'message': 'Resume has not been parsed yet'}), 409
+
+    from reccomendation import get_shared_recommender
+    k = min(request.args.get('k', 10, type=int), 100)
+    vector = ensure_embedding(resume, parsed.get('raw_text', ''), document_embedding_tag())
+    if vector is None:
+        return jsonify({'message': 'Resume embedding is not available'}), 503
+    db.session.commit()  # keeps the vector if it was just computed
+    # The index is built and kept in sync by the maintenance thread, never by a request
+    _start_job_maintenance(current_app._get_current_object())
+    recommender = get_shared_recommender(create=False, model_tag=document_embedding_tag())
+    if recommender is None:
+        return jsonify({'message': 'Job recommendations are still being prepared, try again shortly'}), 503
+    matches = recommender.recommend_vector(vector, k)
+    jobs = {job.id: job for job in JobDescription.query.filter(JobDescription.id.in_([job_id for job_id, _ in matches]))}
+    return jsonify({
+        'message': 'Recommendations generated successfully',
+        'recommendations': [
+            {'job_id': job_id, 'title': jobs[job_id].title, 'company': jobs[job_id].company, 'score': round(score, 4)}
+            for job_id, score in matches if job_id in jobs
+        ],
+    })
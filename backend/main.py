@@ -1,6 +1,9 @@
+import os
 from flask import Flask
 from flask_cors import CORS
 from database import init_db
+import model_registry
+from log_config import configure_logging
 
 # Import all blueprints
 from auth_route import auth_blueprint
@@ -8,14 +11,22 @@ from resume_route import resume_blueprint
 from job_route import job_blueprint
 from profile_route import profile_blueprint
 from analysis_route import analysis_blueprint
+from metrics_route import metrics_blueprint
 
-def create_app():
+def create_app(warm_models=None):
+
+    # Parser logging: RESUMEAI_QUIET=1 in production keeps the hot paths from formatting any log messages
+    configure_logging()
 
     app = Flask(__name__)
     
     # Configure app settings
     app.config['DEBUG'] = True
     app.config['SECRET_KEY'] = "ere8enaworo33910202nrweraweraewr!aeba,hsebrae"
+    # Load BERT/spaCy/NLTK at startup instead of on the first request that needs them
+    if warm_models is None:
+        warm_models = os.environ.get('RESUMEAI_WARM_MODELS', '0') == '1'
+    app.config['WARM_MODELS'] = warm_models
     
     # Initialize database
     try:
@@ -34,8 +45,17 @@ def create_app():
     app.register_blueprint(job_blueprint)
     app.register_blueprint(profile_blueprint)
     app.register_blueprint(analysis_blueprint)
+    app.register_blueprint(metrics_blueprint)
     
     print("All blueprints registered successfully!")
+
+    if app.config['WARM_MODELS']:
+        try:
+            model_registry.warm_up()
+            print("Models warmed up successfully!")
+        except Exception as e:
+            # A missing model shouldn't stop the app, it will just load (or fail) on first use
+            print(f"Model warm up failed: {e}")
     
     return app
 
@@ -0,0 +1,267 @@
+#Resume to job matching, used by /api/analysis/compare.
+#Everything here works on data that was already parsed (Resume.parsed_data and JobDescription.parsed_data),
+#so scoring is set lookups plus a few small matrix products and stays well under 100 ms:
+#   skills      share of the job's technical skills the resume has, exactly or through a close skill
+#               (half credit, centred cosine similarity of the cached skill prompt embeddings)
+#   keywords    share of the job's key nouns, verbs and soft skills that appear in the resume
+#   semantic    cosine similarity of the two documents' BERT embeddings, read from the rows (embedding_store)
+#               or cached by text hash
+#match_percentage is the weighted sum of the parts that could be computed.
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+import model_registry
+from log_config import get_logger
+
+logger = get_logger("match_scoring")
+
+SCORE_WEIGHTS = {"skills": 0.5, "keywords": 0.3, "semantic": 0.2}
+#a missing skill earns partial credit when the resume has a related one. Raw cosine similarity can't tell:
+#every transformer skill prompt is "experience with <skill>" and CLS vectors of any two texts point mostly the
+#same way, so unrelated skills score well above 0.85. The skill vectors are centred first (the mean of the whole
+#skill vocabulary is subtracted, leaving only what sets each skill apart) and only close neighbours count
+SKILL_SIMILARITY_THRESHOLD = 0.6 #centred cosine similarity a related skill needs
+RELATED_SKILL_CREDIT = 0.5 #what a related skill is worth, an exact (or inflected) match is worth 1
+MAX_NGRAM = 3 #longest skill phrase we look for in resume text ("continuous integration deployment")
+MAX_IMPROVEMENTS = 10
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+_TERM_SEPARATOR = re.compile(r'[\s\-/]+')
+
+
+def normalize_term(term: str) -> str:
+    #same normalization as job_parser so "Problem-Solving" and "problem solving" compare equal
+    return ' '.join(part for part in _TERM_SEPARATOR.split(term.lower()) if part).strip('.')
+
+
+def _base_forms(word: str) -> Iterable[str]:
+    #job keywords are lemmatized ("team", "build"), this catches the common inflections on the resume side
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        yield word[:-1]
+    if len(word) > 5 and word.endswith('ing'):
+        yield word[:-3]
+    if len(word) > 4 and word.endswith('ed'):
+        yield word[:-2]
+
+
+def text_terms(text: str, max_ngram: int = MAX_NGRAM) -> Set[str]:
+    #every word and every phrase of up to max_ngram words, so multi word skills are a set lookup
+    words = [word.rstrip('.') for word in _WORD.findall(text.lower())]
+    terms = set(words)
+    for word in list(terms):
+        terms.update(_base_forms(word))
+    for n in range(2, max_ngram + 1):
+        terms.update(' '.join(words[i:i + n]) for i in range(len(words) - n + 1))
+    return terms
+
+
+def resume_terms(parsed_resume: Dict) -> Set[str]:
+    terms = text_terms(parsed_resume.get("raw_text", ""))
+    terms.update(normalize_term(skill) for skill in parsed_resume.get("skills", []))
+    return terms
+
+
+def job_skills(parsed_job: Dict) -> List[Tuple[str, str]]:
+    #(category, skill) for every technical skill the job asks for
+    return [(category, skill) for category, skills in parsed_job.get("technical_skills", {}).items() for skill in skills]
+
+
+def job_keywords(parsed_job: Dict) -> Set[str]:
+    keywords = parsed_job.get("nltk_keywords", {})
+    terms = set(keywords.get("nouns", [])) | set(keywords.get("verbs", [])) | set(parsed_job.get("soft_skills", []))
+    return {normalize_term(term) for term in terms if term}
+
+
+def has_term(term: str, have: Set[str]) -> bool:
+    #exact match, or the resume has the singular/base form ("microservices" when it says "microservice")
+    return term in have or any(form in have for form in _base_forms(term))
+
+
+def centre_rows(matrix: np.ndarray) -> np.ndarray:
+    #subtracts the mean row and normalizes again, so the dot product measures only what sets rows apart
+    centred = matrix - matrix.mean(axis=0, keepdims=True)
+    norms = np.linalg.norm(centred, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return centred / norms
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b)) / norm if norm else 0.0
+
+
+class EmbeddingCache:
+    #document vectors keyed by a hash of the text, so each resume and job is embedded once per process
+    def __init__(self, embed: Callable[[List[str]], np.ndarray], max_items: int = 1024):
+        self.embed = embed
+        self.max_items = max_items
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> np.ndarray:
+        #normalized vectors for every text, the missing ones are embedded together in one batch
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            found = {key: self._vectors[key] for key in keys if key in self._vectors}
+            for key in found:
+                self._vectors.move_to_end(key)
+        missing = [(key, text) for key, text in zip(keys, texts) if key not in found]
+        if missing:
+            vectors = np.asarray(self.embed([text for _, text in missing]), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+            with self._lock:
+                for (key, _), vector in zip(missing, vectors):
+                    found[key] = self._vectors[key] = vector
+                while len(self._vectors) > self.max_items:
+                    self._vectors.popitem(last=False)
+        return np.stack([found[key] for key in keys])
+
+
+class MatchScorer:
+    """Scores a parsed resume against a parsed job description
+
+    skill_matrix/skill_labels are the job parser's normalized skill prompt embeddings (one row per
+    (category, skill)), embeddings is an EmbeddingCache for whole documents. Either can be None, the
+    matching part of the score is then left out and the weights of the others are scaled up.
+    """
+
+    def __init__(self, skill_matrix: Optional[np.ndarray] = None,
+                 skill_labels: Optional[List[Tuple[str, str]]] = None,
+                 embeddings: Optional[EmbeddingCache] = None):
+        self.embeddings = embeddings
+        #centred once here, related skills are looked up in this copy (see SKILL_SIMILARITY_THRESHOLD)
+        self.skill_matrix = None if skill_matrix is None else centre_rows(np.asarray(skill_matrix, dtype=np.float32))
+        #normalized skill name -> row of the skill matrix
+        self._skill_rows = {normalize_term(skill): row for row, (_, skill) in enumerate(skill_labels or [])}
+
+    def _skill_scores(self, required: List[Tuple[str, str]], have: Set[str]) -> Tuple[np.ndarray, List[str]]:
+        #1.0 for every required skill the resume has, RELATED_SKILL_CREDIT when it has a close one, 0 otherwise
+        names = [normalize_term(skill) for _, skill in required]
+        scores = np.array([1.0 if has_term(name, have) else 0.0 for name in names], dtype=np.float32)
+        missing = np.flatnonzero(scores == 0)
+        if self.skill_matrix is None or not len(missing):
+            return scores, names
+
+        #rows of the skills the resume does have, compared against every missing one in a single product
+        resume_rows = [row for name, row in self._skill_rows.items() if has_term(name, have)]
+        missing_rows = [(i, self._skill_rows[names[i]]) for i in missing if names[i] in self._skill_rows]
+        if resume_rows and missing_rows:
+            similarity = self.skill_matrix[[row for _, row in missing_rows]] @ self.skill_matrix[resume_rows].T
+            best = similarity.max(axis=1)
+            for (i, _), value in zip(missing_rows, best):
+                if value >= SKILL_SIMILARITY_THRESHOLD:
+                    scores[i] = RELATED_SKILL_CREDIT
+        return scores, names
+
+    def score(self, parsed_resume: Dict, parsed_job: Dict, job_text: Optional[str] = None,
+              resume_vector: Optional[np.ndarray] = None, job_vector: Optional[np.ndarray] = None) -> Dict:
+        #resume_vector/job_vector are stored document embeddings, when both are given BERT is never touched
+        have = resume_terms(parsed_resume)
+        parts: Dict[str, float] = {}
+        details: Dict = {}
+
+        required = job_skills(parsed_job)
+        if required:
+            skill_scores, names = self._skill_scores(required, have)
+            parts["skills"] = float(skill_scores.mean())
+            details["matched_skills"] = [skill for (_, skill), value in zip(required, skill_scores) if value == 1.0]
+            details["related_skills"] = [skill for (_, skill), value in zip(required, skill_scores) if 0 < value < 1.0]
+            details["missing_skills"] = [skill for (_, skill), value in zip(required, skill_scores) if value == 0]
+
+        keywords = job_keywords(parsed_job)
+        if keywords:
+            matched = keywords & have
+            parts["keywords"] = len(matched) / len(keywords)
+            details["matched_keywords"] = sorted(matched)
+            details["missing_keywords"] = sorted(keywords - matched)
+
+        resume_text = parsed_resume.get("raw_text", "")
+        if resume_vector is not None and job_vector is not None:
+            parts["semantic"] = max(0.0, cosine_similarity(resume_vector, job_vector))
+        elif self.embeddings is not None and job_text and resume_text:
+            try:
+                resume_vector, job_vector = self.embeddings.get_many([resume_text, job_text])
+                parts["semantic"] = max(0.0, float(resume_vector @ job_vector))
+            except Exception as e:
+                logger.warning("semantic similarity unavailable: %s", e)
+
+        weight = sum(SCORE_WEIGHTS[name] for name in parts)
+        match = sum(SCORE_WEIGHTS[name] * value for name, value in parts.items()) / weight if weight else 0.0
+        return {
+            "match_percentage": round(match * 100, 1),
+            "keywords_match": round(parts.get("keywords", 0.0) * 100, 1),
+            "skills_allignment": skills_alignment_label(parts.get("skills")),
+            "format_compatibality": format_compatibility(parsed_resume),
+            "scores": {name: round(value, 4) for name, value in parts.items()},
+            "improvements": improvements(details, parsed_resume),
+            **details,
+        }
+
+
+def skills_alignment_label(skill_score: Optional[float]) -> str:
+    if skill_score is None:
+        return "not applicable"
+    if skill_score >= 0.75:
+        return "strong"
+    if skill_score >= 0.45:
+        return "moderate"
+    return "weak"
+
+
+def format_compatibility(parsed_resume: Dict) -> str:
+    #how well the resume's structure survives an applicant tracking system, from what the parser could find
+    checks = [
+        bool(parsed_resume.get("personal_info", {}).get("email")),
+        bool(parsed_resume.get("personal_info", {}).get("phone")),
+        bool(parsed_resume.get("experience")),
+        bool(parsed_resume.get("education")),
+        bool(parsed_resume.get("skills")),
+        200 <= parsed_resume.get("metadata", {}).get("word_count", 0) <= 1500,
+    ]
+    passed = sum(checks)
+    if passed >= 5:
+        return "good"
+    if passed >= 3:
+        return "fair"
+    return "poor"
+
+
+def improvements(details: Dict, parsed_resume: Dict) -> List[str]:
+    suggestions = [f"Add experience with {skill} if you have it" for skill in details.get("missing_skills", [])]
+    suggestions += [f"Mention {keyword} in your resume" for keyword in details.get("missing_keywords", [])[:3]]
+    if not parsed_resume.get("skills"):
+        suggestions.append("Add a dedicated skills section")
+    return suggestions[:MAX_IMPROVEMENTS]
+
+
+#used while the models can't be loaded, it holds no embeddings so there is nothing in it to go stale
+_keyword_scorer = MatchScorer()
+
+
+def get_shared_scorer() -> MatchScorer:
+    #the scorer used by the routes. It borrows the shared job parser's skill matrix and BERT, and falls back
+    #to plain keyword and skill overlap when the models aren't available. The fallback isn't cached, the
+    #next request tries the models again
+    def load():
+        from job_parser import get_shared_job_parser
+        job_parser = get_shared_job_parser()
+        skill_matrix, labels = job_parser.get_skill_matrix()
+        return MatchScorer(skill_matrix, labels, EmbeddingCache(job_parser.embed_documents))
+
+    try:
+        return model_registry.get_or_load("match_scorer", load)
+    except Exception as e:
+        logger.warning("embeddings unavailable, scoring on keywords and skills only: %s", e)
+        return _keyword_scorer
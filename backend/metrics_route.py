@@ -0,0 +1,11 @@
+from flask import Blueprint, Response
+from profiling import render_metrics
+from parse_cache import render_cache_metrics
+from parse_queue import render_queue_metrics
+
+metrics_blueprint = Blueprint('metrics', __name__)
+
+@metrics_blueprint.route('/api/metrics', methods=['GET'])
+def metrics():
+    # Per-stage parser timing histograms, parse cache counters and parse queue depth in Prometheus text format, ready to be scraped
+    return Response(render_metrics() + render_cache_metrics() + render_queue_metrics(), mimetype='text/plain; version=0.0.4')
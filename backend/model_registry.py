@@ -0,0 +1,178 @@
+#This module keeps one copy of every heavy model per process.
+#Loading BERT or spaCy takes seconds, so instead of every parser (and every Flask request)
+#loading its own copy, they all ask the registry, which loads each model the first time
+#it is needed and hands back the same object after that.
+
+import os
+import threading #used so two requests can't load the same model at the same time
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+from log_config import get_logger
+
+logger = get_logger("model_registry")
+
+_models: Dict[Hashable, Any] = {} #everything that has been loaded so far, keyed by name
+_key_locks: Dict[Hashable, threading.Lock] = {} #one lock per model so loading BERT doesn't block spaCy
+_registry_lock = threading.Lock() #only guards the two dicts above
+
+#we store this instead of None when a load failed, so we don't retry a missing model on every request
+_MISSING = object()
+
+
+def get_or_load(key: Hashable, loader: Callable[[], Any]) -> Any:
+    #returns the cached object for key, calling loader exactly once per process to create it
+    value = _models.get(key, None)
+    if value is not None:
+        return None if value is _MISSING else value
+
+    with _registry_lock:
+        lock = _key_locks.setdefault(key, threading.Lock())
+
+    with lock:
+        #another thread may have finished loading while we waited for the lock
+        if key not in _models:
+            loaded = loader()
+            _models[key] = _MISSING if loaded is None else loaded
+        value = _models[key]
+    return None if value is _MISSING else value
+
+
+def is_loaded(key: Hashable) -> bool:
+    return key in _models
+
+
+def clear():
+    #drops every cached model, mostly useful for tests and for freeing memory in long running scripts
+    with _registry_lock:
+        _models.clear()
+        _key_locks.clear()
+
+
+def get_tokenizer(model_name: str = "bert-base-uncased") -> Any:
+    #just the tokenizer, enough for processes that send their BERT work to an inference server
+    def load():
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name)
+
+    return get_or_load(("tokenizer", model_name), load)
+
+
+def configure_torch_threads(threads: Optional[int] = None) -> int:
+    #pins torch's intra-op thread count once per process. By default every worker process uses every core,
+    #so N gunicorn workers (WEB_CONCURRENCY) each running BERT oversubscribe the CPU N times over.
+    #RESUMEAI_TORCH_THREADS sets the count explicitly, otherwise the cores are split between the workers
+    def load():
+        import torch
+        count = threads or int(os.environ.get("RESUMEAI_TORCH_THREADS", "0")) or \
+            max(1, (os.cpu_count() or 1) // max(1, int(os.environ.get("WEB_CONCURRENCY", "1"))))
+        torch.set_num_threads(count)
+        try:
+            torch.set_num_interop_threads(1) #we never run independent ops side by side
+        except RuntimeError:
+            pass #only allowed before torch has run anything in parallel
+        logger.info("torch uses %s intra-op threads", count)
+        return count
+
+    return get_or_load("torch_threads", load)
+
+
+def get_bert(model_name: str = "bert-base-uncased", quantized: bool = False) -> Tuple[Any, Any]:
+    #returns (tokenizer, model) for a Hugging Face model, shared across every job parser.
+    #quantized=True is the CPU fast mode: int8 weights for every Linear layer (dynamic quantization,
+    #activations are quantized on the fly), with the torch thread count pinned for this worker
+    def load():
+        from transformers import AutoModel
+        tokenizer = get_tokenizer(model_name)
+        model = AutoModel.from_pretrained(model_name)
+        model.eval() #we only ever run inference, this turns off dropout
+        if quantized:
+            import torch
+            quantization = getattr(getattr(torch, "ao", None), "quantization", None) or torch.quantization
+            model = quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            configure_torch_threads()
+        elif os.environ.get("RESUMEAI_TORCH_THREADS"):
+            configure_torch_threads()
+        return tokenizer, model
+
+    return get_or_load(("bert", model_name, "int8") if quantized else ("bert", model_name), load)
+
+
+def get_spacy(model_name: str = "en_core_web_sm", components: Optional[Sequence[str]] = None) -> Optional[Any]:
+    #returns the spaCy pipeline, or None if spaCy or the model isn't installed.
+    #with components only those pipes run (plus a shared tok2vec if one of them listens to it),
+    #the rest of the pipeline is disabled so it costs nothing per document
+    def load():
+        try:
+            import spacy
+        except ImportError:
+            logger.warning("spaCy not available. Install it with: pip install spacy")
+            return None
+        try:
+            nlp = spacy.load(model_name)
+        except OSError:
+            logger.warning("Could not load spaCy model %s", model_name)
+            return None
+        if components is not None:
+            keep = set(components)
+            if "tok2vec" in nlp.pipe_names and keep & set(getattr(nlp.get_pipe("tok2vec"), "listening_components", [])):
+                keep.add("tok2vec")
+            nlp.select_pipes(enable=[name for name in nlp.pipe_names if name in keep])
+        logger.info("Loaded spaCy model %s with pipes %s", model_name, nlp.pipe_names)
+        return nlp
+
+    key = ("spacy", model_name) if components is None else ("spacy", model_name, tuple(components))
+    return get_or_load(key, load)
+
+
+def ensure_nltk_data() -> bool:
+    #checks the nltk corpora once per process and downloads whatever is missing,
+    #this used to run every time job_parser was imported
+    def load():
+        import nltk
+        resources = {
+            'punkt': 'tokenizers/punkt',
+            'stopwords': 'corpora/stopwords',
+            'averaged_perceptron_tagger': 'taggers/averaged_perceptron_tagger',
+            'wordnet': 'corpora/wordnet',
+        }
+        for package, path in resources.items():
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                nltk.download(package)
+        return True
+
+    return get_or_load("nltk_data", load)
+
+
+def get_stopwords(language: str = "english") -> frozenset:
+    def load():
+        ensure_nltk_data()
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words(language))
+
+    return get_or_load(("nltk_stopwords", language), load)
+
+
+def get_lemmatizer() -> Any:
+    def load():
+        ensure_nltk_data()
+        from nltk.stem import WordNetLemmatizer
+        return WordNetLemmatizer()
+
+    return get_or_load("nltk_lemmatizer", load)
+
+
+def warm_up(bert: bool = True, spacy: bool = True, nltk: bool = True,
+            spacy_model_name: str = "en_core_web_sm", spacy_components: Optional[Sequence[str]] = ("ner",),
+            embedding_backend: Optional[str] = None, bert_quantized: Optional[bool] = None):
+    #loads everything up front, called from create_app so the first request doesn't pay for it
+    if nltk:
+        get_stopwords()
+        get_lemmatizer()
+    if spacy:
+        get_spacy(spacy_model_name, spacy_components) #same trimmed pipeline ResumeParser asks for
+    if bert:
+        #the job parser's embedding backend (BERT unless RESUMEAI_EMBEDDING_BACKEND says otherwise).
+        #with an inference server configured this only connects to it, the model is loaded over there
+        from embedding_backends import get_backend
+        get_backend(embedding_backend, bert_quantized)
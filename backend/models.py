@@ -8,6 +8,11 @@ from flask import Flask
 from datetime import datetime
 import json
 from flask_sqlalchemy import SQLAlchemy 
+from sqlalchemy import event, inspect
+from embedding_store import decode_vector, encode_vector
+from log_config import get_logger
+
+logger = get_logger("models")
 
 
 db = SQLAlchemy() #sql instance
@@ -24,7 +29,26 @@ class User(db.Model):
 
  
 
-class Resume(db.Model):
+class EmbeddingMixin:
+  #the document's BERT vector, stored once on save so comparisons never need the model (see embedding_store.py)
+  embedding = db.Column(db.LargeBinary)
+  embedding_model = db.Column(db.String(200)) #which model and version produced it, other versions count as missing
+
+  def get_embedding(self, model_tag=None):
+    if self.embedding is None or (model_tag is not None and self.embedding_model != model_tag):
+      return None
+    return decode_vector(self.embedding)
+
+  def set_embedding(self, vector, model_tag):
+    self.embedding = encode_vector(vector)
+    self.embedding_model = model_tag
+
+  def clear_embedding(self):
+    self.embedding = None
+    self.embedding_model = None
+
+
+class Resume(EmbeddingMixin, db.Model):
   __tablename__ = "resume"
   id = db.Column(db.Integer, primary_key = True)
   user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable = False)
@@ -46,7 +70,7 @@ class Resume(db.Model):
     # so to simplify everything, set just sets the databse somewhere for the computer and converts it into strings 
     #get just gets it for later when u need it again and need to work with it
 
-class JobDescription(db.Model):
+class JobDescription(EmbeddingMixin, db.Model):
   __tablename__ = "description"
   id = db.Column(db.Integer, primary_key = True)
   user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
@@ -54,6 +78,7 @@ class JobDescription(db.Model):
   company = db.Column(db.String(100), nullable = False)
   content = db.Column(db.Text)
   keywords = db.Column(db.Text)
+  parsed_data = db.Column(db.Text) #the AdvancedJobDescriptionParser output as JSON, so matching never has to reparse
   created_at  = db.Column(db.DateTime, default = datetime.utcnow)
   user = db.relationship('User', backref ='description' ) #Hey, this thing belongs to a user." And the backref part just makes it easy to go the other way too — so from a user, you can quickly grab their descriptions.
  
@@ -64,6 +89,39 @@ class JobDescription(db.Model):
   def set_keywords(self, keywords_list):
     self.keywords = json.dumps(keywords_list)
 
+  def get_parsed_data(self):
+    if self.parsed_data:
+      return json.loads(self.parsed_data)
+    return {}
+
+  def set_parsed_data(self, data_dict):
+    self.parsed_data = json.dumps(data_dict)
+
+#the stored vector, parse, keywords and near-duplicate signature are only valid for the text they were computed
+#from, so editing the text of a saved job drops them (compare parses it again, the backfill embeds it again).
+#a job that's still being built isn't an edit, its parse is set right after its content
+@event.listens_for(JobDescription.content, 'set', active_history=True)
+def _job_content_changed(target, value, oldvalue, initiator):
+  if value != oldvalue:
+    target.clear_embedding()
+    if inspect(target).has_identity:
+      target.parsed_data = None
+      target.keywords = None
+
+@event.listens_for(JobDescription, 'after_update')
+def _job_updated(mapper, connection, target):
+  if inspect(target).attrs.content.history.has_changes():
+    try:
+      from similar import get_shared_index
+      get_shared_index('job').add(target.id, target.content or '') #replaces the old signature (no text removes it)
+    except Exception as e:
+      logger.warning("could not update the near-duplicate signature of job %s: %s", target.id, e)
+
+@event.listens_for(Resume.parsed_data, 'set')
+def _resume_parsed_data_changed(target, value, oldvalue, initiator):
+  if value != oldvalue:
+    target.clear_embedding()
+
 class AnalysisResult(db.Model):
   id = db.Column(db.Integer, primary_key = True)
   user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
@@ -0,0 +1,246 @@
+#Content addressed cache for parsed resumes.
+#People re-upload the same file and we re-analyze the same resume against new jobs, so parse_resume
+#looks the file up by the SHA-256 of its bytes (plus the parser version) before opening it.
+#There are two tiers: a small in-memory LRU for the hot set, and a SQLite file on disk that survives restarts
+#and is shared by every worker process. Both tiers have size limits and evict the least recently used entries.
+#the disk tier keeps its total size in a one-row table that every write updates in the same transaction, so a
+#put never has to sum the whole table, and eviction takes the oldest rows a small batch at a time.
+#
+#environment variables:
+#   RESUMEAI_PARSE_CACHE=0          turn the cache off
+#   RESUMEAI_PARSE_CACHE_PATH       SQLite file (default instance/parse_cache.db)
+#   RESUMEAI_PARSE_CACHE_MEMORY     max entries in memory (default 256)
+#   RESUMEAI_PARSE_CACHE_DISK_MB    max size of the disk tier in MB (default 512)
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from log_config import get_logger
+
+logger = get_logger("parse_cache")
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'parse_cache.db')
+_HASH_CHUNK_SIZE = 1024 * 1024
+_EVICT_BATCH = 32 #rows read per eviction query
+
+
+def file_sha256(file_path: str) -> str:
+    #streams the file so big uploads are never fully in memory
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(content_hash: str, parser_version: str) -> str:
+    return f"{parser_version}:{content_hash}"
+
+
+class ParseCache:
+    """Two-tier (memory LRU + SQLite) cache of parse results keyed by content hash and parser version"""
+
+    def __init__(self, db_path: Optional[str] = DEFAULT_CACHE_PATH, max_memory_items: int = 256,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        #values are stored as JSON strings so every hit hands out a fresh copy the caller can change
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0 #size of the disk tier as of our last write, the shared total is in parse_cache_size
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0,
+                      "memory_evictions": 0, "disk_evictions": 0}
+        if db_path:
+            self._open_db()
+
+    def _open_db(self):
+        try:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL") #readers in other workers don't block writers
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS parse_cache_last_access ON parse_cache(last_access)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+            )
+            #summed once, when the file is new or was made before the total was kept
+            self._conn.execute(
+                "INSERT OR IGNORE INTO parse_cache_size (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM parse_cache"
+            )
+            self._conn.commit()
+            self._disk_bytes = self._conn.execute("SELECT total FROM parse_cache_size WHERE id = 0").fetchone()[0]
+        except sqlite3.Error as e:
+            #a broken disk tier shouldn't break parsing, we just run memory only
+            logger.warning("parse cache disk tier disabled (%s): %s", self.db_path, e)
+            self._conn = None
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return json.loads(value)
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute("SELECT value FROM parse_cache WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        self._conn.execute("UPDATE parse_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+                        self._conn.commit()
+                        self.stats["disk_hits"] += 1
+                        self._remember(key, row[0])
+                        return json.loads(row[0])
+                except sqlite3.Error as e:
+                    logger.warning("parse cache read failed: %s", e)
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, data: Dict):
+        value = json.dumps(data, default=str)
+        with self._lock:
+            self.stats["puts"] += 1
+            self._remember(key, value)
+            if self._conn is None:
+                return
+            try:
+                now = time.time()
+                self._conn.execute("BEGIN IMMEDIATE") #the size total and the row change together
+                replaced = self._conn.execute("SELECT size FROM parse_cache WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO parse_cache (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now),
+                )
+                self._add_disk_bytes(len(value) - (replaced[0] if replaced else 0))
+                self._evict_disk()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._rollback()
+                logger.warning("parse cache write failed: %s", e)
+
+    def _remember(self, key: str, value: str):
+        #memory tier insert, caller holds the lock
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+    def _add_disk_bytes(self, delta: int):
+        #adjusts the shared size total, caller holds the lock and is inside a write transaction
+        self._conn.execute("UPDATE parse_cache_size SET total = total + ? WHERE id = 0", (delta,))
+        self._disk_bytes = self._conn.execute("SELECT total FROM parse_cache_size WHERE id = 0").fetchone()[0]
+
+    def _evict_disk(self):
+        #drops least recently used rows until the disk tier is under its size limit, caller holds the lock.
+        #reads the oldest rows through the last_access index a batch at a time, never the whole table
+        while self._disk_bytes > self.max_disk_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM parse_cache ORDER BY last_access ASC LIMIT ?", (_EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            excess, evicted = self._disk_bytes - self.max_disk_bytes, []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                evicted.append((key,))
+                excess -= size
+            self._conn.executemany("DELETE FROM parse_cache WHERE key = ?", evicted)
+            self._add_disk_bytes(-sum(size for _, size in rows[:len(evicted)]))
+            self.stats["disk_evictions"] += len(evicted)
+
+    def _rollback(self):
+        try:
+            self._conn.rollback()
+        except sqlite3.Error:
+            pass
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._conn is not None:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute("SELECT size FROM parse_cache WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        self._conn.execute("DELETE FROM parse_cache WHERE key = ?", (key,))
+                        self._add_disk_bytes(-row[0])
+                    self._conn.commit()
+                except BaseException:
+                    self._rollback()
+                    raise
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM parse_cache")
+                self._conn.execute("UPDATE parse_cache_size SET total = 0 WHERE id = 0")
+                self._conn.commit()
+                self._disk_bytes = 0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_items"] = len(self._memory)
+            if self._conn is not None:
+                stats["disk_items"] = self._conn.execute("SELECT COUNT(*) FROM parse_cache").fetchone()[0]
+                stats["disk_bytes"] = self._conn.execute("SELECT total FROM parse_cache_size WHERE id = 0").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_default_cache: Optional[ParseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ParseCache]:
+    #the process-wide cache configured from the environment, or None when caching is turned off
+    global _default_cache
+    if os.environ.get("RESUMEAI_PARSE_CACHE", "1") == "0":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ParseCache(
+                db_path=os.environ.get("RESUMEAI_PARSE_CACHE_PATH", DEFAULT_CACHE_PATH),
+                max_memory_items=int(os.environ.get("RESUMEAI_PARSE_CACHE_MEMORY", "256")),
+                max_disk_bytes=int(os.environ.get("RESUMEAI_PARSE_CACHE_DISK_MB", "512")) * 1024 * 1024,
+            )
+        return _default_cache
+
+
+def render_cache_metrics() -> str:
+    #hit/miss/eviction counters of the process-wide cache in Prometheus text format (empty until it's used)
+    if _default_cache is None:
+        return ""
+    stats = _default_cache.get_stats()
+    lines = []
+    for name in ("memory_hits", "disk_hits", "misses", "puts", "memory_evictions", "disk_evictions"):
+        lines.append(f"# TYPE resumeai_parse_cache_{name}_total counter")
+        lines.append(f"resumeai_parse_cache_{name}_total {stats[name]}")
+    for name in ("memory_items", "disk_items", "disk_bytes"):
+        if name in stats:
+            lines.append(f"# TYPE resumeai_parse_cache_{name} gauge")
+            lines.append(f"resumeai_parse_cache_{name} {stats[name]}")
+    return "\n".join(lines) + "\n"
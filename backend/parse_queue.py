@@ -0,0 +1,429 @@
+#Background parsing of uploaded resumes.
+#Parsing takes seconds (PDF extraction + spaCy), so /api/resume/upload only stores the file, creates the Resume
+#row and enqueues a parse job, and answers right away with the job id. Jobs live in a small SQLite file (no
+#broker to run), a ParseWorkerPool drains it: a dispatcher thread claims jobs and hands the files to a pool
+#of worker processes, each with its own ResumeParser, and writes every result to Resume.parsed_data.
+#the resume's document vector is stored with the parse result, so a later comparison doesn't have to compute
+#it. The workers embed only when a standalone inference server is configured (RESUMEAI_INFERENCE=host:port or
+#a socket, see inference_server.py): they just tokenize and every worker shares the server's BERT. Otherwise
+#the dispatcher embeds in its own process, a worker holding BERT would cost one model per worker.
+#
+#a claimed job holds a lease tagged with the claiming pool. The pool renews the leases of its jobs while
+#they run, and if the process working on it dies the lease runs out and another pool picks the job up again,
+#up to max_attempts times. A file that fails to parse is marked failed right away, parsing it again would
+#fail the same way. A worker that crashes takes the whole process pool down: the pool is rebuilt once and
+#every job it was running goes back in the queue. With several jobs running it isn't known which one did it,
+#so none of them is charged an attempt and the pool runs them one at a time until the crash is pinned on one.
+#
+#environment variables:
+#   RESUMEAI_PARSE_QUEUE_PATH       SQLite file (default instance/parse_queue.db)
+#   RESUMEAI_PARSE_WORKERS          worker processes the web app starts on its first upload (default 2),
+#                                   0 leaves the queue to a separate `python parse_queue.py --workers N`.
+#                                   each worker loads its own spaCy model and PDF engine (~150MB), BERT
+#                                   (~440MB) stays in the dispatcher's process or the inference server
+#   RESUMEAI_PARSE_LEASE            seconds a job may run before it's handed to another worker (default 300)
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from log_config import get_logger
+
+logger = get_logger("parse_queue")
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'parse_queue.db')
+STATUSES = ("queued", "running", "done", "failed")
+
+_worker_parser = None #the ResumeParser of this worker process, created once by _init_worker
+_worker_embeds = False #whether this worker embeds its resumes, see the header
+_MAX_BACKOFF = 60.0 #seconds the dispatcher waits at most after an error before trying again
+
+
+class ParseQueue:
+    """Durable FIFO of parse jobs in SQLite, safe to share between threads and processes"""
+
+    def __init__(self, db_path: str = DEFAULT_QUEUE_PATH, lease_seconds: float = 300, max_attempts: int = 3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event() #set on enqueue so a pool in this process doesn't wait for its next poll
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS parse_jobs ("
+            " id TEXT PRIMARY KEY, resume_id INTEGER NOT NULL, file_path TEXT NOT NULL, user_id INTEGER,"
+            " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, error TEXT,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL, lease_until REAL, lease_owner TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS parse_jobs_status ON parse_jobs(status, created_at)")
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(parse_jobs)")}
+        if "lease_owner" not in columns: #queue files made before leases had owners
+            try:
+                self._conn.execute("ALTER TABLE parse_jobs ADD COLUMN lease_owner TEXT")
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e):
+                    raise #otherwise another process added it first
+
+    def enqueue(self, resume_id: int, file_path: str, user_id: Optional[int] = None) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO parse_jobs (id, resume_id, file_path, user_id, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, resume_id, file_path, user_id, time.time()),
+            )
+        self._wakeup.set()
+        return job_id
+
+    def claim(self, limit: int = 1, owner: Optional[str] = None) -> List[Dict]:
+        #the oldest queued jobs (and running ones whose lease ran out), marked running under a new lease held
+        #by owner. BEGIN IMMEDIATE takes the write lock first, so two pools never claim the same job
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE parse_jobs SET status = 'failed', error = 'gave up after ' || attempts || ' attempts', finished_at = ?"
+                    " WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                rows = self._conn.execute(
+                    "SELECT * FROM parse_jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)"
+                    " ORDER BY created_at LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                for row in rows:
+                    self._conn.execute(
+                        "UPDATE parse_jobs SET status = 'running', attempts = attempts + 1, started_at = ?, lease_until = ?,"
+                        " lease_owner = ? WHERE id = ?",
+                        (now, now + self.lease_seconds, owner, row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [dict(row, status="running", attempts=row["attempts"] + 1, started_at=now,
+                     lease_until=now + self.lease_seconds, lease_owner=owner) for row in rows]
+
+    def renew(self, job_ids: List[str], owner: str) -> int:
+        #extends the leases owner still holds on job_ids, so they aren't handed to another pool while they run.
+        #returns how many it still held, a job whose lease ran out and was claimed by someone else isn't taken back
+        if not job_ids:
+            return 0
+        placeholders = ", ".join("?" * len(job_ids))
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE parse_jobs SET lease_until = ? WHERE status = 'running' AND lease_owner = ? AND id IN ({placeholders})",
+                (time.time() + self.lease_seconds, owner, *job_ids),
+            )
+        return cursor.rowcount
+
+    def complete(self, job_id: str):
+        self._finish(job_id, "done", None)
+
+    def fail(self, job_id: str, error: str, retry: bool = False, count_attempt: bool = True):
+        #retry puts the job back in the queue (until it runs out of attempts), otherwise it fails for good.
+        #count_attempt=False hands back the attempt the claim took, for failures that weren't the job's fault
+        if retry:
+            refund = 0 if count_attempt else 1
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE parse_jobs SET status = CASE WHEN attempts - ? >= ? THEN 'failed' ELSE 'queued' END,"
+                    " attempts = attempts - ?, error = ?, lease_until = NULL, lease_owner = NULL,"
+                    " finished_at = CASE WHEN attempts - ? >= ? THEN ? END WHERE id = ?",
+                    (refund, self.max_attempts, refund, error, refund, self.max_attempts, time.time(), job_id),
+                )
+            return
+        self._finish(job_id, "failed", error)
+
+    def _finish(self, job_id: str, status: str, error: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE parse_jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL, lease_owner = NULL WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM parse_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM parse_jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def wait_for_work(self, timeout: float):
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _init_worker(pdf_engine: Optional[str]):
+    global _worker_parser, _worker_embeds
+    import pdf_engines
+    from inference_server import standalone_server_configured
+    from log_config import configure_logging
+    from resume_paser import ResumeParser
+
+    configure_logging(quiet=True)
+    #each process parses a whole file, page-parallel extraction on top would oversubscribe the cores
+    pdf_engines.PARALLEL_PAGE_THRESHOLD = 0
+    _worker_parser = ResumeParser(pdf_engine=pdf_engine)
+    _worker_embeds = standalone_server_configured()
+
+
+def _parse_file(file_path: str, user_id: Optional[int]) -> Tuple[Dict, Optional[np.ndarray], str]:
+    #the parse result, its document vector (None if the worker doesn't embed or the model isn't available)
+    #and the vector's model tag
+    from embedding_store import embed_with_shared_parser
+    from job_parser import document_embedding_tag
+
+    parsed = _worker_parser.parse_resume(file_path, user_id)
+    vector = None
+    if _worker_embeds and parsed.get("raw_text"):
+        try:
+            vector = np.asarray(embed_with_shared_parser([parsed["raw_text"]]), dtype=np.float32)[0]
+        except Exception as e:
+            logger.warning("could not embed %s: %s", file_path, e) #the dispatcher embeds it
+    return parsed, vector, document_embedding_tag()
+
+
+class ParseWorkerPool:
+    """Drains a ParseQueue with `workers` processes and stores each result on its Resume row
+
+    app is the Flask app, results are written inside its app context. Call start() once, it returns at once.
+    """
+
+    def __init__(self, app, queue: ParseQueue, workers: int = 2, pdf_engine: Optional[str] = None,
+                 poll_interval: float = 1.0):
+        self.app = app
+        self.queue = queue
+        self.workers = max(1, workers)
+        self.pdf_engine = pdf_engine
+        self.poll_interval = poll_interval
+        self.owner = uuid.uuid4().hex #tags the leases of the jobs this pool claims
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = {} #future -> job
+        self._renewed_at = 0.0
+        self._isolate = 0 #jobs still to run one at a time after the pool broke under several of them
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="parse-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, wait_for_jobs: bool = True):
+        self._stop.set()
+        self.queue._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait_for_jobs)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        #spawn, not fork: the web process has threads (and maybe an open database connection) by now
+        return ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"),
+                                   initializer=_init_worker, initargs=(self.pdf_engine,))
+
+    def _run(self):
+        #one dispatch step per iteration. An error (the queue file locked for too long, the database down while
+        #storing results) is logged and retried after a back-off, it must not end the thread
+        backoff = self.poll_interval
+        while not self._stop.is_set():
+            try:
+                try:
+                    self._dispatch()
+                except BrokenProcessPool as e:
+                    self._restart_executor(e)
+                backoff = self.poll_interval
+            except Exception:
+                logger.exception("parse dispatcher failed, retrying in %.0fs", backoff)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, _MAX_BACKOFF)
+
+    def _dispatch(self):
+        if self._executor is None:
+            self._executor = self._new_executor()
+        free = (1 if self._isolate else self.workers) - len(self._in_flight)
+        if free > 0:
+            jobs = self.queue.claim(free, self.owner)
+            if self._isolate:
+                self._isolate = max(0, self._isolate - len(jobs))
+            for i, job in enumerate(jobs):
+                try:
+                    future = self._executor.submit(_parse_file, job["file_path"], job["user_id"])
+                except BaseException:
+                    for unsent in jobs[i:]:
+                        self.queue.fail(unsent["id"], "could not submit to the worker pool", retry=True)
+                    raise
+                self._in_flight[future] = job
+        if not self._in_flight:
+            self.queue.wait_for_work(self.poll_interval)
+            return
+        if time.time() - self._renewed_at > self.queue.lease_seconds / 3:
+            held = self.queue.renew([job["id"] for job in self._in_flight.values()], self.owner)
+            if held < len(self._in_flight):
+                logger.warning("%d parse jobs outlived their lease and were claimed by another pool",
+                               len(self._in_flight) - held)
+            self._renewed_at = time.time()
+        done, _ = wait(list(self._in_flight), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+        for future in done:
+            if isinstance(future.exception(), BrokenProcessPool):
+                raise future.exception()
+            self._finish(future, self._in_flight.pop(future))
+
+    def _restart_executor(self, error: BaseException):
+        #a worker died (out of memory, segfault in a PDF library) and took the pool with it. Every job the pool
+        #was running goes back in the queue and the pool is rebuilt once. Only a job that ran alone is charged
+        #the attempt, otherwise the suspects are run one at a time next
+        jobs = list(self._in_flight.values())
+        self._in_flight.clear()
+        executor, self._executor = self._executor, None #created again by the next _dispatch
+        if executor is not None:
+            executor.shutdown(wait=False)
+        logger.warning("parse worker pool broke, requeueing %d jobs: %s", len(jobs), error)
+        blamed = len(jobs) == 1
+        if not blamed:
+            self._isolate += len(jobs)
+        for job in jobs:
+            self.queue.fail(job["id"], f"worker died: {error}", retry=True, count_attempt=blamed)
+
+    def _finish(self, future, job: Dict):
+        try:
+            parsed, vector, model_tag = future.result()
+        except Exception as e:
+            self.queue.fail(job["id"], f"{type(e).__name__}: {e}")
+            return
+        try:
+            store_result(self.app, job["resume_id"], parsed, vector, model_tag)
+        except Exception as e:
+            logger.warning("could not store parse result for resume %s: %s", job["resume_id"], e)
+            self.queue.fail(job["id"], f"could not store result: {e}", retry=True)
+            return
+        self.queue.complete(job["id"])
+
+
+def _resume_texts():
+    #(id, text) of every parsed resume, used once to import the resumes saved before the near-duplicate store
+    from models import db, Resume
+    for resume_id, parsed_data in db.session.query(Resume.id, Resume.parsed_data).filter(Resume.parsed_data.isnot(None)).yield_per(1000):
+        try:
+            text = json.loads(parsed_data).get("raw_text", "") if parsed_data else ""
+        except (ValueError, AttributeError):
+            continue
+        yield resume_id, text
+
+
+def store_result(app, resume_id: int, parsed: Dict, vector: Optional[np.ndarray] = None, model_tag: str = ""):
+    from embedding_store import ensure_embedding
+    from job_parser import document_embedding_tag
+    from models import db, Resume
+    from similar import get_shared_index, import_existing
+    with app.app_context():
+        resume = db.session.get(Resume, resume_id)
+        if resume is None:
+            return #deleted while it was being parsed
+        #another version of one of this user's resumes, reported in the parse result's metadata.
+        #the first result also signs the resumes parsed before the store existed (the dispatcher, not a request)
+        import_existing("resume", _resume_texts)
+        duplicates = get_shared_index("resume")
+        signature = duplicates.hasher.signature(parsed.get("raw_text", ""))
+        for other_id, similarity in duplicates.query(signature=signature):
+            other = db.session.get(Resume, other_id) if other_id != resume_id else None
+            if other is not None and other.user_id == resume.user_id:
+                parsed.setdefault("metadata", {})["duplicate_of"] = {"resume_id": other_id, "similarity": round(similarity, 3)}
+                break
+        resume.set_parsed_data(parsed)
+        #after set_parsed_data, which clears the old vector
+        if vector is not None:
+            resume.set_embedding(vector, model_tag)
+        else:
+            ensure_embedding(resume, parsed.get("raw_text", ""), document_embedding_tag())
+        db.session.commit()
+        duplicates.add(resume_id, signature=signature)
+
+
+_default_queue: Optional[ParseQueue] = None
+_default_pool: Optional[ParseWorkerPool] = None
+_default_lock = threading.Lock()
+
+
+def get_default_queue() -> ParseQueue:
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = ParseQueue(
+                os.environ.get("RESUMEAI_PARSE_QUEUE_PATH", DEFAULT_QUEUE_PATH),
+                lease_seconds=float(os.environ.get("RESUMEAI_PARSE_LEASE", "300")),
+            )
+        return _default_queue
+
+
+def ensure_worker_pool(app) -> Optional[ParseWorkerPool]:
+    #starts this process's pool the first time it's needed, or does nothing when RESUMEAI_PARSE_WORKERS=0
+    global _default_pool
+    workers = int(os.environ.get("RESUMEAI_PARSE_WORKERS", "2"))
+    if workers <= 0:
+        return None
+    queue = get_default_queue()
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = ParseWorkerPool(app, queue, workers)
+            _default_pool.start()
+            logger.info("Parse worker pool started", extra={"fields": {"workers": workers}})
+        return _default_pool
+
+
+def render_queue_metrics() -> str:
+    #jobs per status in Prometheus text format (empty until the queue is used in this process)
+    if _default_queue is None:
+        return ""
+    lines = ["# TYPE resumeai_parse_jobs gauge"]
+    for status, count in _default_queue.counts().items():
+        lines.append(f'resumeai_parse_jobs{{status="{status}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    #runs the pool on its own, for deployments where the web processes have RESUMEAI_PARSE_WORKERS=0
+    parser = argparse.ArgumentParser(description="Parse queued resume uploads")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--pdf-engine", default=None, help="auto, pymupdf or pdfplumber")
+    args = parser.parse_args()
+
+    from main import create_app
+    app = create_app()
+    if app is None:
+        raise SystemExit(1)
+    pool = ParseWorkerPool(app, get_default_queue(), args.workers, args.pdf_engine)
+    pool.start()
+    print(f"parsing queued resumes with {pool.workers} workers, waiting jobs: {json.dumps(pool.queue.counts())}")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
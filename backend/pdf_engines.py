@@ -0,0 +1,272 @@
+#PDF text extraction engines.
+#PyMuPDF is several times faster than pdfplumber, and for the clean single column PDFs most people upload
+#it gives the same text. pdfplumber is better at tricky layouts, so in "auto" mode we extract with PyMuPDF
+#first and only pay for pdfplumber when a quick look at the text says the layout needs it.
+#
+#engines: "auto" (default), "pymupdf", "pdfplumber", or anything added with register_engine().
+#The deployment default can be changed with RESUMEAI_PDF_ENGINE.
+#
+#Documents with RESUMEAI_PDF_PARALLEL_PAGES pages or more (default 8) are split into page ranges that
+#are extracted in a process pool (RESUMEAI_PDF_WORKERS, default min(8, cores)) and joined once in order.
+
+import atexit
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional, Tuple
+
+from log_config import get_logger, StageTimer
+
+logger = get_logger("pdf_engines")
+
+DEFAULT_PDF_ENGINE = os.environ.get("RESUMEAI_PDF_ENGINE", "auto")
+
+#quality thresholds used by assess_text_quality
+MAX_GARBLED_RATIO = 0.02 #more than 2% unreadable glyphs means the font mapping failed
+MAX_AVERAGE_LINE_LENGTH = 200 #a resume with 200+ characters per line lost its line breaks
+MAX_WIDE_GAP_LINE_RATIO = 0.25 #lots of lines with big gaps inside them means two columns got merged
+MAX_FRAGMENT_LINE_RATIO = 0.35 #lots of 1-2 character lines means columns got chopped up
+MIN_TEXT_FOR_QUALITY_CHECK = 200 #too little text to judge, keep what we have
+
+#long CVs are split into page ranges and extracted in a process pool, short resumes stay serial
+PARALLEL_PAGE_THRESHOLD = int(os.environ.get("RESUMEAI_PDF_PARALLEL_PAGES", "8")) #0 turns parallel extraction off
+PARALLEL_MAX_WORKERS = int(os.environ.get("RESUMEAI_PDF_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+
+_CID_GLYPH = re.compile(r'\(cid:\d+\)') #what pdfminer/pdfplumber print for glyphs with no unicode mapping
+_WIDE_GAP = re.compile(r'\S {4,}\S') #four or more spaces between two words on one line
+
+
+def _pymupdf_page_count(pdf_path: str) -> int:
+    import fitz # PyMuPDF
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def _pymupdf_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    import fitz # PyMuPDF
+    with fitz.open(pdf_path) as doc:
+        return [doc[i].get_text() for i in range(start, min(stop, doc.page_count))]
+
+
+def _pdfplumber_page_count(pdf_path: str) -> int:
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def _pdfplumber_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages[start:stop]]
+
+
+def _pymupdf_pages(pdf_path: str) -> List[str]:
+    return _pymupdf_page_range(pdf_path, 0, _pymupdf_page_count(pdf_path))
+
+
+def _pdfplumber_pages(pdf_path: str) -> List[str]:
+    return _pdfplumber_page_range(pdf_path, 0, _pdfplumber_page_count(pdf_path))
+
+
+#engines that can extract an arbitrary page range, these are the ones that can run page-parallel:
+#name -> (page count function, page range function)
+_PAGE_RANGE_ENGINES: Dict[str, Tuple[Callable[[str], int], Callable[[str, int, int], List[str]]]] = {
+    "pymupdf": (_pymupdf_page_count, _pymupdf_page_range),
+    "pdfplumber": (_pdfplumber_page_count, _pdfplumber_page_range),
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock() #two requests with long PDFs at once must not each create a pool
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    #one pool per process, created the first time a long document shows up. The workers are spawned, not
+    #forked: this runs inside a threaded Flask or dispatcher process, and forking one that has torch or
+    #tokenizer threads running can leave the child stuck on a lock some other thread was holding
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PARALLEL_MAX_WORKERS, mp_context=get_context("spawn"))
+            atexit.register(shutdown_executor)
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def extract_pages_parallel(engine: str, pdf_path: str, page_count: Optional[int] = None,
+                           workers: Optional[int] = None) -> List[str]:
+    """Extract every page with the given engine across the process pool, pages come back in order
+
+    Each worker opens the file itself and handles one contiguous range of pages, so only file paths
+    and page text cross the process boundary.
+    """
+    count_pages, extract_range = _PAGE_RANGE_ENGINES[engine]
+    if page_count is None:
+        page_count = count_pages(pdf_path)
+    workers = max(1, min(workers or PARALLEL_MAX_WORKERS, page_count))
+    chunk = -(-page_count // workers) #ceil division, pages per worker
+    ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+    futures = [_get_executor().submit(extract_range, pdf_path, start, stop) for start, stop in ranges]
+    pages: List[str] = []
+    for future in futures: #futures are in page order, so extending keeps the order
+        pages.extend(future.result())
+    return pages
+
+
+def _extract_pages(engine: str, pdf_path: str) -> List[str]:
+    #serial for short documents, page-parallel once a document is over PARALLEL_PAGE_THRESHOLD pages
+    if engine in _PAGE_RANGE_ENGINES and PARALLEL_PAGE_THRESHOLD > 0 and PARALLEL_MAX_WORKERS > 1:
+        count_pages, extract_range = _PAGE_RANGE_ENGINES[engine]
+        page_count = count_pages(pdf_path)
+        if page_count >= PARALLEL_PAGE_THRESHOLD:
+            logger.debug("Extracting %d pages of %s in parallel with %s", page_count, pdf_path, engine)
+            return extract_pages_parallel(engine, pdf_path, page_count)
+        return extract_range(pdf_path, 0, page_count)
+    return _ENGINES[engine](pdf_path)
+
+
+#name -> function that returns the text of every page, in order
+_ENGINES: Dict[str, Callable[[str], List[str]]] = {
+    "pymupdf": _pymupdf_pages,
+    "pdfplumber": _pdfplumber_pages,
+}
+
+
+def register_engine(name: str, page_extractor: Callable[[str], List[str]]):
+    #adds another engine, page_extractor(pdf_path) must return a list with the text of each page.
+    #registered engines always run serially
+    _ENGINES[name] = page_extractor
+    _PAGE_RANGE_ENGINES.pop(name, None)
+
+
+def available_engines() -> List[str]:
+    return ["auto"] + list(_ENGINES)
+
+
+def join_pages(pages: List[str]) -> str:
+    #one join at the end instead of growing a string page by page
+    return "".join(page if page.endswith("\n") else page + "\n" for page in pages if page)
+
+
+def assess_text_quality(text: str) -> Dict:
+    #cheap checks on extracted text, returns the measurements plus the reasons it looks broken (if any)
+    stripped = text.strip()
+    lines = [line for line in stripped.split("\n") if line.strip()]
+    quality = {
+        "chars": len(stripped),
+        "garbled_ratio": 0.0,
+        "average_line_length": 0.0,
+        "wide_gap_line_ratio": 0.0,
+        "fragment_line_ratio": 0.0,
+        "reasons": [],
+    }
+    if len(stripped) < MIN_TEXT_FOR_QUALITY_CHECK or not lines:
+        return quality
+
+    #replacement characters, private use area glyphs and stray control characters
+    garbled = sum(1 for ch in stripped if ch == "\ufffd" or "\ue000" <= ch <= "\uf8ff"
+                  or (ord(ch) < 32 and ch not in "\n\t\r"))
+    garbled += sum(len(match) for match in _CID_GLYPH.findall(stripped))
+    quality["garbled_ratio"] = garbled / len(stripped)
+    quality["average_line_length"] = sum(len(line) for line in lines) / len(lines)
+    quality["wide_gap_line_ratio"] = sum(1 for line in lines if _WIDE_GAP.search(line)) / len(lines)
+    quality["fragment_line_ratio"] = sum(1 for line in lines if len(line.strip()) <= 2) / len(lines)
+
+    if quality["garbled_ratio"] > MAX_GARBLED_RATIO:
+        quality["reasons"].append("garbled_glyphs")
+    if quality["average_line_length"] > MAX_AVERAGE_LINE_LENGTH:
+        quality["reasons"].append("missing_line_breaks")
+    if (quality["wide_gap_line_ratio"] > MAX_WIDE_GAP_LINE_RATIO or
+            quality["fragment_line_ratio"] > MAX_FRAGMENT_LINE_RATIO):
+        quality["reasons"].append("column_interleaving")
+    return quality
+
+
+class PdfExtraction:
+    """Text pulled out of a PDF plus which engine produced it and what every attempt cost"""
+
+    def __init__(self):
+        self.text = ""
+        self.engine: Optional[str] = None
+        self.attempts: List[Dict] = [] #one entry per engine we ran, in order
+        self.escalation_reasons: List[str] = []
+
+    @property
+    def elapsed_ms(self) -> float:
+        return round(sum(attempt["elapsed_ms"] for attempt in self.attempts), 3)
+
+    def as_metadata(self) -> Dict:
+        return {
+            "engine": self.engine,
+            "elapsed_ms": self.elapsed_ms,
+            "attempts": self.attempts,
+            "escalation_reasons": self.escalation_reasons,
+        }
+
+
+def _run_engine(name: str, pdf_path: str, result: PdfExtraction, timer: StageTimer) -> str:
+    attempt = {"engine": name, "elapsed_ms": 0.0, "chars": 0}
+    start = time.perf_counter()
+    text = ""
+    try:
+        with timer.stage(name):
+            text = join_pages(_extract_pages(name, pdf_path))
+    except Exception as e:
+        attempt["error"] = str(e)
+        logger.warning("%s failed on %s: %s", name, pdf_path, e)
+    attempt["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    attempt["chars"] = len(text)
+    result.attempts.append(attempt)
+    return text
+
+
+def extract_pdf_text(pdf_path: str, engine: Optional[str] = None, timer: Optional[StageTimer] = None) -> PdfExtraction:
+    """Extract the text of a PDF with the given engine ("auto" picks one based on the text quality)"""
+    engine = engine or DEFAULT_PDF_ENGINE
+    timer = timer or StageTimer()
+    result = PdfExtraction()
+
+    if engine != "auto":
+        if engine not in _ENGINES:
+            raise ValueError(f"Unknown PDF engine: {engine} (available: {', '.join(available_engines())})")
+        result.text = _run_engine(engine, pdf_path, result, timer)
+        result.engine = engine
+        if not result.text.strip():
+            #the chosen engine failed or found nothing, try the others before giving up
+            for fallback in _ENGINES:
+                if fallback == engine:
+                    continue
+                text = _run_engine(fallback, pdf_path, result, timer)
+                if text.strip():
+                    result.text, result.engine = text, fallback
+                    break
+        return result
+
+    #auto: fast engine first
+    fast_text = _run_engine("pymupdf", pdf_path, result, timer)
+    if fast_text.strip():
+        reasons = assess_text_quality(fast_text)["reasons"]
+        if not reasons:
+            result.text, result.engine = fast_text, "pymupdf"
+            return result
+        result.escalation_reasons = reasons
+    else:
+        result.escalation_reasons = ["no_text"]
+
+    logger.debug("Escalating %s to pdfplumber: %s", pdf_path, result.escalation_reasons)
+    layout_text = _run_engine("pdfplumber", pdf_path, result, timer)
+    if layout_text.strip():
+        result.text, result.engine = layout_text, "pdfplumber"
+    else:
+        #pdfplumber didn't do any better, keep whatever PyMuPDF found
+        result.text, result.engine = fast_text, "pymupdf"
+    return result
@@ -0,0 +1,201 @@
+#Per-stage profiling for the parsers.
+#StageProfiler is an opt-in StageTimer that also measures memory allocated in every stage with tracemalloc,
+#and the histograms below aggregate stage timings across every parse in this process so /api/metrics
+#can be scraped to find the slow stages on real traffic.
+#
+#Profiling is off by default because tracemalloc slows Python down noticeably while it's tracing.
+#Turn it on per parser with ResumeParser(profile=True) or for the whole process with RESUMEAI_PROFILE=1.
+
+import itertools
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from log_config import StageTimer
+
+#seconds, roughly log spaced from 1ms to 30s, parse stages range from regex passes to cold model loads
+DEFAULT_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+#bytes, 64KB to 512MB
+DEFAULT_BYTE_BUCKETS = tuple(64 * 1024 * 4 ** i for i in range(8))
+
+
+def profiling_enabled_by_default() -> bool:
+    return os.environ.get("RESUMEAI_PROFILE", "0") == "1"
+
+
+#tracemalloc is process wide, so several threads profiling at once share one tracing session
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+#the profiled stages running right now, id -> whether another stage ran alongside it. The traced memory
+#and its peak are process wide too, so a stage that overlapped another one can't tell its own allocations
+#apart (and the other stage's reset_peak() wiped its peak): only its wall time is kept
+_running_stages: Dict[int, bool] = {}
+_stage_ids = itertools.count()
+
+
+def _acquire_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users = max(0, _tracing_users - 1)
+        if _tracing_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class StageProfiler(StageTimer):
+    #a StageTimer that also records how much memory each stage allocated (net and peak).
+    #stages must not be nested, the peak counter is reset at the start of every stage.
+    #tracemalloc can't tell threads apart, so memory is only recorded for stages that ran while no other
+    #profiled stage did; under concurrent requests most stages report wall time only. Allocations made by
+    #threads that aren't profiling (a job parse next to a profiled resume parse) are still counted, exact
+    #numbers need one parse per process at a time, as in the ingest CLI's worker processes.
+    #use it as a context manager so tracing is always switched off again:
+    #   with StageProfiler() as profiler:
+    #       with profiler.stage("spacy"): ...
+    #   profiler.as_dict()
+
+    def __init__(self):
+        super().__init__()
+        self.allocations: Dict[str, Dict[str, int]] = {}
+        self.skipped_memory: Set[str] = set() #stages that overlapped another profiled stage at least once
+        self._active = False
+
+    def __enter__(self):
+        _acquire_tracing()
+        self._active = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._active:
+            self._active = False
+            _release_tracing()
+        return False
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self._active:
+            with super().stage(name):
+                yield
+            return
+
+        with _tracing_lock:
+            stage_id = next(_stage_ids)
+            overlapped = bool(_running_stages)
+            for other in _running_stages:
+                _running_stages[other] = True
+            _running_stages[stage_id] = overlapped
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+            with _tracing_lock:
+                current, peak = tracemalloc.get_traced_memory()
+                overlapped = _running_stages.pop(stage_id)
+            if overlapped:
+                self.skipped_memory.add(name)
+            else:
+                stats = self.allocations.setdefault(name, {"allocated_bytes": 0, "peak_bytes": 0})
+                stats["allocated_bytes"] += current - before
+                stats["peak_bytes"] = max(stats["peak_bytes"], peak - before)
+
+    def as_dict(self) -> Dict:
+        #the shape that goes into parsed_data['metadata']['profile']
+        stages = {}
+        for name, seconds in self.timings.items():
+            stage = {"wall_ms": round(seconds * 1000, 3)}
+            if name in self.skipped_memory:
+                stage["memory"] = "skipped, ran alongside another profiled stage"
+            elif name in self.allocations:
+                stage["allocated_kb"] = round(self.allocations[name]["allocated_bytes"] / 1024, 1)
+                stage["peak_kb"] = round(self.allocations[name]["peak_bytes"] / 1024, 1)
+            stages[name] = stage
+        return {"stages": stages, "total_ms": round(self.total() * 1000, 3)}
+
+
+class Histogram:
+    #a Prometheus style cumulative histogram with one series per label set, safe to update from many threads
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Iterable[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {} #labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict]:
+        with self._lock:
+            return {
+                labels: {"buckets": dict(zip(self.buckets, counts)), "sum": total, "count": count}
+                for labels, (counts, total, count) in self._series.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, data in sorted(self.snapshot().items()):
+            label_text = ",".join(f'{key}="{value}"' for key, value in zip(self.label_names, labels))
+            for bound, count in data["buckets"].items():
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound:g}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {data["count"]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {data['sum']:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {data['count']}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "resumeai_parse_stage_seconds", "Wall time of each parser stage.",
+    ("parser", "stage"), DEFAULT_TIME_BUCKETS,
+)
+STAGE_PEAK_BYTES = Histogram(
+    "resumeai_parse_stage_peak_bytes", "Peak memory allocated during each parser stage (profiling only).",
+    ("parser", "stage"), DEFAULT_BYTE_BUCKETS,
+)
+
+
+def record_stages(parser_name: str, timer: StageTimer):
+    #adds one finished parse to the process wide histograms
+    for stage, seconds in timer.timings.items():
+        STAGE_SECONDS.observe((parser_name, stage), seconds)
+    if isinstance(timer, StageProfiler):
+        for stage, stats in timer.allocations.items():
+            STAGE_PEAK_BYTES.observe((parser_name, stage), stats["peak_bytes"])
+
+
+def render_metrics() -> str:
+    #Prometheus text exposition format, served by /api/metrics
+    return "\n".join(STAGE_SECONDS.render() + STAGE_PEAK_BYTES.render()) + "\n"
+
+
+def new_timer(profile: Optional[bool] = None) -> StageTimer:
+    #a plain StageTimer, or a StageProfiler when profiling is on
+    if profile is None:
+        profile = profiling_enabled_by_default()
+    return StageProfiler() if profile else StageTimer()
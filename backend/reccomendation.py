@@ -0,0 +1,467 @@
+#Job recommendations for a resume.
+#Scoring every stored job with BERT on every request doesn't scale, so every job's embedding goes into a
+#vector index once (when it's saved) and a recommendation is a nearest neighbour search for the resume's
+#embedding. Vectors are normalized, so the inner product is the cosine similarity.
+#
+#   BruteForceIndex   exact, one matrix-vector product over every job. Fine up to ~100k jobs (tens of ms)
+#   IVFIndex          approximate: jobs are grouped around k-means centroids and a query only scans the
+#                     n_probe closest groups, a few ms at 100k. Before it has enough vectors to train it
+#                     behaves exactly like the brute force index
+#   MappedIndex       exact like brute force, but the vectors live in a shared memory-mapped file
+#                     (embedding_matrix.py) instead of every worker's memory, see RESUMEAI_JOB_INDEX=mmap
+#
+#all of them support add() at any time, adding an id that is already there replaces its vector.
+
+import os
+import threading
+import time
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from log_config import get_logger
+
+logger = get_logger("reccomendation")
+
+DEFAULT_TOP_K = 10
+#the shared file by default: every worker process sees the jobs any of them saved. "ivf" and "brute" keep a
+#private copy per process that only learns about other workers' jobs on the next sync()
+JOB_INDEX_KIND = os.environ.get("RESUMEAI_JOB_INDEX", "mmap")
+#how often a process checks the database for jobs its index doesn't have yet (saved elsewhere, embedded later)
+JOB_INDEX_SYNC_SECONDS = float(os.environ.get("RESUMEAI_JOB_INDEX_SYNC_SECONDS", "10"))
+JOB_MATRIX_PATH = os.environ.get("RESUMEAI_JOB_MATRIX_PATH") or \
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'embeddings', 'jobs.emb')
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    #positions of the k best scores, best first. argpartition is linear, only the k winners get sorted
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
+
+
+class _VectorBlock:
+    #a growable (n, dim) float32 array plus the id of every row, rows are removed by moving the last row in
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.vectors = np.empty((capacity, dim), dtype=np.float32)
+        self.ids: List[Hashable] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def view(self) -> np.ndarray:
+        return self.vectors[:len(self.ids)]
+
+    def append(self, item_id: Hashable, vector: np.ndarray) -> int:
+        row = len(self.ids)
+        if row == len(self.vectors):
+            #doubling keeps appends amortized O(1)
+            grown = np.empty((max(1, row) * 2, self.vectors.shape[1]), dtype=np.float32)
+            grown[:row] = self.vectors[:row]
+            self.vectors = grown
+        self.vectors[row] = vector
+        self.ids.append(item_id)
+        return row
+
+    def remove_row(self, row: int) -> Optional[Hashable]:
+        #returns the id of the row that was moved into the gap (None if the last row was removed)
+        last = len(self.ids) - 1
+        moved = None
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            self.ids[row] = self.ids[last]
+            moved = self.ids[row]
+        self.ids.pop()
+        return moved
+
+
+class BruteForceIndex:
+    """Exact top-K by inner product over every stored vector"""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._block = _VectorBlock(dim)
+        self._rows: Dict[Hashable, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._block)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._rows
+
+    def add(self, ids: Sequence[Hashable], vectors: np.ndarray):
+        vectors = _normalize(vectors)
+        with self._lock:
+            for item_id, vector in zip(ids, vectors):
+                row = self._rows.get(item_id)
+                if row is None:
+                    self._rows[item_id] = self._block.append(item_id, vector)
+                else:
+                    self._block.vectors[row] = vector
+
+    def remove(self, item_id: Hashable):
+        with self._lock:
+            row = self._rows.pop(item_id, None)
+            if row is not None:
+                moved = self._block.remove_row(row)
+                if moved is not None:
+                    self._rows[moved] = row
+
+    def search(self, query: np.ndarray, k: int = DEFAULT_TOP_K) -> List[Tuple[Hashable, float]]:
+        query = _normalize(query)[0]
+        with self._lock:
+            scores = self._block.view() @ query
+            return [(self._block.ids[i], float(scores[i])) for i in _top_k(scores, k)]
+
+
+class IVFIndex:
+    """Approximate top-K: vectors live in n_lists groups around k-means centroids, a query scans n_probe groups
+
+    The centroids are trained the first time the index holds train_size vectors (before that every query is
+    exact), and retrained when the index has grown retrain_factor times since, so the groups stay balanced.
+    Both happen on a background thread, the add() that crosses the threshold doesn't wait for k-means.
+    """
+
+    def __init__(self, dim: int, n_lists: int = 256, n_probe: int = 8, train_size: Optional[int] = None,
+                 retrain_factor: float = 4.0, kmeans_iterations: int = 10, seed: int = 0):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size or n_lists * 39 #the usual rule of thumb, ~40 points per centroid
+        self.retrain_factor = retrain_factor
+        self.kmeans_iterations = kmeans_iterations
+        self._rng = np.random.default_rng(seed)
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_at = 0
+        self._lists: List[_VectorBlock] = [_VectorBlock(dim, capacity=64)]
+        self._where: Dict[Hashable, Tuple[int, int]] = {} #id -> (list, row)
+        self._lock = threading.RLock()
+        self._training: Optional[threading.Thread] = None #the background (re)training, if one is running
+        self._changed: Optional[set] = None #ids added or removed while it runs, replayed when it finishes
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._where
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if self._centroids is None:
+            return np.zeros(len(vectors), dtype=np.int64)
+        return (vectors @ self._centroids.T).argmax(axis=1)
+
+    def add(self, ids: Sequence[Hashable], vectors: np.ndarray):
+        vectors = _normalize(vectors)
+        with self._lock:
+            for item_id in ids:
+                self._remove_locked(item_id)
+            for item_id, vector, target in zip(ids, vectors, self._assign(vectors)):
+                self._where[item_id] = (int(target), self._lists[target].append(item_id, vector))
+            size = len(self._where)
+            if self._training is None and ((not self.trained and size >= self.train_size) or
+                                           (self.trained and size >= self._trained_at * self.retrain_factor)):
+                self._start_training_locked()
+
+    def remove(self, item_id: Hashable):
+        with self._lock:
+            self._remove_locked(item_id)
+
+    def _remove_locked(self, item_id: Hashable):
+        if self._changed is not None:
+            self._changed.add(item_id)
+        where = self._where.pop(item_id, None)
+        if where is not None:
+            list_no, row = where
+            moved = self._lists[list_no].remove_row(row)
+            if moved is not None:
+                self._where[moved] = (list_no, row)
+
+    def _all_vectors(self) -> Tuple[List[Hashable], np.ndarray]:
+        ids = [item_id for block in self._lists for item_id in block.ids]
+        vectors = np.concatenate([block.view() for block in self._lists]) if ids else np.empty((0, self.dim), np.float32)
+        return ids, vectors
+
+    def train(self):
+        #trains right away on the calling thread, add() trains in the background instead
+        with self._lock:
+            ids, vectors = self._all_vectors()
+            if ids:
+                centroids = self._fit(vectors)
+                self._install_locked(centroids, ids, vectors, (vectors @ centroids.T).argmax(axis=1), ())
+
+    def wait_for_training(self, timeout: Optional[float] = None):
+        training = self._training
+        if training is not None:
+            training.join(timeout)
+
+    def _start_training_locked(self):
+        #k-means over every vector takes far longer than one add, so it runs on its own thread on a copy of
+        #the vectors. Searches keep using the current lists (exact scan before the first training) until the
+        #new ones are swapped in
+        ids, vectors = self._all_vectors() #concatenate copies, later adds don't touch this snapshot
+        self._changed = set()
+        self._training = threading.Thread(target=self._train_in_background, args=(ids, vectors),
+                                          name="ivf-train", daemon=True)
+        self._training.start()
+
+    def _train_in_background(self, ids: List[Hashable], vectors: np.ndarray):
+        try:
+            centroids = self._fit(vectors)
+            assignment = (vectors @ centroids.T).argmax(axis=1)
+            with self._lock:
+                self._install_locked(centroids, ids, vectors, assignment, self._changed or ())
+        except Exception as e:
+            logger.warning("IVF training failed, keeping the current lists: %s", e)
+        finally:
+            with self._lock:
+                self._training = None
+                self._changed = None
+
+    def _fit(self, vectors: np.ndarray) -> np.ndarray:
+        #spherical k-means on a sample
+        n_lists = min(self.n_lists, len(vectors))
+        sample_size = min(len(vectors), self.n_lists * 256)
+        sample = vectors[self._rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[self._rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assignment = (sample @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = sample[self._rng.choice(len(sample), int(empty.sum()))] #reseed empty clusters
+            centroids = _normalize(sums)
+        return centroids
+
+    def _install_locked(self, centroids: np.ndarray, ids: List[Hashable], vectors: np.ndarray,
+                        assignment: np.ndarray, changed):
+        #moves every vector to the list of its closest centroid. ids in changed were added or removed after
+        #the snapshot was taken, they are taken from the current lists instead
+        current = {item_id: self._lists[list_no].vectors[row] for item_id, (list_no, row) in self._where.items()
+                   if item_id in changed}
+        lists = [_VectorBlock(self.dim, capacity=64) for _ in range(len(centroids))]
+        where: Dict[Hashable, Tuple[int, int]] = {}
+        for item_id, vector, target in zip(ids, vectors, assignment):
+            if item_id not in changed:
+                where[item_id] = (int(target), lists[target].append(item_id, vector))
+        if current:
+            current_vectors = np.stack(list(current.values()))
+            for item_id, vector, target in zip(current, current_vectors, (current_vectors @ centroids.T).argmax(axis=1)):
+                where[item_id] = (int(target), lists[target].append(item_id, vector))
+        self._centroids, self._lists, self._where = centroids, lists, where
+        self._trained_at = len(where)
+        logger.info("IVF index trained", extra={"fields": {"vectors": len(where), "lists": len(centroids)}})
+
+    def search(self, query: np.ndarray, k: int = DEFAULT_TOP_K, n_probe: Optional[int] = None) -> List[Tuple[Hashable, float]]:
+        query = _normalize(query)[0]
+        with self._lock:
+            if self._centroids is None:
+                probed = self._lists
+            else:
+                closest = _top_k(self._centroids @ query, n_probe or self.n_probe)
+                probed = [self._lists[i] for i in closest]
+            probed = [block for block in probed if len(block)]
+            if not probed:
+                return []
+            vectors = np.concatenate([block.view() for block in probed])
+            ids = [item_id for block in probed for item_id in block.ids]
+            scores = vectors @ query
+            return [(ids[i], float(scores[i])) for i in _top_k(scores, k)]
+
+
+class MappedIndex:
+    """Exact top-K over a memory-mapped embedding file shared by every worker process
+
+    Vectors added by any process are appended to the file and show up in every other process on its next
+    search. remove() only hides the job in this process, the file itself is append-only.
+    """
+
+    def __init__(self, dim: int, path: str = JOB_MATRIX_PATH, model_tag: str = "", dtype: str = "float32"):
+        from embedding_matrix import EmbeddingMatrixFile
+        self.file = EmbeddingMatrixFile.open_or_create(path, dim, model_tag, dtype)
+        self.dim = dim
+        self._removed = set()
+
+    @classmethod
+    def from_file(cls, matrix_file) -> "MappedIndex":
+        index = cls.__new__(cls)
+        index.file, index.dim, index._removed = matrix_file, matrix_file.dim, set()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.file) - sum(1 for item_id in self._removed if item_id in self.file)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self.file and item_id not in self._removed
+
+    def add(self, ids: Sequence[Hashable], vectors: np.ndarray):
+        self.file.append(ids, _normalize(vectors))
+        self._removed.difference_update(ids)
+
+    def remove(self, item_id: Hashable):
+        self._removed.add(item_id)
+
+    def refresh(self):
+        #picks up rows other processes appended
+        self.file.refresh()
+
+    def search(self, query: np.ndarray, k: int = DEFAULT_TOP_K) -> List[Tuple[Hashable, float]]:
+        self.refresh()
+        matches = self.file.top_k(_normalize(query)[0], k + len(self._removed))
+        return [match for match in matches if match[0] not in self._removed][:k]
+
+
+def open_mapped_file(path: str, model_tag: str):
+    #the embedding file at path opened for appending, or None if there is none or it holds another model's vectors
+    from embedding_matrix import EmbeddingMatrixFile
+    if not os.path.exists(path):
+        return None
+    try:
+        matrix_file = EmbeddingMatrixFile(path, mode="a")
+    except (OSError, ValueError) as e:
+        logger.warning("could not open embedding file %s: %s", path, e)
+        return None
+    return matrix_file if matrix_file.model_tag == model_tag else None
+
+
+def build_index(dim: int, kind: str = "brute", **options):
+    #"brute" for exact search, "ivf" for the approximate index, "mmap" for exact search over the shared file
+    if kind == "brute":
+        return BruteForceIndex(dim)
+    if kind == "ivf":
+        return IVFIndex(dim, **options)
+    if kind == "mmap":
+        return MappedIndex(dim, **options)
+    raise ValueError(f"Unknown index kind: {kind} (expected 'brute', 'ivf' or 'mmap')")
+
+
+class JobRecommender:
+    """Keeps the job index in sync with saved jobs and answers top-K queries for a resume
+
+    embed turns a list of texts into vectors (the job parser's embed_documents). The index is created on
+    the first add, once the embedding size is known.
+    """
+
+    def __init__(self, embed, kind: str = "brute", **index_options):
+        self.embed = embed
+        self.kind = kind
+        self.index_options = index_options
+        self.index = None
+        self._lock = threading.Lock()
+        self._synced_at = float("-inf")
+
+    def _ensure_index(self, dim: int):
+        with self._lock:
+            if self.index is None:
+                self.index = build_index(dim, self.kind, **self.index_options)
+
+    def add_jobs(self, job_ids: Sequence[int], texts: Sequence[str], batch_size: int = 64):
+        for start in range(0, len(job_ids), batch_size):
+            vectors = np.asarray(self.embed(list(texts[start:start + batch_size])), dtype=np.float32)
+            self.add_vectors(job_ids[start:start + batch_size], vectors)
+
+    def add_vectors(self, job_ids: Sequence[int], vectors: np.ndarray):
+        if not len(job_ids):
+            return
+        if self.index is None and self.kind == "mmap":
+            #the initial bulk load. The file may already hold rows other workers appended, those are kept and
+            #only the jobs it's missing are added. A new file is only written when there is none yet
+            from embedding_matrix import EmbeddingMatrixFile
+            with self._lock:
+                if self.index is None:
+                    matrix_file = EmbeddingMatrixFile.open_or_create(
+                        self.index_options.get("path", JOB_MATRIX_PATH), vectors.shape[1],
+                        self.index_options.get("model_tag", ""), ids=job_ids, vectors=_normalize(vectors))
+                    self.index = MappedIndex.from_file(matrix_file)
+                    return
+        self._ensure_index(vectors.shape[1])
+        self.index.add(list(job_ids), vectors)
+
+    def sync(self, load_ids, load_vectors, min_interval: float = JOB_INDEX_SYNC_SECONDS) -> int:
+        #adds every job that has a stored vector but isn't in the index yet: saved through another worker
+        #process, or embedded after it was saved. load_ids() -> ids with a stored vector, load_vectors(ids) ->
+        #(ids, matrix). Only reads ids unless something is missing, and at most once per min_interval
+        now = time.monotonic()
+        with self._lock:
+            if now - self._synced_at < min_interval:
+                return 0
+            self._synced_at = now
+        if self.index is not None and hasattr(self.index, "refresh"):
+            self.index.refresh()
+        missing = [job_id for job_id in load_ids() if self.index is None or job_id not in self.index]
+        if not missing:
+            return 0
+        job_ids, vectors = load_vectors(missing)
+        self.add_vectors(job_ids, vectors)
+        logger.info("Job index synced", extra={"fields": {"added": len(job_ids)}})
+        return len(job_ids)
+
+    def remove_job(self, job_id: int):
+        if self.index is not None:
+            self.index.remove(job_id)
+
+    def recommend(self, resume_text: str, k: int = DEFAULT_TOP_K) -> List[Tuple[int, float]]:
+        if self.index is None or not len(self.index):
+            return []
+        query = np.asarray(self.embed([resume_text]), dtype=np.float32)[0]
+        return self.index.search(query, k)
+
+    def recommend_vector(self, resume_vector: np.ndarray, k: int = DEFAULT_TOP_K) -> List[Tuple[int, float]]:
+        #same as recommend() for a resume whose embedding is already stored
+        if self.index is None or not len(self.index):
+            return []
+        return self.index.search(resume_vector, k)
+
+
+_shared_recommender: Optional[JobRecommender] = None
+_shared_recommender_lock = threading.Lock() #only guards reading and setting _shared_recommender
+_build_lock = threading.Lock() #one build at a time, held while the stored vectors are read
+
+
+def get_shared_recommender(load_vectors=None, kind: Optional[str] = None, create: bool = True,
+                           model_tag: str = "") -> Optional[JobRecommender]:
+    #one recommender per process. load_vectors() -> (job_ids, matrix) fills it from the stored job embeddings
+    #the first time it's built (only stored vectors, nothing is embedded), after that jobs are added one at a
+    #time as they're saved and by sync(). With create=False it returns None instead of building it, requests
+    #use that, the build runs on the job routes' background thread.
+    #kind defaults to RESUMEAI_JOB_INDEX. With "mmap" a process whose file for model_tag already exists
+    #(usually built by another worker) just maps it, nothing is loaded from the database.
+    #the build reads every stored vector without holding _shared_recommender_lock, so create=False callers
+    #never wait for it
+    global _shared_recommender
+    kind = kind or JOB_INDEX_KIND
+    with _shared_recommender_lock:
+        if _shared_recommender is not None or not create:
+            return _shared_recommender
+    with _build_lock:
+        if _shared_recommender is not None:
+            return _shared_recommender #built by another thread while we waited
+        from embedding_store import embed_with_shared_parser
+        existing = open_mapped_file(JOB_MATRIX_PATH, model_tag) if kind == "mmap" else None
+        if existing is not None:
+            recommender = JobRecommender(embed_with_shared_parser, kind=kind, model_tag=model_tag)
+            recommender.index = MappedIndex.from_file(existing)
+            logger.info("Job index mapped", extra={"fields": {"jobs": len(existing), "path": existing.path}})
+        else:
+            options = {"model_tag": model_tag} if kind == "mmap" else {}
+            recommender = JobRecommender(embed_with_shared_parser, kind=kind, **options)
+            if load_vectors is not None:
+                job_ids, vectors = load_vectors()
+                recommender.add_vectors(job_ids, vectors)
+                logger.info("Job index built", extra={"fields": {"jobs": len(job_ids), "kind": kind}})
+        with _shared_recommender_lock:
+            _shared_recommender = recommender
+    return recommender
@@ -4,49 +4,258 @@
 import os #this is used to get the file path
 import re #this is used for matching patterns in text
 import json #this is used for data handling
-import pdfplumber #this is for extracting text from pdf files
-import fitz # PyMuPDF, used for extracting text from PDF files as a fallback
+import importlib.util #lets us check that a library is installed without paying to import it
+import time #used to time the batched spaCy pass
+import threading #each request thread keeps its own section index when the parser is shared
+import logging #used to check the log level before building expensive debug output
 from pathlib import Path #this is used to handle file paths
 from typing import List, Dict, Tuple, Optional #Python typing is a way to add hints to your code about what types of values variables, function arguments, and return values should have, helping make your code more readable and catch bugs earlier.
-from docx import Document #this is used to handle docx files from microsoft word
 from datetime import datetime #this is used to handle date and time when the resume was created
+import model_registry #keeps one shared copy of the spaCy model per process
+from log_config import get_logger, StageTimer #logging instead of print, with per-stage timings
+import pdf_engines #picks PyMuPDF or pdfplumber for each pdf
+from docx_reader import extract_docx_text #streams the text out of .docx files, tables and text boxes included
+from profiling import StageProfiler, new_timer, profiling_enabled_by_default, record_stages #opt-in per-stage profiling
+import parse_cache #remembers parse results by the hash of the file so the same file is never parsed twice
+
+logger = get_logger("resume_parser")
+
+# pdfplumber, fitz (PyMuPDF) and spacy are slow to import, so they are only imported
+# inside the methods that use them. That keeps importing this file (and starting the Flask app) fast.
+
+# Check if spacy is installed, but make it optional
+SPACY_AVAILABLE = importlib.util.find_spec("spacy") is not None  # This is a flag variable - like a boolean switch that remembers if spacy is there
+if not SPACY_AVAILABLE:
+    logger.warning("spaCy not installed. Some features will be limited.")
+
+# Bump this whenever a change to the parser changes its output, so cached results from the old parser
+# stop matching (the version is part of every parse cache key)
+RESUME_PARSER_VERSION = "3"
+
+# The only thing we use spaCy for is named entities (PERSON, ORG, GPE, LOC), so every other pipeline
+# component (tagger, parser, lemmatizer...) is disabled, which cuts most of the spaCy cost per resume
+SPACY_COMPONENTS = ("ner",)
+
+# Section headers that mark where a section ends (and where the next one begins)
+MAJOR_SECTIONS = [
+    'experience', 'work experience', 'employment', 'work history', 'professional experience',
+    'education', 'academic background', 'qualifications', 'academic',
+    'skills', 'technical skills', 'competencies', 'core competencies',
+    'projects', 'side projects', 'personal projects', 'key projects', 'portfolio',
+    'certifications', 'certificates', 'licenses', 'credentials',
+    'awards', 'honors', 'achievements', 'recognition', 'accomplishments',
+    'volunteer', 'volunteer experience', 'community service',
+    'publications', 'research', 'patents',
+    'languages', 'references', 'interests', 'hobbies'
+]
+_MAJOR_SECTION_SET = frozenset(MAJOR_SECTIONS)
+
+# Every header name any _extract_* method looks for. Some of them (like 'schooling') can start a section
+# but aren't in MAJOR_SECTIONS, so they never end one - same as before the index existed
+SECTION_HEADER_NAMES = sorted(set(MAJOR_SECTIONS) | {
+    'schooling', 'notable projects', 'relevant projects', 'technical projects',
+    'project experience', 'work samples',
+}, key=len, reverse=True)  # longest first so "work experience" wins over "experience"
+
+_HEADER_ALTERNATION = '|'.join(re.escape(name) for name in SECTION_HEADER_NAMES)
+# The whole line is a header: "skills", "skills:", "--- skills ---", "=== skills ===", "*** skills ***"
+_HEADER_EXACT = re.compile(
+    rf'^(?:-+\s*({_HEADER_ALTERNATION})\s*-+|=+\s*({_HEADER_ALTERNATION})\s*=+|'
+    rf'\*+\s*({_HEADER_ALTERNATION})\s*\*+|({_HEADER_ALTERNATION})\s*:?)$'
+)
+# Finds every header name inside a short line, the lookahead lets matches overlap
+_HEADER_ANYWHERE = re.compile(rf'(?=({_HEADER_ALTERNATION}))')
+# A line only counts as a "loose" header if it's at most 5 characters longer than the name in it
+_MAX_LOOSE_HEADER_LENGTH = max(len(name) for name in SECTION_HEADER_NAMES) + 5
+
+
+def _classify_header(line_clean: str) -> Tuple[frozenset, frozenset]:
+    """Return (names that can start a section here, names that can end one here) for one lowercased line"""
+    names = set()
+
+    exact = _HEADER_EXACT.match(line_clean)
+    if exact:
+        names.add(next(group for group in exact.groups() if group))
+
+    # Markdown headers like "## Projects - 2024" only need to start with the name
+    if line_clean.startswith('#'):
+        rest = line_clean.lstrip('#').lstrip()
+        names.update(name for name in SECTION_HEADER_NAMES if rest.startswith(name))
+
+    # Short lines that contain a header name, like "Skills & Tools"
+    if len(line_clean) <= _MAX_LOOSE_HEADER_LENGTH:
+        for match in _HEADER_ANYWHERE.finditer(line_clean):
+            if len(line_clean) <= len(match.group(1)) + 5:
+                names.add(match.group(1))
+
+    end_names = frozenset(names)
+
+    # "Skills | Python | Java" starts a skills section but was never treated as the end of another one
+    if '|' in line_clean:
+        for name in SECTION_HEADER_NAMES:
+            if line_clean.startswith(name) and line_clean[len(name):].lstrip().startswith('|'):
+                names.add(name)
+
+    return frozenset(names), end_names
+
+
+class SectionIndex:
+    """One pass over the resume that finds every section header and the lines each section covers"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines = text.split('\n')
+        # (line number, names that start a section on this line, names that end one)
+        self.headers: List[Tuple[int, frozenset, frozenset]] = []
+        for i, line in enumerate(self.lines):
+            line_clean = line.strip().lower()
+            if not line_clean:  # Skip empty lines
+                continue
+            names, end_names = _classify_header(line_clean)
+            if names:
+                self.headers.append((i, names, end_names))
+
+    def find(self, section_names: List[str]) -> Optional[Tuple[int, int]]:
+        """Line span (start, end) of the first section matching any of section_names, or None
+
+        section_names should come from SECTION_HEADER_NAMES, other names are never indexed.
+        """
+        wanted = {name.lower() for name in section_names}
+        current_section = section_names[0].lower()  # Don't end on the same section name
+
+        for position, (start, names, _) in enumerate(self.headers):
+            if not names & wanted:
+                continue
+            end = len(self.lines)
+            for line_no, _, end_names in self.headers[position + 1:]:
+                if any(name != current_section and name in _MAJOR_SECTION_SET for name in end_names):
+                    end = line_no
+                    break
+            return start, end
+        return None
+
+    def get_text(self, section_names: List[str]) -> Optional[str]:
+        span = self.find(section_names)
+        if span is None:
+            return None
+        return '\n'.join(self.lines[span[0]:span[1]])
+
+    def sections(self) -> List[Dict]:
+        """Every header found, with the lines it covers until the next major section header"""
+        result = []
+        for position, (start, names, _) in enumerate(self.headers):
+            end = len(self.lines)
+            for line_no, _, end_names in self.headers[position + 1:]:
+                if end_names & _MAJOR_SECTION_SET:
+                    end = line_no
+                    break
+            result.append({
+                'name': max(names, key=len),  # the most specific name, like "work experience"
+                'start_line': start,
+                'end_line': end,
+            })
+        return result
 
-# Try to import spacy, but make it optional
-# This is a try/except block - it tries to do something risky, and if it fails, it has a backup plan
-try:
-    import spacy #this is for text analysis
-    SPACY_AVAILABLE = True  # This is a flag variable - like a boolean switch that remembers if spacy worked
-except ImportError:  # ImportError happens when Python can't find the library to import
-    SPACY_AVAILABLE = False  # Set our flag to False so the rest of the program knows spacy isn't available
-    print("spaCy not installed. Some features will be limited.")
 
 class ResumeParser: #this makes a class called resume parser    
     #a class is a blueprint for creating objects, providing initial values for state (member variables) and implementations of behavior (member functions or methods).    
     
-    def __init__(self): #constructor method called when having new resume        
+    def __init__(self, profile: Optional[bool] = None, pdf_engine: Optional[str] = None,
+                 cache: Optional[parse_cache.ParseCache] = None, use_cache: bool = True): #constructor method called when having new resume        
         #initialize parser with spacy        
         # __init__ is a special method called automatically when you create a new instance of the class
         # It's like the setup instructions that run every time you build something from this blueprint
         
-        self.nlp = None  # Initialize nlp as None (empty) - this will hold our language processing tool
-        
-        # Check if spaCy is available before trying to use it
-        if SPACY_AVAILABLE:
-            try:         
-                self.nlp = spacy.load("en_core_web_sm") #this tries to load a pre-trained spaCy language model called "en_core_web_sm" (the "small English model").         
-                print("✅ Spacy works YAYYYYy")            
-                #if it works it'll print what I have up there        
-            except OSError:  # OSError happens when the system can't find or access something
-                print("⚠️ Spacy doesn't work BOOOO") #this prints that like spacey doesn't work         
-                self.nlp = None #sets nlp to none so the rest of the program knows its missing. 
-                #basically saying the nlp can't process the human language to interpret. 
-        else:
-            # This runs if SPACY_AVAILABLE is False (meaning the import failed earlier)
-            print("⚠️ spaCy not available. Install it with: pip install spacy")
+        # The spaCy model is loaded once per process by the model registry and shared by every parser,
+        # so creating a ResumeParser per request no longer reloads it from disk
+        # Only the components in SPACY_COMPONENTS run (just NER), the tagger, parser and lemmatizer are switched off
+        self.nlp = model_registry.get_spacy("en_core_web_sm", SPACY_COMPONENTS) if SPACY_AVAILABLE else None
+        # nlp stays None if spaCy or the model is missing, the rest of the parser checks for that
+
+        # Holds the SectionIndex of the resume currently being parsed, per thread, so all the
+        # _extract_* methods share one scan of the document instead of rescanning it each time
+        self._local = threading.local()
+
+        # When profiling is on every parse records wall time and memory allocated per stage into
+        # parsed_data['metadata']['profile']. Off by default, RESUMEAI_PROFILE=1 turns it on everywhere
+        self.profile = profiling_enabled_by_default() if profile is None else profile
+
+        # Which PDF engine to use: "auto" (PyMuPDF, escalating to pdfplumber for tricky layouts),
+        # "pymupdf" or "pdfplumber". Defaults to RESUMEAI_PDF_ENGINE or "auto"
+        self.pdf_engine = pdf_engine or pdf_engines.DEFAULT_PDF_ENGINE
+
+        # Parse results are cached by the SHA-256 of the file, so re-uploads and re-analysis of the same
+        # resume skip extraction and parsing. Uses the process-wide cache unless one is passed in,
+        # use_cache=False (or RESUMEAI_PARSE_CACHE=0) turns it off
+        self.cache = (cache or parse_cache.get_default_cache()) if use_cache else None
+
+    def _cache_key(self, file_path: str, file_extension: str) -> str:
+        # The engine changes the extracted text, so it's part of the key along with the parser version
+        engine = self.pdf_engine if file_extension == ".pdf" else "docx"
+        return parse_cache.make_key(parse_cache.file_sha256(file_path), f"resume:{RESUME_PARSER_VERSION}:{engine}")
     
-    def parse_resume(self, file_path: str, user_id: int = None ) -> Dict: #returns stuff in a dict/hashmap type with a key being assigned to a value the key being the resume        
+    def parse_resume(self, file_path: str, user_id: int = None, profile: Optional[bool] = None) -> Dict: #returns stuff in a dict/hashmap type with a key being assigned to a value the key being the resume        
         #self just refers to the resume instance, file_path is the path to the resume, the user_id is just for user id and if there isn't one it'll say none, and -> dict returns dict with all of resume parsed info               
         
+        file_extension = self._check_file(file_path)  # raises if the file is missing or not a pdf/docx
+        profile = self.profile if profile is None else profile
+
+        # Look the file up by its content hash before opening it. Profiled runs always parse for real
+        # (so the numbers mean something) but still refresh the cache
+        cache_key, cached = self._lookup_cache(file_path, file_extension, user_id, skip_read=profile)
+        if cached is not None:
+            return cached
+
+        # The timer adds up how long each stage of parsing takes (and how much memory it allocates when profiling)
+        with new_timer(profile) as timer:
+            text, extraction_info = self._extract_text(file_path, file_extension, timer)
+
+            #now we're going to parse the extracted text
+            parsed_data = self._parse_text(text, timer) #so this line is to set up the parse data like the users name, experience, education etc etc. 
+            #it returns the parse info in a dict form or "hash map form"
+
+        return self._finish_parse(parsed_data, file_path, user_id, text, extraction_info, cache_key, timer)
+
+    def parse_resumes(self, file_paths: List[str], user_ids: Optional[List[int]] = None,
+                      batch_size: int = 16, n_process: int = 1) -> List:
+        # Batch version of parse_resume for backfills. Text is extracted file by file, then every resume goes
+        # through spaCy in one nlp.pipe call, which is a lot cheaper than calling nlp() once per resume.
+        # Returns one entry per file in the same order: the parsed dict, or the exception that file raised,
+        # so one bad file doesn't lose the whole batch
+        user_ids = user_ids or [None] * len(file_paths)
+        results: List = [None] * len(file_paths)
+        pending = []  # (position, file_path, user_id, cache_key, text, extraction_info, timer)
+
+        for position, (file_path, user_id) in enumerate(zip(file_paths, user_ids)):
+            try:
+                file_extension = self._check_file(file_path)
+                cache_key, cached = self._lookup_cache(file_path, file_extension, user_id)
+                if cached is not None:
+                    results[position] = cached
+                    continue
+                timer = StageTimer()
+                text, extraction_info = self._extract_text(file_path, file_extension, timer)
+                pending.append((position, file_path, user_id, cache_key, text, extraction_info, timer))
+            except Exception as e:
+                results[position] = e
+
+        docs = [None] * len(pending)
+        if self.nlp is not None and pending:
+            start = time.perf_counter()
+            docs = list(self.nlp.pipe((item[4] for item in pending), batch_size=batch_size, n_process=n_process))
+            share = (time.perf_counter() - start) / len(pending)  # the batch cost split evenly over its resumes
+            for item in pending:
+                item[6].timings['spacy'] = share
+
+        for (position, file_path, user_id, cache_key, text, extraction_info, timer), doc in zip(pending, docs):
+            try:
+                parsed_data = self._parse_text(text, timer, doc=doc)
+                results[position] = self._finish_parse(parsed_data, file_path, user_id, text, extraction_info, cache_key, timer)
+            except Exception as e:
+                results[position] = e
+        return results
+
+    def _check_file(self, file_path: str) -> str:
         # First, check if the file actually exists on the computer
         if not Path(file_path).exists():            
             raise FileNotFoundError(f"Resume wasn't found: {file_path}") #this js checks if the resume was in there      
@@ -54,24 +263,46 @@ class ResumeParser: #this makes a class called resume parser
         
         # Get the file extension (like .pdf, .docx) to know what type of file we're dealing with
         file_extension = Path(file_path).suffix.lower() #What this is saying is to get the file extension in lowercase.        
-        
+        if file_extension not in ['.pdf', '.docx', '.doc']:
+            raise ValueError(f"Unsupported file format: {file_path}") # returns false statement that the file type isn't supported like if it isn't a pdf or a docx it won't process. 
+        return file_extension
+
+    def _lookup_cache(self, file_path: str, file_extension: str, user_id: Optional[int],
+                      skip_read: bool = False) -> Tuple[Optional[str], Optional[Dict]]:
+        # Returns (cache key, cached result or None), the key is None when caching is off
+        if self.cache is None:
+            return None, None
+        cache_key = self._cache_key(file_path, file_extension)
+        cached = None if skip_read else self.cache.get(cache_key)
+        if cached is not None:
+            # Same bytes, same parser: only the per-upload details change
+            cached['metadata'].update({
+                'file_path': file_path,
+                'file_name': Path(file_path).name,
+                'user_id': user_id,
+                'cache_hit': True,
+            })
+            logger.debug("Parse cache hit for %s", file_path)
+        return cache_key, cached
+
+    def _extract_text(self, file_path: str, file_extension: str, timer: StageTimer) -> Tuple[str, Dict]:
         # Based on the file type, use the appropriate method to extract text
         if file_extension == ".pdf":             
-            text = self._extracting_from_pdf(file_path) #processing method for pdf          
-        elif file_extension in ['.docx','.doc']:  # Check if it's a Word document
-            text = self._extracting_from_docx(file_path) #processing method for docx         
-        else:             
-            raise ValueError(f"Unsupported file format: {file_path}") # returns false statement that the file type isn't supported like if it isn't a pdf or a docx it won't process. 
+            extraction = pdf_engines.extract_pdf_text(file_path, self.pdf_engine, timer) #processing method for pdf
+            text = extraction.text
+            extraction_info = extraction.as_metadata()  # which engine ran and how long it took
+        else:  # a Word document
+            text = self._extracting_from_docx(file_path, timer) #processing method for docx         
+            extraction_info = {'engine': 'docx-stream', 'elapsed_ms': round(timer.timings.get('docx', 0.0) * 1000, 3)}
             
         # Check if we actually got any text from the file
         if not text.strip():   #this is basically saying if no white space is found. this is just checking if the string is empty      
             raise ValueError("no text could be found")  #print that no text could be found
         #this is important when Scanned PDFs without OCR (image-only PDFs) corrupted files that opened but contained no text and files with only images/graphics
+        return text, extraction_info
 
-        #now we're going to parse the extracted text
-        parsed_data = self._parse_text(text) #so this line is to set up the parse data like the users name, experience, education etc etc. 
-        #it returns the parse info in a dict form or "hash map form"
-
+    def _finish_parse(self, parsed_data: Dict, file_path: str, user_id: Optional[int], text: str,
+                      extraction_info: Dict, cache_key: Optional[str], timer: StageTimer) -> Dict:
         #now we make the meta data. meta data just contained info on what the parse just processed. 
         #the meta data is It provides essential information about the parsing process itself, file characteristics, and processing statistics that are crucial for debugging, analytics, and database management so keep this in mind for next time your working with meta data. 
         parsed_data['metadata'] = { #what this does is create a metadata function in the dict parsed data. 
@@ -83,79 +314,55 @@ class ResumeParser: #this makes a class called resume parser
             #isoformat converts into "2024-01-15T14:30:25.123456" this format when displaying the time and day it was created. 
             'user_id' : user_id, #this just tracks the users id. each user is assigned an id 
             "text_length" :len(text), #this just tracks like the lengths of the text in the file. for example if a file has like 210010 text include punctuation, letters spaces etc 
-            "word_count" :len(text.split())  #this just only tracks the word count not including yk white space, just the words
+            "word_count" :len(text.split()),  #this just only tracks the word count not including yk white space, just the words
             # .split() breaks text into a list of words, len() counts how many items are in that list
+            "extraction": extraction_info,  #which extraction engine was used and how long it took
+            "cache_hit": False  #True when this result came out of the parse cache
         }
+        if cache_key is not None:
+            self.cache.put(cache_key, parsed_data)  # stored before the profile is added, that's per run
+        if isinstance(timer, StageProfiler):
+            parsed_data['metadata']['profile'] = timer.as_dict()  # wall time and allocations per stage
+        record_stages("resume", timer)  # feeds the histograms served at /api/metrics
+        # One log line per resume with the time of every stage as structured fields
+        if logger.isEnabledFor(logging.INFO):  # in quiet mode the fields are never built
+            logger.info("Resume parsed", extra={"fields": dict(file_name=Path(file_path).name, **timer.as_fields())})
         return parsed_data  # Send back all the parsed information as a dictionary
     
-    def _extracting_from_pdf(self, pdf_path: str) -> str: #what this is, we're making a function for extracting the data from the pdf, it'll return everything in string format.
+    def _extracting_from_pdf(self, pdf_path: str, timer: Optional[StageTimer] = None) -> str: #what this is, we're making a function for extracting the data from the pdf, it'll return everything in string format.
         #the pdf_path is the file path to the pdf and then it'll return it as a string
         # The underscore _ at the start means this is a "private" method - only used inside this class
         
-        text = "" #this an empty string because this is where the accumulated extracted text will go 
-        
-        # Try PDFPlumber first (this is our preferred method)
-        try: # try is just like saying "this might be risky code, try it"
-            with pdfplumber.open(pdf_path) as pdf: # so what this is doing is that its opening the file for u, thats why u use with. with with
-                #it opens the file and then when ur done with it, it completely closes this block out even if there's an error in the middle 
-                #so that line is just opening the file
-                 #it makes the the pdf is closed properly even if there is an error
-                 
-                # Loop through each page in the PDF
-                for page in pdf.pages:  #this is going to be looping through each page in the pdf the pdf.pages is a list of all the pages in the pdf 
-                    page_text = page.extract_text() #this is a method from pdf plumber. and it just tried to pull text form the pdf 
-                    if page_text:  # Only add text if we actually found some (not empty)
-                        text += page_text + "\n" # this one add the current page's text to the overall text, followed by a newline for separation
-                        # += means "add to the existing value" - it's the same as: text = text + page_text + "\n"
-                        
-            if text.strip(): #this just again removes extra white space from the end and beginning of the new text
-                print("📄 Text Extracted from PDF Plumber")
-                return text #send the full extracted text of the document when this function is called. 
-        except Exception as e: #this will run if any error is found int he try function 
-            #exception is a function in python that catches errors in ur code
-            #e just stores the error object in e 
-            print(f"PDFPlumber failed gang: {e}") #the e will get replace with the error message 
-            # f"..." is an f-string - it lets you put variables directly in strings using {variable_name}
-            
-        #this is just a fall back if pdfplumber doesn't work. 
-        # Second attempt: Try PyMuPDF (fitz) as backup
-        try: #again the try method its like js try this even if errors come up
-            doc = fitz.open(pdf_path) #this opens the pdf using the  PyMuPDF
-            #Returns a Document object stored in the variable doc. #Unlike the with statement, this does not auto-close — we'll have to call .close() manually later.
-            for page in doc: #loops through each page in the doc, 
-                text += page.get_text() #Adds (+=) that text to the text variable we've been building.
-            doc.close() #this just manually closes the loop because we didn't have a with statement.
-            # We MUST call .close() because fitz doesn't automatically close like pdfplumber does
-            if text.strip():  # Check if we got any actual text (not just whitespace)
-                print("📄 Text Extracted from PyMuPDF")
-                return text #returns the extracted text. 
-        except Exception as e:  # just raises the error that it failed.
-            print(f"PyMuPDF failed: {e}")
-        
-        # If we get here, both methods failed, so return whatever text we have (might be empty)
-        return text
+        # pdf_engines does the real work: in "auto" mode it tries the fast PyMuPDF engine first and only
+        # falls back to pdfplumber when the text looks garbled, lost its line breaks or mixed up columns.
+        # Either way, if one engine fails or finds nothing the other one gets a go.
+        extraction = pdf_engines.extract_pdf_text(pdf_path, self.pdf_engine, timer)
+        logger.debug("Text extracted from PDF with %s in %.1f ms", extraction.engine, extraction.elapsed_ms)
+        return extraction.text  # might be empty if every engine failed
     
-    def _extracting_from_docx(self, docx_path: str) -> str: #so this is how we're going to extract the info from docx
+    def _extracting_from_docx(self, docx_path: str, timer: Optional[StageTimer] = None) -> str: #so this is how we're going to extract the info from docx
         # This method handles Microsoft Word documents (.docx files)
+        # docx_reader streams the document XML straight out of the zip instead of loading it all with
+        # python-docx, so memory stays flat on big files, and it also reads tables and text boxes
+        timer = timer or StageTimer()
         try: 
-            doc = Document(docx_path)  # Create a Document object from the Word file
-            text = "" #this is the empty space to store the text extracted
-            
-            # Loop through every paragraph in the Word document
-            for paragraph in doc.paragraphs: # loops through the paragraphs in the word doc (FIXED: removed () because paragraphs is a property not method)
-                text += paragraph.text + "\n" # add the text to the paragraph variable to be used later
-                # Get the text from this paragraph and add it to our total text, plus a newline
-            print("📄 text extracted from docx")
+            with timer.stage("docx"):
+                text = extract_docx_text(docx_path)  # one line per paragraph or table row
+            logger.debug("Text extracted from DOCX")
             return text  # Return all the text we found
-        except Exception as e:  # If anything goes wrong while reading the Word document
-            print(f"text extraction from DOCX: {e}") 
+        except Exception as e:  # If anything goes wrong while reading the Word document (old binary .doc files end up here)
+            logger.warning("Text extraction from DOCX failed: %s", e)
             return ""  # Return an empty string if extraction failed
 
-    def _parse_text(self, text: str) -> dict: #so what this is going is just initializing what we're going to use to parse the
+    def _parse_text(self, text: str, timer: Optional[StageTimer] = None, doc=None) -> dict: #so what this is going is just initializing what we're going to use to parse the
         # This is the main parsing method that takes raw text and organizes it into categories
+        # doc is the spaCy doc of text when the caller already has one (parse_resumes runs them through nlp.pipe)
+        timer = timer or StageTimer()  # Times every stage below, parse_resume logs the totals
         
         # If spaCy is available, process the text with it for better analysis
-        doc = self.nlp(text) if self.nlp else None #what this is doing is taking the text and transform it into a doc the text from the pdf and converting it into language that is 
+        if doc is None and self.nlp:
+            with timer.stage("spacy"):
+                doc = self.nlp(text) #what this is doing is taking the text and transform it into a doc the text from the pdf and converting it into language that is 
         #readable for the spacy model to understand.
         # This creates a spaCy document object that understands grammar, entities, etc.
         
@@ -172,13 +379,21 @@ class ResumeParser: #this makes a class called resume parser
         }
 
         # Now fill in each section by calling specific extraction methods
-        result['personal_info'] = self._extract_personal_info(text, doc) #this gets info like name, number, email.
-        result["experience"] = self._extract_experience(text) #this will just extract the experience from the resume
-        result['education'] = self._extract_education(text, doc) #takes the education from the resume and uses  NLP entity recognition to detect school names, degrees, and dates
-        result['skills'] = self._extract_skills(text) #takes the skills
-        result['certifications'] = self._extract_certifications(text) 
-        result['awards'] = self._extract_awards(text)
-        result['projects'] = self._extract_projects(text) #just takes the raw text
+        with timer.stage("personal_info"):
+            result['personal_info'] = self._extract_personal_info(text, doc) #this gets info like name, number, email.
+        with timer.stage("experience"):
+            result["experience"] = self._extract_experience(text) #this will just extract the experience from the resume
+        with timer.stage("education"):
+            result['education'] = self._extract_education(text, doc) #takes the education from the resume and uses  NLP entity recognition to detect school names, degrees, and dates
+        with timer.stage("skills"):
+            result['skills'] = self._extract_skills(text) #takes the skills
+        with timer.stage("certifications"):
+            result['certifications'] = self._extract_certifications(text) 
+        with timer.stage("awards"):
+            result['awards'] = self._extract_awards(text)
+        with timer.stage("projects"):
+            result['projects'] = self._extract_projects(text) #just takes the raw text
+        result['sections'] = self._get_section_index(text).sections() #every header we found and the lines it covers
 
         return result  # Return the complete organized resume data
     
@@ -373,12 +588,12 @@ class ResumeParser: #this makes a class called resume parser
         job_blocks = []  # Will store separate job entries as text blocks
         current_block = []  # Accumulates lines for the current job being processed
         
-        print(f"🔍 Processing {len(lines)} lines for job splitting")
+        logger.debug("Processing %d lines for job splitting", len(lines))
         
-        # Print all lines for debugging purposes
-        print("📝 All lines in experience section:")
-        for i, line in enumerate(lines):
-            print(f"   {i:2d}: '{line}'")  # Print line number and content
+        # Log all lines for debugging purposes, only when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, line in enumerate(lines):
+                logger.debug("experience line %2d: %r", i, line)  # Line number and content
         
         # Look for job title patterns that indicate a new job entry
         for i, line in enumerate(lines):
@@ -386,7 +601,7 @@ class ResumeParser: #this makes a class called resume parser
             
             # Skip the main "Experience" header
             if line_stripped.lower() in ['experience', 'work experience', 'professional experience']:
-                print(f"⏭️ Skipping main header: {line_stripped}")
+                logger.debug("Skipping main header: %s", line_stripped)
                 continue  # Don't include section headers in job blocks
             
             # Check if this line looks like a job title using regex patterns
@@ -415,31 +630,30 @@ class ResumeParser: #this makes a class called resume parser
                 block_content = '\n'.join(current_block)  # Combine all lines in current block
                 if len(block_content.strip()) > 20:  # Only save blocks with reasonable content
                     job_blocks.append(block_content)
-                    print(f"💼 Saved job block: {current_block[0][:50]}...")  # Print first 50 chars
+                    logger.debug("Saved job block: %.50s", current_block[0])  # Only the first 50 chars
                 
                 # Start new job block
                 current_block = [line_stripped]
-                print(f"🆕 Starting new job block with: {line_stripped}")
+                logger.debug("Starting new job block with: %s", line_stripped)
             else:
                 # Add line to current job block
                 current_block.append(line_stripped)
-                print(f"   ➕ Added to current block: {line_stripped}")
+                logger.debug("Added to current block: %s", line_stripped)
         
         # Don't forget the last block when the loop ends
         if current_block:
             block_content = '\n'.join(current_block)
             if len(block_content.strip()) > 20:  # Only save if it has reasonable content
                 job_blocks.append(block_content)
-                print(f"💼 Saved final job block: {current_block[0][:50]}...")
+                logger.debug("Saved final job block: %.50s", current_block[0])
         
-        print(f"📦 Total job blocks created: {len(job_blocks)}")
+        logger.debug("Total job blocks created: %d", len(job_blocks))
         
         # Show what blocks were created (for debugging)
-        for i, block in enumerate(job_blocks):
-            print(f"\n--- Job Block {i+1} ---")
-            # Show first 200 characters of each block
-            print(block[:200] + ("..." if len(block) > 200 else ""))
-            print("--- End Block ---\n")
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, block in enumerate(job_blocks):
+                # Show first 200 characters of each block
+                logger.debug("job block %d: %.200r", i + 1, block)
         
         return job_blocks  # Return list of job block strings
     
@@ -462,14 +676,15 @@ class ResumeParser: #this makes a class called resume parser
                 "description": []    # List of job responsibilities
             }
 
-            print(f"🔍 Parsing job block with {len(lines)} lines:")
-            for i, line in enumerate(lines):
-                print(f"   Line {i}: '{line}'")  # Debug: show each line
+            logger.debug("Parsing job block with %d lines", len(lines))
+            if logger.isEnabledFor(logging.DEBUG):
+                for i, line in enumerate(lines):
+                    logger.debug("job block line %d: %r", i, line)  # Debug: show each line
 
             # Step 1: Find title (usually first line)
             if lines:
                 job_info['title'] = lines[0]  # Assume first line is the job title
-                print(f"✅ Title: '{job_info['title']}'")
+                logger.debug("Title: %r", job_info['title'])
 
             # Step 2: Find duration and company (could be in various positions)
             for i, line in enumerate(lines):
@@ -477,17 +692,17 @@ class ResumeParser: #this makes a class called resume parser
                 date_match = re.search(r'\b((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\s*[–—-]\s*(?:Present|Current|(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}))', line, re.IGNORECASE)
                 if date_match and not job_info['duration']:  # If we found a date and don't have one yet
                     job_info['duration'] = date_match.group(1)  # Save the date range
-                    print(f"✅ Duration: '{job_info['duration']}'")
+                    logger.debug("Duration: %r", job_info['duration'])
                 
                 # Look for company name (usually contains organization keywords)
                 if not job_info['company'] and ('Remote' in line or any(org in line for org in ['School', 'University', 'Foundation', 'AI', 'Coding'])):
                     job_info['company'] = line  # This line likely contains company info
-                    print(f"✅ Company: '{job_info['company']}'")
+                    logger.debug("Company: %r", job_info['company'])
                     
                     # Check if location is specified in the same line
                     if 'Remote' in line:
                         job_info['location'] = 'Remote'
-                        print(f"✅ Location: '{job_info['location']}'")
+                        logger.debug("Location: %r", job_info['location'])
 
             # Step 3: Extract descriptions (bullet points)
             description_lines = []
@@ -499,25 +714,20 @@ class ResumeParser: #this makes a class called resume parser
             # Clean up the descriptions by removing bullet point symbols
             job_info['description'] = [re.sub(r'^[•\-*]\s*', '', desc).strip() for desc in description_lines]
             # re.sub() replaces the bullet point symbols with empty string, .strip() removes extra whitespace
-            print(f"✅ Descriptions: {len(job_info['description'])} found")
+            logger.debug("Descriptions: %d found", len(job_info['description']))
 
             # Return job if we have essential info (at least a title)
             if job_info.get('title'):
-                print(f"🎉 Successfully parsed job:")
-                print(f"   Title: {job_info['title']}")
-                print(f"   Company: {job_info['company']}")
-                print(f"   Location: {job_info['location']}")
-                print(f"   Duration: {job_info['duration']}")
-                print(f"   Descriptions: {len(job_info['description'])}")
+                logger.debug("Parsed job title=%r company=%r location=%r duration=%r descriptions=%d",
+                             job_info['title'], job_info['company'], job_info['location'],
+                             job_info['duration'], len(job_info['description']))
                 return job_info  # Return the structured job information
             else:
-                print("❌ No title found, skipping job")
+                logger.debug("No title found, skipping job")
                 return None  # Can't create a job entry without a title
 
         except Exception as e:  # If anything goes wrong during parsing
-            print(f"❌ Error in _parse_job_block: {e}")
-            import traceback
-            traceback.print_exc()  # Print detailed error information for debugging
+            logger.exception("Error in _parse_job_block: %s", e)  # Logs the full traceback for debugging
             return None
     def _extract_education(self, text: str, doc) -> List[Dict]:
     
@@ -530,10 +740,13 @@ class ResumeParser: #this makes a class called resume parser
         )
 
         if not education_section:
-            print("⚠️ No education section found, searching entire text...")
+            logger.debug("No education section found, searching entire text")
             education_section = text
 
-        print(f"📚 Processing education section: {len(education_section)} characters")
+        logger.debug("Processing education section: %d characters", len(education_section))
+
+        # Every organization spaCy found in the resume, used below to fill in missing institutions
+        doc_orgs = list(dict.fromkeys(ent.text.strip() for ent in doc.ents if ent.label_ == "ORG")) if doc is not None else []
         
         # Split into lines for line-by-line processing
         lines = [line.strip() for line in education_section.split('\n') if line.strip()]
@@ -583,7 +796,7 @@ class ResumeParser: #this makes a class called resume parser
             
             if degree_found:
                 # Found a degree, start a new education entry
-                print(f"🎓 Found degree: {degree_found}")
+                logger.debug("Found degree: %s", degree_found)
                 
                 current_education = {
                     'degree': degree_found,
@@ -601,19 +814,19 @@ class ResumeParser: #this makes a class called resume parser
                     # Check if remaining text looks like an institution
                     if not re.match(r'^\d{4}', remaining_line) and 'gpa' not in remaining_line.lower():
                         current_education['institution'] = remaining_line
-                        print(f"🏫 Institution from same line: {remaining_line}")
+                        logger.debug("Institution from same line: %s", remaining_line)
                 
                 # Look for year in the same line
                 year_match = re.search(r'\b(19|20)\d{2}\b', line)
                 if year_match:
                     current_education['year'] = year_match.group(0)
-                    print(f"📅 Year from same line: {year_match.group(0)}")
+                    logger.debug("Year from same line: %s", year_match.group(0))
                 
                 # Look for GPA in the same line
                 gpa_match = re.search(r'GPA:?\s*(\d+\.?\d*(?:/\d+\.?\d*)?)', line, re.IGNORECASE)
                 if gpa_match:
                     current_education['gpa'] = gpa_match.group(1)
-                    print(f"📊 GPA from same line: {gpa_match.group(1)}")
+                    logger.debug("GPA from same line: %s", gpa_match.group(1))
                 
                 # Look ahead in next few lines for missing information
                 look_ahead = 3
@@ -634,14 +847,14 @@ class ResumeParser: #this makes a class called resume parser
                             not next_line_lower.startswith(('gpa', 'graduated', 'completed')) and
                             not re.match(r'^\d{4}', next_line))):
                             current_education['institution'] = next_line
-                            print(f"🏫 Institution from line {i+j}: {next_line}")
+                            logger.debug("Institution from line %d: %s", i + j, next_line)
                     
                     # Look for year if we don't have one
                     if not current_education['year']:
                         year_match = re.search(r'\b(19|20)\d{2}\b', next_line)
                         if year_match:
                             current_education['year'] = year_match.group(0)
-                            print(f"📅 Year from line {i+j}: {year_match.group(0)}")
+                            logger.debug("Year from line %d: %s", i + j, year_match.group(0))
                     
                     # Look for GPA if we don't have one
                     if not current_education['gpa']:
@@ -656,7 +869,7 @@ class ResumeParser: #this makes a class called resume parser
                             gpa_match = re.search(gpa_pattern, next_line, re.IGNORECASE)
                             if gpa_match:
                                 current_education['gpa'] = gpa_match.group(1)
-                                print(f"📊 GPA from line {i+j}: {gpa_match.group(1)}")
+                                logger.debug("GPA from line %d: %s", i + j, gpa_match.group(1))
                                 break
                     
                     # Look for location
@@ -670,26 +883,25 @@ class ResumeParser: #this makes a class called resume parser
                             loc_match = re.search(loc_pattern, next_line)
                             if loc_match:
                                 current_education['location'] = loc_match.group(1)
-                                print(f"📍 Location from line {i+j}: {loc_match.group(1)}")
+                                logger.debug("Location from line %d: %s", i + j, loc_match.group(1))
                                 break
                 
                 # Use spaCy to find institution if we still don't have one
-                if not current_education['institution'] and doc:
-                    # Look for organizations in the surrounding text
+                if not current_education['institution'] and doc_orgs:
+                    # Look for organizations in the surrounding text, using the entities spaCy already
+                    # found in the whole resume instead of running it again on this little window
                     context = ' '.join(lines[max(0, i-2):min(len(lines), i+4)])
-                    context_doc = self.nlp(context) if self.nlp else None
-                    if context_doc:
-                        orgs = [ent.text for ent in context_doc.ents if ent.label_ == "ORG"]
-                        if orgs:
-                            current_education['institution'] = orgs[0]
-                            print(f"🏫 Institution from spaCy: {orgs[0]}")
+                    orgs = sorted((org for org in doc_orgs if org in context), key=context.find)
+                    if orgs:
+                        current_education['institution'] = orgs[0]
+                        logger.debug("Institution from spaCy: %s", orgs[0])
                 
                 # Set default if still no institution
                 if not current_education['institution']:
                     current_education['institution'] = "Institution not specified"
                 
                 education.append(current_education)
-                print(f"✅ Added education entry: {current_education}")
+                logger.debug("Added education entry: %s", current_education)
             
             i += 1
         
@@ -702,7 +914,7 @@ class ResumeParser: #this makes a class called resume parser
                 seen.add(key)
                 unique_education.append(edu)
         
-        print(f"🎉 Total education entries: {len(unique_education)}")
+        logger.debug("Total education entries: %d", len(unique_education))
         return unique_education
 
     def _extract_skills(self, text: str) -> List[str]:
@@ -811,20 +1023,19 @@ class ResumeParser: #this makes a class called resume parser
         ])
         
         if not proj_section:
-            print("⚠️ No projects section found")
+            logger.debug("No projects section found")
             return []
         
-        print(f"🚀 Found projects section: {len(proj_section)} characters")
-        print(f"📝 Projects section content preview: {proj_section[:200]}...")
+        logger.debug("Found projects section: %d characters, preview: %.200r", len(proj_section), proj_section)
         
         projects = []
         lines = [line.strip() for line in proj_section.split('\n') if line.strip()]
         
         if not lines:
-            print("❌ No content lines found in projects section")
+            logger.debug("No content lines found in projects section")
             return []
         
-        print(f"📄 Processing {len(lines)} lines")
+        logger.debug("Processing %d project lines", len(lines))
         
         # Method 1: Look for clear project patterns first
         project_indicators = [
@@ -850,7 +1061,7 @@ class ResumeParser: #this makes a class called resume parser
             if line_lower in ['projects', 'side projects', 'personal projects', 'key projects', 
                             'notable projects', 'relevant projects', 'technical projects',
                             'project experience', 'portfolio', 'work samples']:
-                print(f"⏭️ Skipping section header: {line}")
+                logger.debug("Skipping section header: %s", line)
                 section_header_found = True
                 continue
             
@@ -860,7 +1071,7 @@ class ResumeParser: #this makes a class called resume parser
                 match = re.search(pattern, line)
                 if match:
                     project_name = match.group(1).strip()
-                    print(f"🎯 Found project with pattern '{pattern[:20]}...': '{project_name}'")
+                    logger.debug("Found project with pattern %.20r: %r", pattern, project_name)
                     break
             
             # If we found a project name
@@ -870,7 +1081,7 @@ class ResumeParser: #this makes a class called resume parser
                     current_project['description'] = '\n'.join(current_description).strip()
                     if current_project['description']:
                         projects.append(current_project)
-                        print(f"✅ Saved project: {current_project['name']}")
+                        logger.debug("Saved project: %s", current_project['name'])
                 
                 # Start new project
                 current_project = {
@@ -878,7 +1089,7 @@ class ResumeParser: #this makes a class called resume parser
                     'description': ''
                 }
                 current_description = []
-                print(f"🆕 Started new project: {project_name}")
+                logger.debug("Started new project: %s", project_name)
                 
             # If we have a current project, add description lines
             elif current_project:
@@ -896,7 +1107,7 @@ class ResumeParser: #this makes a class called resume parser
                 # Only add substantial description lines
                 if len(desc_line.strip()) > 5:
                     current_description.append(desc_line.strip())
-                    print(f"   ➕ Added description: {desc_line.strip()[:50]}...")
+                    logger.debug("Added description: %.50s", desc_line)
             
             # If we haven't found section header yet and no project indicators worked,
             # try alternative detection for less structured formats
@@ -909,14 +1120,14 @@ class ResumeParser: #this makes a class called resume parser
                     not re.match(r'.*\b(?:using|with|in|for|developed|created|built)\b', line_lower) and  # Not description-like
                     not re.match(r'^(?:technologies|tools|skills|languages):', line_lower)):  # Not tech list
                     
-                    print(f"🔍 Potential project name (unstructured): {line}")
+                    logger.debug("Potential project name (unstructured): %s", line)
                     
                     # Save previous project if exists
                     if current_project:
                         current_project['description'] = '\n'.join(current_description).strip()
                         if current_project['description']:
                             projects.append(current_project)
-                            print(f"✅ Saved project: {current_project['name']}")
+                            logger.debug("Saved project: %s", current_project['name'])
                     
                     # Start new project
                     current_project = {
@@ -924,28 +1135,28 @@ class ResumeParser: #this makes a class called resume parser
                         'description': ''
                     }
                     current_description = []
-                    print(f"🆕 Started new project (unstructured): {line}")
+                    logger.debug("Started new project (unstructured): %s", line)
                 
                 # Add as description if we have a current project
                 elif current_project and len(line.strip()) > 5:
                     current_description.append(line.strip())
-                    print(f"   ➕ Added description: {line.strip()[:50]}...")
+                    logger.debug("Added description: %.50s", line)
         
         # Don't forget the last project
         if current_project:
             current_project['description'] = '\n'.join(current_description).strip()
             projects.append(current_project)
-            print(f"✅ Saved final project: {current_project['name']}")
+            logger.debug("Saved final project: %s", current_project['name'])
         
         # Method 2: If we didn't find projects with structured approach, try splitting by blank lines
         if not projects:
-            print("🔄 No projects found with structured approach, trying paragraph-based splitting...")
+            logger.debug("No projects found with structured approach, trying paragraph-based splitting")
             
             # Join all lines and split by double newlines (paragraph breaks)
             full_text = '\n'.join(lines)
             paragraphs = [p.strip() for p in re.split(r'\n\s*\n', full_text) if p.strip()]
             
-            print(f"📊 Found {len(paragraphs)} paragraphs")
+            logger.debug("Found %d paragraphs", len(paragraphs))
             
             for i, paragraph in enumerate(paragraphs):
                 para_lines = [l.strip() for l in paragraph.split('\n') if l.strip()]
@@ -973,11 +1184,11 @@ class ResumeParser: #this makes a class called resume parser
                             'description': description if description else 'No description available'
                         }
                         projects.append(project)
-                        print(f"✅ Added project from paragraph {i+1}: {potential_name}")
+                        logger.debug("Added project from paragraph %d: %s", i + 1, potential_name)
         
         # Method 3: If still no projects, try even more aggressive parsing
         if not projects:
-            print("🔄 Still no projects found, trying aggressive line-by-line parsing...")
+            logger.debug("Still no projects found, trying aggressive line-by-line parsing")
             
             potential_projects = []
             for line in lines:
@@ -1002,7 +1213,7 @@ class ResumeParser: #this makes a class called resume parser
             # Take only reasonable number of potential projects
             projects.extend(potential_projects[:8])
             if potential_projects:
-                print(f"✅ Added {len(potential_projects)} projects from aggressive parsing")
+                logger.debug("Added %d projects from aggressive parsing", len(potential_projects))
         
         # Clean up and validate projects
         final_projects = []
@@ -1027,13 +1238,12 @@ class ResumeParser: #this makes a class called resume parser
             
             final_projects.append(project)
         
-        print(f"🎉 Final projects count: {len(final_projects)}")
+        logger.debug("Final projects count: %d", len(final_projects))
         
         # Show what we found
-        for i, project in enumerate(final_projects, 1):
-            print(f"📋 Project {i}: {project['name']}")
-            if project['description'] != 'No description available':
-                print(f"   Description: {project['description'][:100]}...")
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, project in enumerate(final_projects, 1):
+                logger.debug("Project %d: %s - %.100s", i, project['name'], project['description'])
         
         return final_projects[:10]  # Limit to 10 projects max
     
@@ -1043,147 +1253,63 @@ class ResumeParser: #this makes a class called resume parser
 
         
         
+    def _get_section_index(self, text: str) -> SectionIndex:
+        # Build the index once per resume and reuse it for every section lookup
+        index = getattr(self._local, 'section_index', None)
+        if index is None or (index.text is not text and index.text != text):
+            index = SectionIndex(text)
+            self._local.section_index = index
+        return index
+
     def _extract_section(self, text: str, section_names: List[str]) -> Optional[str]:
     
-        lines = text.split('\n')
-        section_start = -1
-        section_end = len(lines)
-        
-        print(f"🔍 Looking for sections: {section_names}")
-        
-        # Find section start with more precise matching
-        for i, line in enumerate(lines):
-            line_clean = line.strip().lower()
-            line_original = line.strip()
-            
-            # Skip empty lines
-            if not line_clean:
-                continue
-                
-            # Check for exact section matches with various formatting
-            for section_name in section_names:
-                section_lower = section_name.lower()
-                
-                # Exact match patterns
-                exact_patterns = [
-                    f"^{re.escape(section_lower)}$",                    # exact match
-                    f"^{re.escape(section_lower)}:$",                   # with colon
-                    f"^{re.escape(section_lower)}\s*:?$",               # with optional colon
-                    f"^-+\s*{re.escape(section_lower)}\s*-+$",          # with dashes
-                    f"^=+\s*{re.escape(section_lower)}\s*=+$",          # with equals
-                    f"^\*+\s*{re.escape(section_lower)}\s*\*+$",        # with asterisks
-                    f"^#+\s*{re.escape(section_lower)}",                # markdown headers
-                    f"^{re.escape(section_lower)}\s*\|\s*",             # with pipe
-                ]
-                
-                # Check if line matches any pattern
-                if any(re.match(pattern, line_clean) for pattern in exact_patterns):
-                    section_start = i
-                    print(f"✅ Found section '{section_name}' at line {i}: '{line_original}'")
-                    break
-                    
-                # Also check if it's just the section name alone on a line (common case)
-                if (line_clean == section_lower or 
-                    (section_lower in line_clean and len(line_clean) <= len(section_lower) + 5)):
-                    section_start = i
-                    print(f"✅ Found section '{section_name}' (loose match) at line {i}: '{line_original}'")
-                    break
-            
-            if section_start != -1:
-                break
+        index = self._get_section_index(text)
+        span = index.find(section_names)
         
-        if section_start == -1:
-            print(f"❌ No section found for: {section_names}")
+        if span is None:
+            logger.debug("No section found for: %s", section_names)
             return None
         
-        # Find section end - look for next major section
-        major_sections = [
-            'experience', 'work experience', 'employment', 'work history', 'professional experience',
-            'education', 'academic background', 'qualifications', 'academic',
-            'skills', 'technical skills', 'competencies', 'core competencies',
-            'projects', 'side projects', 'personal projects', 'key projects', 'portfolio',
-            'certifications', 'certificates', 'licenses', 'credentials',
-            'awards', 'honors', 'achievements', 'recognition', 'accomplishments',
-            'volunteer', 'volunteer experience', 'community service',
-            'publications', 'research', 'patents',
-            'languages', 'references', 'interests', 'hobbies'
-        ]
-        
-        current_section = section_names[0].lower()  # The section we just found
-        
-        for i in range(section_start + 1, len(lines)):
-            line = lines[i].strip()
-            line_lower = line.lower()
-            
-            if not line:  # Skip empty lines
-                continue
-                
-            # Check if this line looks like a new major section header
-            for major_section in major_sections:
-                if major_section == current_section:  # Don't end on same section name
-                    continue
-                    
-                # Same patterns as above for detecting section headers
-                exact_patterns = [
-                    f"^{re.escape(major_section)}$",
-                    f"^{re.escape(major_section)}:$",
-                    f"^{re.escape(major_section)}\s*:?$",
-                    f"^-+\s*{re.escape(major_section)}\s*-+$",
-                    f"^=+\s*{re.escape(major_section)}\s*=+$",
-                    f"^\*+\s*{re.escape(major_section)}\s*\*+$",
-                    f"^#+\s*{re.escape(major_section)}",
-                ]
-                
-                if any(re.match(pattern, line_lower) for pattern in exact_patterns):
-                    section_end = i
-                    print(f"🛑 Section ends at line {i} (found '{major_section}'): '{line}'")
-                    break
-                    
-                # Also check loose match for common section names
-                if (line_lower == major_section or 
-                    (major_section in line_lower and len(line_lower) <= len(major_section) + 5)):
-                    section_end = i
-                    print(f"Section ends at line {i} (loose match '{major_section}'): '{line}'")
-                    break
-            
-            if section_end != len(lines):  # If we found an end
-                break
+        section_start, section_end = span
+        logger.debug("Found section %r at lines %d-%d", section_names[0], section_start, section_end)
         
         # Extract the section content
-        section_lines = lines[section_start:section_end]
-        section_content = '\n'.join(section_lines)
-        
-        print(f"📄 Extracted section with {len(section_lines)} lines")
-        print(f"📝 Section preview: {section_content[:200]}...")
-        
-        return section_content
+        return '\n'.join(index.lines[section_start:section_end])
 
 
 
-    def parse_resume_for_flask(file_path: str, user_id: int = None) -> Dict: 
-        """Enhanced function for Flask integration with better error handling"""
-        # This is a standalone function (not part of the class) for easy use with Flask web framework
-        
-        parser = ResumeParser()  # Create a new parser instance
-        try:
-            # Try to parse the resume
-            parsed_data = parser.parse_resume(file_path, user_id)
-            # If successful, return success response
-            return{
-                'success': True,           # Flag indicating success
-                'data': parsed_data,       # The actual parsed resume data
-                'message': 'Resume parsed successfully'  # Human-readable message
-            }
-        except Exception as e:  # If anything goes wrong
-            # Return error response instead of crashing
-            return{
-                'success': False,          # Flag indicating failure
-                'data': None,              # No data since parsing failed
-                'message': f'Resume parsing failed: {str(e)}'  # Error message
-            }
+def get_shared_parser() -> ResumeParser:
+    """Return the process-wide ResumeParser used by the Flask routes"""
+    # ResumeParser keeps no per-resume state, so one instance can serve every request
+    return model_registry.get_or_load("resume_parser", ResumeParser)
+
+
+def parse_resume_for_flask(file_path: str, user_id: int = None) -> Dict: 
+    """Enhanced function for Flask integration with better error handling"""
+    # This is a standalone function (not part of the class) for easy use with Flask web framework
+    
+    parser = get_shared_parser()  # Reuse the shared parser instead of loading spaCy per request
+    try:
+        # Try to parse the resume
+        parsed_data = parser.parse_resume(file_path, user_id)
+        # If successful, return success response
+        return{
+            'success': True,           # Flag indicating success
+            'data': parsed_data,       # The actual parsed resume data
+            'message': 'Resume parsed successfully'  # Human-readable message
+        }
+    except Exception as e:  # If anything goes wrong
+        # Return error response instead of crashing
+        return{
+            'success': False,          # Flag indicating failure
+            'data': None,              # No data since parsing failed
+            'message': f'Resume parsing failed: {str(e)}'  # Error message
+        }
 
 # This section only runs when the script is executed directly (not imported)
 if __name__ == "__main__":
+    from log_config import configure_logging
+    configure_logging()  # Show the per-stage timing line (set RESUMEAI_LOG_LEVEL=DEBUG for every step)
     parser = ResumeParser()  # Create a parser instance
     
     # Test with your resume file
@@ -1307,10 +1433,7 @@ if __name__ == "__main__":
             print("="*50)  # Closing line
             
         except Exception as e:  # If parsing fails
-            import traceback
-            print(f"❌ Error: {e}")
-            print("Full traceback:")
-            traceback.print_exc()  # Print detailed error information for debugging
+            logger.exception("❌ Error: %s", e)  # Logs the full traceback for debugging
     else:
         print(f"❌ Test file '{test_file}' not found. Please add a resume file to test.")\
         
@@ -1,13 +1,55 @@
-from flask import Blueprint, request, jsonify
+import os
+import uuid
+from flask import Blueprint, request, jsonify, current_app
+from models import db, Resume
+from parse_queue import ensure_worker_pool, get_default_queue
 resume_blueprint = Blueprint('resume', __name__)
 
+UPLOAD_FOLDER = os.environ.get('RESUMEAI_UPLOAD_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'uploads')
+ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.doc'}
+
 @resume_blueprint.route('/api/resume/download', methods=['POST'])
 def resume_download():
     return jsonify({'message': 'Resume downloaded successfully'})
 
 @resume_blueprint.route("/api/resume/upload", methods = ['POST'])
 def resume_upload():
-    return jsonify({'message': 'Resume uploaded successfully'})
+    # Only stores the file and queues it, parsing happens in the worker pool (see parse_queue.py)
+    # so this returns in milliseconds however long the resume takes to parse
+    upload = request.files.get('file')
+    user_id = request.form.get('user_id', type=int)
+    if upload is None or not upload.filename or user_id is None:
+        return jsonify({'message': 'A file and a user_id are required'}), 400
+    extension = os.path.splitext(upload.filename)[1].lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        return jsonify({'message': f'Unsupported file type: {extension or "none"}'}), 400
+
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    file_path = os.path.join(UPLOAD_FOLDER, uuid.uuid4().hex + extension)  # never trust the client's file name
+    upload.save(file_path)
+    resume = Resume(user_id=user_id, title=request.form.get('title') or upload.filename, file_path=file_path)
+    db.session.add(resume)
+    db.session.commit()
+
+    job_id = get_default_queue().enqueue(resume.id, file_path, user_id)
+    ensure_worker_pool(current_app._get_current_object())
+    return jsonify({
+        'message': 'Resume uploaded successfully',
+        'resume_id': resume.id,
+        'job_id': job_id,
+        'status': 'queued',
+    }), 202
+
+@resume_blueprint.route("/api/resume/status/<job_id>", methods = ['GET'])
+def resume_status(job_id):
+    job = get_default_queue().get(job_id)
+    if job is None:
+        return jsonify({'message': 'Unknown job id'}), 404
+    response = {key: job[key] for key in ('status', 'resume_id', 'attempts', 'error', 'created_at', 'started_at', 'finished_at')}
+    if job['status'] == 'done':
+        resume = db.session.get(Resume, job['resume_id'])
+        response['parsed_data'] = resume.get_parsed_data() if resume is not None else None
+    return jsonify(response)
 
 @resume_blueprint.route("/api/resume/list", methods = ['GET'])
 def resume_list():
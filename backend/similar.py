@@ -0,0 +1,393 @@
+#Near-duplicate detection for job descriptions and resumes.
+#The same role gets cross-posted with a different footer, and resume versions differ by a line. Comparing a
+#new document against every stored one doesn't scale, so every document is reduced to a MinHash signature of
+#its word shingles and signatures are bucketed with LSH (locality sensitive hashing): a lookup only compares
+#against the documents that share at least one band bucket, and only pairs whose estimated Jaccard
+#similarity reaches the threshold are reported.
+#
+#   index = NearDuplicateIndex(threshold=0.85)
+#   index.add(job.id, job.content)
+#   index.find_duplicate(new_content)   -> (job_id, similarity) or None
+#
+#a text with no words has no signature: it is never stored and never reported as anybody's duplicate.
+#
+#the routes use get_shared_index(), whose signatures also go to a SQLite file shared by every worker
+#process (RESUMEAI_DUPLICATES_PATH, default instance/near_duplicates.db), so a document saved through one
+#worker is found by all of them. Each process reads only the signatures added since it last looked. The
+#store is compacted now and then (only the newest row of every document is kept), a process that was behind
+#the compaction rebuilds its index from the store. Documents saved before the store existed are imported
+#once by import_existing(), which reads every document and is run on a background thread.
+
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from job_parser import clean_and_preprocess
+from log_config import get_logger
+
+logger = get_logger("similar")
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 5 #words per shingle
+COMPACT_EVERY = 1000 #adds and removes by one process between checks whether the store needs compacting
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'near_duplicates.db')
+
+
+def shingles(text: str, size: int = DEFAULT_SHINGLE_SIZE) -> Set[str]:
+    #overlapping runs of `size` words of the cleaned text, short texts become a single shingle
+    words = clean_and_preprocess(text).split()
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    #(bands, rows per band) whose LSH S-curve crosses 50% closest to the threshold, (1/b)^(1/r) ~ threshold
+    best = (num_perm, 1)
+    best_error = float('inf')
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class MinHasher:
+    """MinHash signatures of shingle sets, num_perm 32-bit values per document
+
+    Shingles are hashed with crc32 and permuted with multiply-shift hashing, all in NumPy, so signatures are
+    the same in every process and can be stored.
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1) #odd multipliers
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        #None when the text has no words, every empty document would otherwise look identical
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text, self.shingle_size)),
+                             dtype=np.uint64)
+        if not len(hashes):
+            return None
+        #(a * x + b) mod 2^64, top 32 bits. uint64 arithmetic wraps, which is exactly the mod
+        with np.errstate(over='ignore'):
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+def estimate_jaccard(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    return float(np.mean(signature_a == signature_b))
+
+
+class NearDuplicateIndex:
+    """MinHash + LSH index, lookups touch only the documents sharing a band bucket with the query"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM,
+                 shingle_size: int = DEFAULT_SHINGLE_SIZE, seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.bands, self.rows = _optimal_bands(threshold, num_perm)
+        self._buckets: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._signatures
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, item_id: Hashable, text: Optional[str] = None, signature: Optional[np.ndarray] = None):
+        #pass the text, or a signature computed earlier with the same settings. A document without a
+        #signature (no words) is only removed, if it was there
+        if signature is None:
+            signature = self.hasher.signature(text or "")
+        with self._lock:
+            self._remove_locked(item_id)
+            if signature is None:
+                return
+            self._signatures[item_id] = signature
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                buckets.setdefault(key, set()).add(item_id)
+
+    def remove(self, item_id: Hashable):
+        with self._lock:
+            self._remove_locked(item_id)
+
+    def _remove_locked(self, item_id: Hashable):
+        signature = self._signatures.pop(item_id, None)
+        if signature is None:
+            return
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del buckets[key]
+
+    def query(self, text: Optional[str] = None, signature: Optional[np.ndarray] = None,
+              threshold: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        #every stored document whose estimated Jaccard similarity reaches the threshold, most similar first.
+        #the bands are tuned for the index threshold, a lower threshold here will miss most candidates
+        if signature is None:
+            signature = self.hasher.signature(text or "")
+        if signature is None:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            candidates: Set[Hashable] = set()
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(buckets.get(key, ()))
+            scored = [(item_id, estimate_jaccard(signature, self._signatures[item_id])) for item_id in candidates]
+        matches = [(item_id, score) for item_id, score in scored if score >= threshold]
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def find_duplicate(self, text: Optional[str] = None, signature: Optional[np.ndarray] = None,
+                       exclude: Optional[Hashable] = None) -> Optional[Tuple[Hashable, float]]:
+        #the closest near-duplicate (other than exclude), or None
+        for item_id, score in self.query(text, signature):
+            if item_id != exclude:
+                return item_id, score
+        return None
+
+
+class SignatureStore:
+    """Append-only log of MinHash signatures in SQLite, shared by every worker process
+
+    Every add or remove is a new row, seq orders them, so a process catches up by reading the rows after the
+    last seq it applied. A row without a signature removes the document. compact() drops every row that a
+    newer one for the same document replaced, and the removals, up to a horizon seq: a process that applied
+    less than that may have missed a removal and has to read everything again.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_STORE_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, item_id INTEGER NOT NULL, signature BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signatures_name_seq ON signatures(name, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signatures_name_item ON signatures(name, item_id, seq)")
+        #per name, the seq the last compaction went up to
+        self._conn.execute("CREATE TABLE IF NOT EXISTS compactions (name TEXT PRIMARY KEY, seq INTEGER NOT NULL)")
+        #names whose documents saved before the store existed have been imported
+        self._conn.execute("CREATE TABLE IF NOT EXISTS imported (name TEXT PRIMARY KEY)")
+
+    @staticmethod
+    def _blob(signature: Optional[np.ndarray]) -> Optional[bytes]:
+        return None if signature is None else np.asarray(signature, dtype=np.uint32).tobytes()
+
+    def put(self, name: str, item_id: int, signature: Optional[np.ndarray]):
+        with self._lock:
+            self._conn.execute("INSERT INTO signatures (name, item_id, signature) VALUES (?, ?, ?)",
+                               (name, item_id, self._blob(signature)))
+
+    def changes(self, name: str, after_seq: int) -> Tuple[int, List[Tuple[int, int, Optional[np.ndarray]]]]:
+        #(compaction horizon, [(seq, item_id, signature or None)] of every row after after_seq, oldest first),
+        #both read from the same snapshot
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                horizon = self._conn.execute("SELECT seq FROM compactions WHERE name = ?", (name,)).fetchone()
+                rows = self._conn.execute(
+                    "SELECT seq, item_id, signature FROM signatures WHERE name = ? AND seq > ? ORDER BY seq",
+                    (name, after_seq),
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        return (horizon[0] if horizon else 0,
+                [(seq, item_id, None if blob is None else np.frombuffer(blob, dtype=np.uint32))
+                 for seq, item_id, blob in rows])
+
+    def needs_compaction(self, name: str, min_rows: int = COMPACT_EVERY) -> bool:
+        #at least min_rows rows, and at least half of them replaced or removed documents
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM signatures WHERE name = ?", (name,)).fetchone()[0]
+            if rows < min_rows:
+                return False
+            live = self._conn.execute(
+                "SELECT COUNT(*) FROM (SELECT item_id, MAX(seq) AS seq FROM signatures WHERE name = ? GROUP BY item_id) latest"
+                " JOIN signatures ON signatures.seq = latest.seq WHERE signatures.signature IS NOT NULL",
+                (name,),
+            ).fetchone()[0]
+        return rows >= 2 * live
+
+    def compact(self, name: str) -> int:
+        #keeps only the newest row of every document that still exists, returns how many rows were dropped
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                horizon = self._conn.execute("SELECT MAX(seq) FROM signatures WHERE name = ?", (name,)).fetchone()[0]
+                if horizon is None:
+                    self._conn.execute("ROLLBACK")
+                    return 0
+                dropped = self._conn.execute(
+                    "DELETE FROM signatures WHERE name = ? AND (signature IS NULL OR seq NOT IN"
+                    " (SELECT MAX(seq) FROM signatures WHERE name = ? GROUP BY item_id))",
+                    (name, name),
+                ).rowcount
+                self._conn.execute("INSERT OR REPLACE INTO compactions (name, seq) VALUES (?, ?)", (name, horizon))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return dropped
+
+    def is_imported(self, name: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM imported WHERE name = ?", (name,)).fetchone() is not None
+
+    def import_documents(self, name: str, signatures: Iterable[Tuple[int, Optional[np.ndarray]]]) -> bool:
+        #stores the signatures of documents saved before the store existed, once: False if another process
+        #already did. BEGIN IMMEDIATE makes the check and the insert one step
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute("SELECT 1 FROM imported WHERE name = ?", (name,)).fetchone() is not None:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.executemany("INSERT INTO signatures (name, item_id, signature) VALUES (?, ?, ?)",
+                                       ((name, item_id, self._blob(signature)) for item_id, signature in signatures
+                                        if signature is not None))
+                self._conn.execute("INSERT INTO imported (name) VALUES (?)", (name,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+
+class SharedNearDuplicateIndex(NearDuplicateIndex):
+    """A NearDuplicateIndex whose adds and removes also go to a SignatureStore, refresh() applies everybody else's"""
+
+    def __init__(self, name: str, store: SignatureStore, threshold: float = DEFAULT_THRESHOLD, **options):
+        super().__init__(threshold, **options)
+        self.name = name
+        self.store = store
+        self._seq = 0 #last store row applied here
+        self._refresh_lock = threading.Lock()
+        self._writes = 0
+
+    def refresh(self) -> int:
+        with self._refresh_lock:
+            horizon, changes = self.store.changes(self.name, self._seq)
+            if 0 < self._seq < horizon:
+                #compacted past what we applied, a removal we never saw may be gone: read everything again
+                with self._lock:
+                    self._buckets = [{} for _ in range(self.bands)]
+                    self._signatures = {}
+                self._seq = 0
+                horizon, changes = self.store.changes(self.name, 0)
+            for seq, item_id, signature in changes:
+                if signature is None:
+                    super().remove(item_id)
+                else:
+                    super().add(item_id, signature=signature)
+                self._seq = seq
+        return len(changes)
+
+    def add(self, item_id: Hashable, text: Optional[str] = None, signature: Optional[np.ndarray] = None):
+        if signature is None:
+            signature = self.hasher.signature(text or "")
+        self.store.put(self.name, item_id, signature)
+        super().add(item_id, signature=signature)
+        self._wrote()
+
+    def remove(self, item_id: Hashable):
+        self.store.put(self.name, item_id, None)
+        super().remove(item_id)
+        self._wrote()
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % COMPACT_EVERY == 0:
+            self.compact_if_needed()
+
+    def compact_if_needed(self) -> int:
+        try:
+            if not self.store.needs_compaction(self.name):
+                return 0
+            dropped = self.store.compact(self.name)
+        except sqlite3.Error as e:
+            logger.warning("could not compact the near-duplicate store: %s", e)
+            return 0
+        logger.info("Near-duplicate store compacted", extra={"fields": {"name": self.name, "dropped": dropped}})
+        return dropped
+
+
+_shared_indexes: Dict[str, NearDuplicateIndex] = {}
+_shared_indexes_lock = threading.Lock()
+_store: Optional[SignatureStore] = None
+_imported: Set[str] = set() #names import_existing() is done with in this process
+
+
+def _get_store() -> Optional[SignatureStore]:
+    #called with _shared_indexes_lock held. None when the file can't be opened, the indexes are then per process
+    global _store
+    if _store is None:
+        path = os.environ.get("RESUMEAI_DUPLICATES_PATH", DEFAULT_STORE_PATH)
+        try:
+            _store = SignatureStore(path)
+        except sqlite3.Error as e:
+            logger.warning("near-duplicate store disabled (%s), every worker only sees its own documents: %s", path, e)
+            return None
+    return _store
+
+
+def get_shared_index(name: str, threshold: float = DEFAULT_THRESHOLD) -> NearDuplicateIndex:
+    #one index per kind of document ("job", "resume") per process, kept up to date with the shared store on
+    #every call. Documents saved before the store existed are only in it once import_existing() has run
+    with _shared_indexes_lock:
+        index = _shared_indexes.get(name)
+        if index is None:
+            store = _get_store()
+            index = NearDuplicateIndex(threshold) if store is None else SharedNearDuplicateIndex(name, store, threshold)
+            _shared_indexes[name] = index
+    if isinstance(index, SharedNearDuplicateIndex):
+        index.refresh()
+    return index
+
+
+def import_existing(name: str, load_documents) -> int:
+    #signs the documents saved before the store existed, load_documents() -> [(id, text)]. Runs once per store
+    #(once per process without a store) and reads every document, so callers run it on a background thread.
+    #only the store's own transaction guards it, lookups on the index go on meanwhile.
+    #also compacts the store if it needs it, before this process replays it
+    if name in _imported:
+        return 0
+    index = get_shared_index(name)
+    imported = 0
+    if isinstance(index, SharedNearDuplicateIndex):
+        if not index.store.is_imported(name):
+            signatures = [(item_id, index.hasher.signature(text)) for item_id, text in load_documents()]
+            if index.store.import_documents(name, signatures):
+                imported = len(signatures)
+        index.compact_if_needed()
+        index.refresh()
+    else:
+        for item_id, text in load_documents():
+            index.add(item_id, text)
+            imported += 1
+    _imported.add(name)
+    if imported:
+        logger.info("Near-duplicate index built", extra={"fields": {"name": name, "documents": imported}})
+    return imported
@@ -0,0 +1,72 @@
+import zipfile
+
+from docx_reader import extract_docx_text, iter_docx_lines
+
+NAMESPACES = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+              'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+              'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+              'xmlns:v="urn:schemas-microsoft-com:vml"')
+
+
+def paragraph(*runs):
+    return "<w:p>" + "".join(f"<w:r>{run}</w:r>" for run in runs) + "</w:p>"
+
+
+def text(value):
+    return f'<w:t xml:space="preserve">{value}</w:t>'
+
+
+def cell(*paragraphs):
+    return "<w:tc>" + "".join(paragraphs) + "</w:tc>"
+
+
+def write_docx(path, body):
+    document = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document {NAMESPACES}><w:body>{body}</w:body></w:document>'
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr("word/document.xml", document)
+    return str(path)
+
+
+def test_paragraphs_runs_tabs_and_breaks(tmp_path):
+    path = write_docx(tmp_path / "resume.docx", "".join([
+        paragraph(text("Jane "), text("Doe")),
+        paragraph(text("Skills"), "<w:tab/>", text("Python")),
+        paragraph(text("line one"), "<w:br/>", text("line two")),
+        "<w:p/>",
+    ]))
+    assert list(iter_docx_lines(path)) == ["Jane Doe", "Skills\tPython", "line one\nline two", ""]
+    assert extract_docx_text(path) == "Jane Doe\nSkills\tPython\nline one\nline two\n\n"
+
+
+def test_tables_become_one_line_per_row(tmp_path):
+    table = "<w:tbl>" + "".join([
+        "<w:tr>" + cell(paragraph(text("2019 - 2023"))) + cell(paragraph(text("Engineer")), paragraph(text("Acme"))) + "</w:tr>",
+        "<w:tr>" + cell(paragraph(text("Languages"))) + cell("<w:p/>") + "</w:tr>",
+    ]) + "</w:tbl>"
+    path = write_docx(tmp_path / "resume.docx", paragraph(text("Experience")) + table + paragraph(text("Education")))
+    assert list(iter_docx_lines(path)) == ["Experience", "2019 - 2023\tEngineer Acme", "Languages", "Education"]
+
+
+def test_text_box_is_read_once(tmp_path):
+    # Word stores a text box twice: the modern shape and a VML copy under mc:Fallback
+    text_box = (
+        "<mc:AlternateContent>"
+        "<mc:Choice Requires=\"wps\"><w:drawing><wps:txbx><w:txbxContent>"
+        + paragraph(text("Contact: jane@example.com")) +
+        "</w:txbxContent></wps:txbx></w:drawing></mc:Choice>"
+        "<mc:Fallback><w:pict><v:textbox><w:txbxContent>"
+        + paragraph(text("Contact: jane@example.com")) +
+        "</w:txbxContent></v:textbox></w:pict></mc:Fallback>"
+        "</mc:AlternateContent>"
+    )
+    body = "<w:p><w:r>" + text_box + "</w:r><w:r>" + text("Jane Doe") + "</w:r></w:p>" + paragraph(text("Summary"))
+    path = write_docx(tmp_path / "resume.docx", body)
+    assert list(iter_docx_lines(path)) == ["Contact: jane@example.com", "Jane Doe", "Summary"]
+
+
+def test_large_document(tmp_path):
+    body = "".join(paragraph(text(f"bullet {i}")) for i in range(20000))
+    path = write_docx(tmp_path / "resume.docx", body)
+    lines = list(iter_docx_lines(path))
+    assert len(lines) == 20000 and lines[-1] == "bullet 19999"
@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+from embedding_matrix import EmbeddingMatrixFile
+
+
+def unit_rows(n, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = rng.normal(size=(n, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_create_and_read(tmp_path):
+    path = str(tmp_path / "jobs.emb")
+    vectors = unit_rows(3)
+    matrix = EmbeddingMatrixFile.create(path, 8, "bert", ids=[10, 11, 12], vectors=vectors)
+    assert len(matrix) == 3 and 11 in matrix and 13 not in matrix
+    np.testing.assert_allclose(matrix.get(11), vectors[1])
+    assert matrix.get(13) is None
+    reader = EmbeddingMatrixFile(path)
+    assert (reader.dim, reader.model_tag, reader.dtype) == (8, "bert", np.dtype(np.float32))
+    assert reader.ids.tolist() == [10, 11, 12]
+
+
+def test_reader_sees_appends_after_refresh(tmp_path):
+    path = str(tmp_path / "jobs.emb")
+    vectors = unit_rows(4)
+    writer = EmbeddingMatrixFile.create(path, 8, "bert", ids=[1, 2], vectors=vectors[:2])
+    reader = EmbeddingMatrixFile(path)
+    writer.append([3, 4], vectors[2:])
+    assert 3 not in reader
+    reader.refresh()
+    assert reader.ids.tolist() == [1, 2, 3, 4]
+    np.testing.assert_allclose(reader.get(4), vectors[3])
+
+
+def test_two_writers_append_without_overwriting(tmp_path):
+    # Each writer only knows the rows it mapped, the header count decides where the next row goes
+    path = str(tmp_path / "jobs.emb")
+    vectors = unit_rows(3)
+    EmbeddingMatrixFile.create(path, 8, "bert")
+    first, second = EmbeddingMatrixFile(path, "a"), EmbeddingMatrixFile(path, "a")
+    first.append([1], vectors[:1])
+    second.append([2], vectors[1:2])
+    first.append([3], vectors[2:])
+    reader = EmbeddingMatrixFile(path)
+    assert reader.ids.tolist() == [1, 2, 3]
+    for item_id, vector in zip([1, 2, 3], vectors):
+        np.testing.assert_allclose(reader.get(item_id), vector)
+
+
+def test_readding_an_id_supersedes_its_row(tmp_path):
+    path = str(tmp_path / "jobs.emb")
+    vectors = unit_rows(3)
+    matrix = EmbeddingMatrixFile.create(path, 8, "bert", ids=[1, 2], vectors=vectors[:2])
+    matrix.append([1], vectors[2:])
+    assert len(matrix) == 2 and matrix.count == 3
+    assert matrix.live_mask.tolist() == [False, True, True]
+    np.testing.assert_allclose(matrix.get(1), vectors[2])
+    # the old row of id 1 is masked out, even for a query equal to it
+    result = dict(matrix.top_k(vectors[0], k=5))
+    assert sorted(result) == [1, 2]
+    assert result[1] == pytest.approx(float(vectors[2] @ vectors[0]), abs=1e-5)
+
+
+def test_top_k_orders_by_similarity(tmp_path):
+    path = str(tmp_path / "jobs.emb")
+    vectors = unit_rows(5)
+    matrix = EmbeddingMatrixFile.create(path, 8, "bert", ids=range(5), vectors=vectors)
+    scores = vectors @ vectors[2]
+    expected = [int(i) for i in np.argsort(-scores)[:3]]
+    result = matrix.top_k(vectors[2], k=3)
+    assert [item_id for item_id, _ in result] == expected
+    assert result[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_compact_keeps_newest_rows_and_readers_follow(tmp_path):
+    path = str(tmp_path / "jobs.emb")
+    vectors = unit_rows(4)
+    matrix = EmbeddingMatrixFile.create(path, 8, "bert", ids=[1, 2, 3], vectors=vectors[:3])
+    matrix.append([2], vectors[3:])
+    reader = EmbeddingMatrixFile(path)
+    compacted = matrix.compact()
+    assert compacted.count == 3 and compacted.live_mask.all()
+    assert sorted(compacted.ids.tolist()) == [1, 2, 3]
+    np.testing.assert_allclose(compacted.get(2), vectors[3])
+    # the reader still has the old file mapped until it refreshes
+    assert reader.count == 4
+    reader.refresh()
+    assert reader.count == 3
+    np.testing.assert_allclose(reader.get(2), vectors[3])
+    # a writer that mapped the file before the compaction appends to the new one
+    matrix.append([4], vectors[:1])
+    reader.refresh()
+    assert sorted(reader.ids.tolist()) == [1, 2, 3, 4]
+
+
+def test_open_or_create_appends_only_missing_ids(tmp_path):
+    path = str(tmp_path / "jobs.emb")
+    vectors = unit_rows(4)
+    EmbeddingMatrixFile.create(path, 8, "bert", ids=[1, 2], vectors=vectors[:2])
+    other = EmbeddingMatrixFile(path, "a")
+    other.append([3], vectors[2:3])
+    # a process that only knows ids 1, 2 and 4 must not drop the row another process added
+    matrix = EmbeddingMatrixFile.open_or_create(path, 8, "bert", ids=[1, 2, 4], vectors=vectors[[0, 1, 3]])
+    assert matrix.ids.tolist() == [1, 2, 3, 4]
+    assert matrix.count == 4
+
+
+def test_open_or_create_replaces_another_models_file(tmp_path):
+    path = str(tmp_path / "jobs.emb")
+    EmbeddingMatrixFile.create(path, 8, "bert", ids=[1], vectors=unit_rows(1))
+    matrix = EmbeddingMatrixFile.open_or_create(path, 4, "minilm", ids=[2], vectors=unit_rows(1, dim=4))
+    assert (matrix.dim, matrix.model_tag, matrix.ids.tolist()) == (4, "minilm", [2])
+
+
+def test_float16_and_invalid_input(tmp_path):
+    path = str(tmp_path / "jobs.emb")
+    vectors = unit_rows(2)
+    matrix = EmbeddingMatrixFile.create(path, 8, "bert", dtype="float16", ids=[1, 2], vectors=vectors)
+    assert matrix.dtype == np.dtype(np.float16)
+    np.testing.assert_allclose(matrix.get(1), vectors[0], atol=1e-3)
+    with pytest.raises(ValueError):
+        EmbeddingMatrixFile.create(str(tmp_path / "bad.emb"), 8, "bert", dtype="float64")
+    with pytest.raises(ValueError):
+        matrix.append([3, 4], vectors[:1])
+    with pytest.raises(PermissionError):
+        EmbeddingMatrixFile(path).append([3], vectors[:1])
+
+
+def test_recommender_bulk_load_keeps_other_workers_rows(tmp_path):
+    from reccomendation import JobRecommender
+
+    path = str(tmp_path / "jobs.emb")
+    vectors = unit_rows(3)
+    other_worker = JobRecommender(None, kind="mmap", path=path, model_tag="bert")
+    other_worker.add_vectors([1, 2], vectors[:2])
+    # a worker starting later only has job 3's vector in hand, jobs 1 and 2 stay searchable
+    recommender = JobRecommender(None, kind="mmap", path=path, model_tag="bert")
+    recommender.add_vectors([2, 3], vectors[1:])
+    assert sorted(recommender.index.file.ids.tolist()) == [1, 2, 3]
+    assert recommender.index.search(vectors[0], k=1)[0][0] == 1
+    other_worker.index.refresh()
+    assert 3 in other_worker.index
@@ -0,0 +1,68 @@
+from collections import Counter
+
+import pytest
+
+nltk = pytest.importorskip("nltk")
+
+from job_parser import AdvancedJobDescriptionParser, clean_and_preprocess  # noqa: E402
+
+POSTINGS = [
+    "We are hiring a senior data engineer to build and maintain batch pipelines. You will own Airflow "
+    "deployments, design dbt models and mentor junior engineers on the analytics team.",
+    "Frontend developer wanted: build accessible React interfaces, write tests, review pull requests and "
+    "work closely with designers. Experience with TypeScript and modern tooling is required.",
+    "Our support team is looking for a customer success manager who communicates clearly, resolves "
+    "escalations and builds lasting relationships with enterprise accounts.",
+    "",
+    "Engineers engineering engineered systems; systems engineers engineer engineering systems.",
+]
+
+
+def old_extract_keywords(parser, text):
+    # extract_keywords_nltk before the batched version: one pos_tag call and uncached lemmas per document
+    from nltk.tag import pos_tag
+    from nltk.tokenize import word_tokenize
+    filtered_tokens = [word for word in word_tokenize(text) if word not in parser.stop_words and len(word) > 2]
+    pos_tags = pos_tag(filtered_tokens)
+    nouns = [word for word, pos in pos_tags if pos.startswith('NN')]
+    adjectives = [word for word, pos in pos_tags if pos.startswith('JJ')]
+    verbs = [word for word, pos in pos_tags if pos.startswith('VB')]
+    lemmatized_nouns = [parser.lemmatizer.lemmatize(word) for word in nouns]
+    lemmatized_verbs = [parser.lemmatizer.lemmatize(word, 'v') for word in verbs]
+    return {
+        "nouns": [word for word, _ in Counter(lemmatized_nouns).most_common(10)],
+        "verbs": [word for word, _ in Counter(lemmatized_verbs).most_common(10)],
+        "all keywords": set(lemmatized_nouns + lemmatized_verbs + adjectives),
+    }
+
+
+@pytest.fixture(scope="module")
+def parser():
+    # the hashing backend keeps BERT out of a keyword test
+    try:
+        parser = AdvancedJobDescriptionParser(backend="hashing")
+        parser.extract_keywords_nltk("build data pipelines")
+    except LookupError as e:
+        pytest.skip(f"nltk data not available: {e}")
+    return parser
+
+
+def test_batch_matches_one_document_at_a_time(parser):
+    texts = [clean_and_preprocess(text) for text in POSTINGS]
+    batched = parser.extract_keywords_nltk_many(texts)
+    assert len(batched) == len(texts)
+    for text, keywords in zip(texts, batched):
+        expected = old_extract_keywords(parser, text)
+        assert keywords["nouns"] == expected["nouns"]
+        assert keywords["verbs"] == expected["verbs"]
+        assert set(keywords["all keywords"]) == expected["all keywords"]
+        single = parser.extract_keywords_nltk(text)
+        assert (single["nouns"], single["verbs"]) == (keywords["nouns"], keywords["verbs"])
+
+
+def test_batch_order_does_not_matter(parser):
+    texts = [clean_and_preprocess(text) for text in POSTINGS]
+    forward = parser.extract_keywords_nltk_many(texts)
+    backward = parser.extract_keywords_nltk_many(texts[::-1])[::-1]
+    for a, b in zip(forward, backward):
+        assert (a["nouns"], a["verbs"], set(a["all keywords"])) == (b["nouns"], b["verbs"], set(b["all keywords"]))
@@ -0,0 +1,67 @@
+import numpy as np
+
+from match_scoring import RELATED_SKILL_CREDIT, SKILL_SIMILARITY_THRESHOLD, MatchScorer, cosine_similarity
+
+SKILLS = ["react", "react native", "accounting", "python", "docker", "kubernetes", "excel", "java"]
+
+
+def cls_like_skill_matrix(seed=0, dim=64):
+    # Like BERT CLS vectors of "experience with <skill>": one direction shared by every prompt dominates,
+    # react and react native also share a direction of their own
+    rng = np.random.default_rng(seed)
+    common = rng.normal(size=dim)
+    react = rng.normal(size=dim)
+    rows = []
+    for skill in SKILLS:
+        row = 6 * common + rng.normal(size=dim)
+        if skill.startswith("react"):
+            row += 3 * react
+        rows.append(row / np.linalg.norm(row))
+    return np.array(rows, dtype=np.float32), [("technical", skill) for skill in SKILLS]
+
+
+def skill_result(scorer, required, resume_skills):
+    parsed_job = {"technical_skills": {"technical": list(required)}}
+    parsed_resume = {"skills": list(resume_skills)}
+    return scorer.score(parsed_resume, parsed_job)
+
+
+def test_unrelated_skill_gets_no_credit():
+    matrix, labels = cls_like_skill_matrix()
+    # raw cosine calls any two prompts related, which is what used to hand out credit
+    assert cosine_similarity(matrix[SKILLS.index("react")], matrix[SKILLS.index("accounting")]) > 0.85
+    scorer = MatchScorer(matrix, labels)
+    result = skill_result(scorer, ["accounting"], ["react"])
+    assert result["related_skills"] == []
+    assert result["missing_skills"] == ["accounting"]
+    assert result["scores"]["skills"] == 0.0
+    result = skill_result(scorer, ["react"], ["accounting", "excel"])
+    assert result["related_skills"] == []
+    assert result["scores"]["skills"] == 0.0
+
+
+def test_related_skill_gets_partial_credit():
+    matrix, labels = cls_like_skill_matrix()
+    scorer = MatchScorer(matrix, labels)
+    assert float(scorer.skill_matrix[0] @ scorer.skill_matrix[1]) >= SKILL_SIMILARITY_THRESHOLD
+    result = skill_result(scorer, ["react native"], ["react"])
+    assert result["related_skills"] == ["react native"]
+    assert result["matched_skills"] == [] and result["missing_skills"] == []
+    assert result["scores"]["skills"] == RELATED_SKILL_CREDIT
+
+
+def test_exact_and_inflected_skills_get_full_credit():
+    result = skill_result(MatchScorer(), ["docker", "microservices"], ["docker", "microservice"])
+    assert result["matched_skills"] == ["docker", "microservices"]
+    assert result["scores"]["skills"] == 1.0
+
+
+def test_score_counts_unrelated_skills_as_missing():
+    matrix, labels = cls_like_skill_matrix()
+    scorer = MatchScorer(matrix, labels)
+    parsed_job = {"technical_skills": {"technical": ["python", "accounting"]}}
+    parsed_resume = {"raw_text": "Built services in Python and React", "skills": ["python", "react"]}
+    result = scorer.score(parsed_resume, parsed_job)
+    assert result["matched_skills"] == ["python"]
+    assert result["missing_skills"] == ["accounting"]
+    assert result["scores"]["skills"] == 0.5
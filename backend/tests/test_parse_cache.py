@@ -0,0 +1,113 @@
+import hashlib
+import json
+import sqlite3
+
+from parse_cache import ParseCache, file_sha256, make_key
+
+
+def entry(i, size=100):
+    return {"raw_text": f"{i:04d}" + "x" * (size - 20)}
+
+
+ENTRY_SIZE = len(json.dumps(entry(0)))  # bytes every entry(i) takes on disk
+
+
+def stored_total(path):
+    conn = sqlite3.connect(path)
+    try:
+        total = conn.execute("SELECT total FROM parse_cache_size").fetchone()[0]
+        actual = conn.execute("SELECT COALESCE(SUM(size), 0) FROM parse_cache").fetchone()[0]
+        keys = [row[0] for row in conn.execute("SELECT key FROM parse_cache ORDER BY key")]
+    finally:
+        conn.close()
+    return total, actual, keys
+
+
+def test_memory_hit_returns_a_fresh_copy(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache.db"))
+    cache.put("k", {"skills": ["python"]})
+    hit = cache.get("k")
+    hit["skills"].append("changed")
+    assert cache.get("k") == {"skills": ["python"]}
+    assert cache.get("missing") is None
+    stats = cache.get_stats()
+    assert (stats["memory_hits"], stats["misses"], stats["puts"]) == (2, 1, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = ParseCache(None, max_memory_items=2)
+    cache.put("a", entry(1))
+    cache.put("b", entry(2))
+    cache.get("a")
+    cache.put("c", entry(3))
+    assert cache.get("b") is None
+    assert cache.get("a") == entry(1) and cache.get("c") == entry(3)
+    assert cache.stats["memory_evictions"] == 1
+
+
+def test_disk_tier_is_shared_and_survives_restarts(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ParseCache(path).put("k", entry(1))
+    other = ParseCache(path)
+    assert other.get("k") == entry(1)
+    assert other.stats["disk_hits"] == 1
+    # now in its memory tier
+    assert other.get("k") == entry(1) and other.stats["memory_hits"] == 1
+
+
+def test_disk_tier_evicts_oldest_and_keeps_its_total(tmp_path):
+    path = str(tmp_path / "cache.db")
+    size = ENTRY_SIZE
+    cache = ParseCache(path, max_memory_items=1, max_disk_bytes=5 * size)
+    for i in range(5):
+        cache.put(f"k{i}", entry(i))
+    cache.get("k0")  # k0 is now the most recently used on disk
+    cache.put("k5", entry(5))
+    total, actual, keys = stored_total(path)
+    assert total == actual == 5 * size
+    assert keys == ["k0", "k2", "k3", "k4", "k5"]
+    assert cache.stats["disk_evictions"] == 1
+    # a put bigger than several rows evicts a batch of them
+    cache.put("big", {"raw_text": "y" * (2 * size)})
+    total, actual, keys = stored_total(path)
+    assert total == actual <= 5 * size
+    assert keys == ["big", "k0", "k5"]
+    assert cache.stats["disk_evictions"] == 4
+
+
+def test_total_stays_right_across_processes_replacing_and_invalidating(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = ParseCache(path), ParseCache(path)
+    first.put("a", entry(1, size=100))
+    second.put("b", entry(2, size=300))
+    second.put("a", entry(1, size=200))  # replaces the row first wrote
+    first.invalidate("b")
+    first.invalidate("never stored")
+    total, actual, keys = stored_total(path)
+    assert total == actual and keys == ["a"]
+    assert first.get_stats()["disk_bytes"] == actual
+    assert ParseCache(path).get("b") is None
+    second.clear()
+    assert stored_total(path) == (0, 0, [])
+
+
+def test_size_total_is_built_for_old_cache_files(tmp_path):
+    path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE parse_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                 " created_at REAL NOT NULL, last_access REAL NOT NULL)")
+    conn.execute("INSERT INTO parse_cache VALUES ('old', '{}', 2, 0, 0)")
+    conn.commit()
+    conn.close()
+    cache = ParseCache(path)
+    assert cache.get("old") == {}
+    assert cache.get_stats()["disk_bytes"] == 2
+
+
+def test_file_hash_and_key(tmp_path):
+    path = tmp_path / "resume.pdf"
+    path.write_bytes(b"%PDF-1.4 resume")
+    digest = file_sha256(str(path))
+    assert digest == hashlib.sha256(b"%PDF-1.4 resume").hexdigest()
+    assert make_key(digest, "v2") == f"v2:{digest}"
@@ -0,0 +1,110 @@
+import sqlite3
+import time
+
+from parse_queue import ParseQueue
+
+
+def make_queue(tmp_path, **options):
+    return ParseQueue(str(tmp_path / "parse_queue.db"), **options)
+
+
+def expire_leases(queue):
+    # as if every running job's lease ran out
+    queue._conn.execute("UPDATE parse_jobs SET lease_until = ? WHERE status = 'running'", (time.time() - 1,))
+
+
+def test_claims_oldest_first_and_never_twice(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.enqueue(1, "a.pdf", user_id=7)
+    second = queue.enqueue(2, "b.pdf")
+    # a second pool on the same file, like another worker process
+    other = make_queue(tmp_path)
+    claimed = queue.claim(limit=1, owner="pool-a")
+    assert [job["id"] for job in claimed] == [first]
+    assert claimed[0]["status"] == "running" and claimed[0]["attempts"] == 1 and claimed[0]["user_id"] == 7
+    assert [job["id"] for job in other.claim(limit=5, owner="pool-b")] == [second]
+    assert queue.claim(limit=5, owner="pool-a") == []
+    assert queue.counts() == {"queued": 0, "running": 2, "done": 0, "failed": 0}
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.enqueue(1, "a.pdf")
+    queue.claim(owner="pool-a")
+    expire_leases(queue)
+    claimed = queue.claim(owner="pool-b")
+    assert [job["id"] for job in claimed] == [job_id]
+    assert queue.get(job_id)["attempts"] == 2 and queue.get(job_id)["lease_owner"] == "pool-b"
+
+
+def test_renew_only_extends_leases_the_owner_holds(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=60)
+    job_id = queue.enqueue(1, "a.pdf")
+    queue.claim(owner="pool-a")
+    expire_leases(queue)
+    queue.claim(owner="pool-b")
+    # pool-a lost the job to pool-b, renewing doesn't take it back
+    assert queue.renew([job_id], "pool-a") == 0
+    assert queue.get(job_id)["lease_owner"] == "pool-b"
+    assert queue.renew([job_id], "pool-b") == 1
+    assert queue.get(job_id)["lease_until"] > time.time() + 30
+    assert queue.renew([], "pool-b") == 0
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    job_id = queue.enqueue(1, "a.pdf")
+    for _ in range(2):
+        assert queue.claim(owner="pool")
+        expire_leases(queue)
+    assert queue.claim(owner="pool") == []
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and "2 attempts" in job["error"]
+
+
+def test_retry_and_refunded_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    job_id = queue.enqueue(1, "a.pdf")
+    queue.claim(owner="pool")
+    # a crash of the whole pool isn't the job's fault, it keeps its attempts
+    queue.fail(job_id, "worker pool crashed", retry=True, count_attempt=False)
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["lease_owner"]) == ("queued", 0, None)
+    queue.claim(owner="pool")
+    queue.fail(job_id, "timed out", retry=True)
+    assert queue.get(job_id)["status"] == "queued"
+    queue.claim(owner="pool")
+    queue.fail(job_id, "timed out", retry=True)
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and job["finished_at"] is not None
+
+
+def test_complete_and_permanent_failure(tmp_path):
+    queue = make_queue(tmp_path)
+    done, broken = queue.enqueue(1, "a.pdf"), queue.enqueue(2, "b.pdf")
+    queue.claim(limit=2, owner="pool")
+    queue.complete(done)
+    queue.fail(broken, "not a PDF")
+    assert queue.get(done)["status"] == "done"
+    assert queue.get(broken)["status"] == "failed" and queue.get(broken)["error"] == "not a PDF"
+    assert queue.get("missing") is None
+    assert queue.claim(owner="pool") == []
+
+
+def test_adds_lease_owner_to_old_queue_files(tmp_path):
+    path = tmp_path / "parse_queue.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE parse_jobs ("
+        " id TEXT PRIMARY KEY, resume_id INTEGER NOT NULL, file_path TEXT NOT NULL, user_id INTEGER,"
+        " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, error TEXT,"
+        " created_at REAL NOT NULL, started_at REAL, finished_at REAL, lease_until REAL)"
+    )
+    conn.execute("INSERT INTO parse_jobs (id, resume_id, file_path, status, created_at) VALUES ('old', 1, 'a.pdf', 'queued', 0)")
+    conn.commit()
+    conn.close()
+    queue = ParseQueue(str(path))
+    assert [job["id"] for job in queue.claim(owner="pool")] == ["old"]
+    assert queue.get("old")["lease_owner"] == "pool"
+    # opening it again finds the column already there
+    ParseQueue(str(path))
@@ -0,0 +1,69 @@
+import pdf_engines
+from pdf_engines import MIN_TEXT_FOR_QUALITY_CHECK, assess_text_quality, extract_pdf_text
+
+CLEAN_RESUME = "\n".join([
+    "Jane Doe",
+    "Senior Data Engineer, jane@example.com",
+    "Experience",
+    "Built batch and streaming pipelines in Python and Spark for a retail analytics team",
+    "Owned the Airflow deployment and the dbt models behind the finance dashboards",
+    "Education",
+    "B.S. Computer Science, State University, 2016",
+    "Skills",
+    "Python, SQL, Spark, Airflow, dbt, Snowflake, Docker",
+])
+
+
+def test_clean_text_passes():
+    quality = assess_text_quality(CLEAN_RESUME)
+    assert quality["reasons"] == []
+    assert quality["chars"] == len(CLEAN_RESUME)
+    assert quality["garbled_ratio"] == 0.0
+
+
+def test_short_text_is_not_judged():
+    text = "\ufffd" * (MIN_TEXT_FOR_QUALITY_CHECK - 1)
+    assert assess_text_quality(text)["reasons"] == []
+    assert assess_text_quality("")["reasons"] == []
+
+
+def test_garbled_glyphs():
+    assert assess_text_quality(CLEAN_RESUME + "\n" + "(cid:12)" * 10)["reasons"] == ["garbled_glyphs"]
+    assert assess_text_quality(CLEAN_RESUME.replace("a", "\ufffd"))["reasons"] == ["garbled_glyphs"]
+    assert assess_text_quality(CLEAN_RESUME.replace("e", "\ue001"))["reasons"] == ["garbled_glyphs"]
+    assert assess_text_quality(CLEAN_RESUME.replace(" ", "\x01"))["reasons"] == ["garbled_glyphs"]
+
+
+def test_missing_line_breaks():
+    quality = assess_text_quality(CLEAN_RESUME.replace("\n", " "))
+    assert quality["reasons"] == ["missing_line_breaks"]
+    assert quality["average_line_length"] > 200
+
+
+def test_column_interleaving():
+    left = ["Experience", "Acme Corp", "Data Engineer", "2019 - 2023", "Python, Spark"]
+    right = ["Skills", "Python", "SQL", "Airflow", "Snowflake"]
+    merged = "\n".join(f"{a}        {b}" for a, b in zip(left, right) for _ in range(3))
+    assert assess_text_quality(merged)["reasons"] == ["column_interleaving"]
+    chopped = CLEAN_RESUME + "\n" + "\n".join(["a", "b", "|", "-", "c", "d", "e", "f", "g", "h"])
+    quality = assess_text_quality(chopped)
+    assert quality["reasons"] == ["column_interleaving"] and quality["fragment_line_ratio"] > 0.35
+
+
+def test_auto_escalates_only_when_the_fast_text_looks_broken(monkeypatch):
+    pages = {"pymupdf": [CLEAN_RESUME], "pdfplumber": ["layout text"]}
+    monkeypatch.setattr(pdf_engines, "PARALLEL_PAGE_THRESHOLD", 0)
+    for name in pages:
+        monkeypatch.setitem(pdf_engines._ENGINES, name, lambda path, name=name: pages[name])
+    result = extract_pdf_text("resume.pdf", engine="auto")
+    assert (result.engine, result.escalation_reasons) == ("pymupdf", [])
+    assert [attempt["engine"] for attempt in result.attempts] == ["pymupdf"]
+
+    pages["pymupdf"] = [CLEAN_RESUME.replace("\n", " ")]
+    result = extract_pdf_text("resume.pdf", engine="auto")
+    assert (result.engine, result.text.strip()) == ("pdfplumber", "layout text")
+    assert result.escalation_reasons == ["missing_line_breaks"]
+
+    pages["pymupdf"], pages["pdfplumber"] = [""], [""]
+    result = extract_pdf_text("resume.pdf", engine="auto")
+    assert result.escalation_reasons == ["no_text"] and result.engine == "pymupdf"
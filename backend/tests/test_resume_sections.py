@@ -0,0 +1,136 @@
+import random
+import re
+
+from resume_paser import MAJOR_SECTIONS, SECTION_HEADER_NAMES, SectionIndex
+
+# The section lists the _extract_* methods of ResumeParser look up
+SECTION_QUERIES = [
+    ['experience', 'work history', 'employment'],
+    ['education', 'academic background', 'qualifications', 'academic', 'schooling'],
+    ['skills', 'technical skills', 'competencies'],
+    ['certifications', 'certificates', 'licenses', 'credentials'],
+    ['awards', 'honors', 'achievements', 'recognition', 'accomplishments'],
+    ['projects', 'side projects', 'personal projects', 'key projects', 'notable projects', 'relevant projects',
+     'technical projects', 'project experience', 'portfolio', 'work samples'],
+]
+
+
+def old_extract_section(text, section_names):
+    # ResumeParser._extract_section before SectionIndex, minus its prints
+    lines = text.split('\n')
+    section_start = -1
+    section_end = len(lines)
+    for i, line in enumerate(lines):
+        line_clean = line.strip().lower()
+        if not line_clean:
+            continue
+        for section_name in section_names:
+            section_lower = section_name.lower()
+            exact_patterns = [
+                f"^{re.escape(section_lower)}$",
+                f"^{re.escape(section_lower)}:$",
+                rf"^{re.escape(section_lower)}\s*:?$",
+                rf"^-+\s*{re.escape(section_lower)}\s*-+$",
+                rf"^=+\s*{re.escape(section_lower)}\s*=+$",
+                rf"^\*+\s*{re.escape(section_lower)}\s*\*+$",
+                rf"^#+\s*{re.escape(section_lower)}",
+                rf"^{re.escape(section_lower)}\s*\|\s*",
+            ]
+            if any(re.match(pattern, line_clean) for pattern in exact_patterns):
+                section_start = i
+                break
+            if (line_clean == section_lower or
+                    (section_lower in line_clean and len(line_clean) <= len(section_lower) + 5)):
+                section_start = i
+                break
+        if section_start != -1:
+            break
+    if section_start == -1:
+        return None
+
+    current_section = section_names[0].lower()
+    for i in range(section_start + 1, len(lines)):
+        line_lower = lines[i].strip().lower()
+        if not line_lower:
+            continue
+        for major_section in MAJOR_SECTIONS:
+            if major_section == current_section:
+                continue
+            exact_patterns = [
+                f"^{re.escape(major_section)}$",
+                f"^{re.escape(major_section)}:$",
+                rf"^{re.escape(major_section)}\s*:?$",
+                rf"^-+\s*{re.escape(major_section)}\s*-+$",
+                rf"^=+\s*{re.escape(major_section)}\s*=+$",
+                rf"^\*+\s*{re.escape(major_section)}\s*\*+$",
+                rf"^#+\s*{re.escape(major_section)}",
+            ]
+            if any(re.match(pattern, line_lower) for pattern in exact_patterns):
+                section_end = i
+                break
+            if (line_lower == major_section or
+                    (major_section in line_lower and len(line_lower) <= len(major_section) + 5)):
+                section_end = i
+                break
+        if section_end != len(lines):
+            break
+    return '\n'.join(lines[section_start:section_end])
+
+
+HEADER_FORMS = [
+    "{}", "{}:", "{} :", "--- {} ---", "== {} ==", "*** {} ***", "## {}", "# {} - 2024", "{} | python | java",
+    "{} & tools", "my {}", "  {}  ",
+]
+BODY_LINES = [
+    "Software Engineer at Acme Corp, 2019 - 2023",
+    "Built data pipelines in Python and Spark",
+    "B.S. Computer Science, State University",
+    "Led research on education technology for the awards committee",
+    "AWS Certified Solutions Architect",
+    "Python, Java, SQL, Docker",
+    "Volunteered at the community food bank",
+    "skillset",
+    "",
+    "projects.",
+]
+
+
+def random_resume(rng):
+    lines = []
+    for _ in range(rng.randint(3, 9)):
+        name = rng.choice(SECTION_HEADER_NAMES)
+        name = rng.choice([name, name.upper(), name.title()])
+        lines.append(rng.choice(HEADER_FORMS).format(name))
+        lines.extend(rng.choice(BODY_LINES) for _ in range(rng.randint(0, 4)))
+    return '\n'.join(lines)
+
+
+def test_section_index_matches_the_old_scan():
+    rng = random.Random(7)
+    for _ in range(150):
+        text = random_resume(rng)
+        index = SectionIndex(text)
+        for names in SECTION_QUERIES:
+            assert index.get_text(names) == old_extract_section(text, names), (text, names)
+
+
+def test_section_spans():
+    text = "\n".join([
+        "Jane Doe",
+        "Work Experience",
+        "Engineer at Acme",
+        "Skills:",
+        "Python, Java",
+        "--- Education ---",
+        "State University",
+        "## Projects - 2024",
+        "Resume parser",
+    ])
+    index = SectionIndex(text)
+    assert index.get_text(['experience', 'work history', 'employment']) == "Work Experience\nEngineer at Acme"
+    assert index.find(['education']) == (5, 7)
+    assert index.get_text(['projects']) == "## Projects - 2024\nResume parser"
+    assert index.find(['awards', 'honors']) is None
+    assert [(section['name'], section['start_line'], section['end_line']) for section in index.sections()] == [
+        ('work experience', 1, 3), ('skills', 3, 5), ('education', 5, 7), ('projects', 7, 9),
+    ]
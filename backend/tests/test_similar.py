@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+from similar import (MinHasher, NearDuplicateIndex, SharedNearDuplicateIndex, SignatureStore, _optimal_bands,
+                     estimate_jaccard, shingles)
+
+VOCABULARY = ("python spark airflow dbt snowflake kafka docker kubernetes react java excel tableau pandas numpy "
+              "terraform aws azure linux git jenkins owned built led shipped mentored designed migrated reduced "
+              "pipelines dashboards services teams models warehouse reports latency costs").split()
+
+
+def document(seed, words=200):
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice(VOCABULARY, size=words))
+
+
+def edited(text, every, seed=99):
+    # replaces every `every`-th word
+    rng = np.random.default_rng(seed)
+    words = text.split()
+    for i in range(0, len(words), every):
+        words[i] = f"edit{rng.integers(1_000_000)}"
+    return " ".join(words)
+
+
+def true_jaccard(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7, 0.85, 0.95])
+def test_bands_put_the_s_curve_at_the_threshold(threshold):
+    bands, rows = _optimal_bands(threshold, 128)
+    assert bands * rows <= 128
+    midpoint = (1 / bands) ** (1 / rows)
+    # no other split of 128 permutations gets closer
+    for other_rows in range(1, 129):
+        assert abs(midpoint - threshold) <= abs((1 / (128 // other_rows)) ** (1 / other_rows) - threshold)
+    # the chance a pair at the threshold becomes a candidate is near the middle of the curve
+    assert 0.2 < 1 - (1 - threshold ** rows) ** bands < 0.9
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(num_perm=256)
+    original = document(1)
+    for every in (3, 10, 40):
+        copy = edited(original, every)
+        estimate = estimate_jaccard(hasher.signature(original), hasher.signature(copy))
+        assert estimate == pytest.approx(true_jaccard(original, copy), abs=0.1)
+
+
+def test_signatures_are_deterministic_and_empty_text_has_none():
+    text = document(2)
+    np.testing.assert_array_equal(MinHasher().signature(text), MinHasher().signature(text))
+    assert MinHasher().signature("") is None
+    assert MinHasher().signature(" \n\t ") is None
+
+
+def test_index_finds_near_duplicates_only():
+    index = NearDuplicateIndex(threshold=0.8)
+    original = document(3)
+    index.add(1, original)
+    index.add(2, document(4))
+    index.add(3, "")
+    assert len(index) == 2 and 3 not in index
+    assert [item_id for item_id, _ in index.query(edited(original, 50))] == [1]
+    assert index.query(document(5)) == []
+    assert index.find_duplicate(original, exclude=1) is None
+    index.remove(1)
+    assert index.query(original) == []
+    # re-adding an id replaces its document
+    index.add(2, original)
+    assert index.find_duplicate(original)[0] == 2
+
+
+def test_bad_threshold():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(threshold=0)
+
+
+def test_store_replays_other_processes_changes(tmp_path):
+    path = str(tmp_path / "near_duplicates.db")
+    first = SharedNearDuplicateIndex("job", SignatureStore(path))
+    second = SharedNearDuplicateIndex("job", SignatureStore(path))
+    texts = {item_id: document(10 + item_id) for item_id in range(1, 4)}
+    for item_id, text in texts.items():
+        first.add(item_id, text)
+    first.remove(2)
+    assert second.refresh() == 4
+    assert sorted(second._signatures) == [1, 3]
+    assert second.find_duplicate(texts[1])[0] == 1
+    assert second.refresh() == 0
+    # the signature a process wrote is stored, not recomputed, on the other side
+    np.testing.assert_array_equal(second._signatures[3], first._signatures[3])
+
+
+def test_compaction_keeps_live_documents(tmp_path):
+    path = str(tmp_path / "near_duplicates.db")
+    store = SignatureStore(path)
+    writer = SharedNearDuplicateIndex("job", store)
+    behind = SharedNearDuplicateIndex("job", SignatureStore(path))
+    writer.add(1, document(20))
+    behind.refresh()
+    for _ in range(3):
+        writer.add(2, document(21))
+    writer.add(3, document(22))
+    writer.remove(3)
+    assert not store.needs_compaction("job", min_rows=100)
+    assert store.needs_compaction("job", min_rows=1)
+    assert store.compact("job") == 4
+    assert [item_id for _, item_id, _ in store.changes("job", 0)[1]] == [1, 2]
+    # a process that applied rows from before the compaction reads everything again
+    behind.add(4, document(23))
+    behind.refresh()
+    assert sorted(behind._signatures) == [1, 2, 4]
+    fresh = SharedNearDuplicateIndex("job", SignatureStore(path))
+    fresh.refresh()
+    assert sorted(fresh._signatures) == [1, 2, 4]
+
+
+def test_import_runs_once_per_store(tmp_path):
+    path = str(tmp_path / "near_duplicates.db")
+    store, other = SignatureStore(path), SignatureStore(path)
+    hasher = MinHasher()
+    assert not store.is_imported("resume")
+    assert store.import_documents("resume", [(1, hasher.signature(document(30))), (2, None)])
+    assert not other.import_documents("resume", [(5, hasher.signature(document(31)))])
+    assert other.is_imported("resume") and not other.is_imported("job")
+    assert [item_id for _, item_id, _ in other.changes("resume", 0)[1]] == [1]
@@ -0,0 +1,118 @@
+import random
+import re
+
+from job_parser import SkillMatcher
+
+# The vocabulary of AdvancedJobDescriptionParser, whose constructor needs nltk
+TECHNICAL_SKILLS = {
+    "programming_languages": ["python", "java", "javascript", "typescript", "c++", "c#", "php",
+                              "ruby", "go", "rust", "kotlin", "swift", "scala", "r"],
+    "web_technologies": ["react", "angular", "vue", "nodejs", "express", "django", "flask",
+                         "spring", "laravel", "rails", "html", "css", "sass", "bootstrap"],
+    "databases": ["sql", "mysql", "postgresql", "mongodb", "redis", "elasticsearch",
+                  "oracle", "sqlite", "cassandra", "dynamodb"],
+    "cloud_devops": ["aws", "azure", "gcp", "docker", "kubernetes", "jenkins", "git",
+                     "terraform", "ansible", "chef", "puppet", "ci/cd"],
+    "data_science": ["machine learning", "deep learning", "tensorflow", "pytorch",
+                     "pandas", "numpy", "scikit-learn", "tableau", "power bi"],
+}
+SOFT_SKILLS = ["communication", "leadership", "teamwork", "problem solving",
+               "analytical thinking", "creativity", "time management", "adaptability",
+               "critical thinking", "collaboration", "project management",
+               "decision making", "negotiation", "presentation", "mentoring"]
+# \b can't follow a symbol, the old loop never found these
+SYMBOL_SKILLS = {"c++", "c#"}
+
+
+def old_technical_skills(text):
+    # AdvancedJobDescriptionParser.extract_technical_skills before SkillMatcher
+    found_skills = {}
+    for category, skills in TECHNICAL_SKILLS.items():
+        category_skills = []
+        for skill in skills:
+            patterns = [
+                rf'\b{re.escape(skill)}\b',
+                rf'{re.escape(skill)}\.js',
+                rf'{re.escape(skill)}\s*(programming|development|framework)',
+            ]
+            if any(re.search(pattern, text, re.IGNORECASE) for pattern in patterns):
+                category_skills.append(skill)
+        if category_skills:
+            found_skills[category] = set(category_skills)
+    return found_skills
+
+
+def old_soft_skills(text):
+    found = set()
+    for skill in SOFT_SKILLS:
+        patterns = [
+            rf'\b{re.escape(skill)}\b',
+            rf'excellent\s+{re.escape(skill)}',
+            rf'strong\s+{re.escape(skill)}',
+            rf'{re.escape(skill)}\s+skills?',
+        ]
+        if any(re.search(pattern, text, re.IGNORECASE) for pattern in patterns):
+            found.add(skill)
+    return found
+
+
+def new_skills(matcher, text):
+    technical, soft = {}, set()
+    for mention in matcher.find_all(text):
+        if mention["kind"] == "technical":
+            technical.setdefault(mention["category"], set()).add(mention["skill"])
+        else:
+            soft.add(mention["skill"])
+    return technical, soft
+
+
+FILLER = ("we are hiring a senior engineer with experience in building scalable services , the team ships "
+          "weekly and values ownership ; remote ok ( 5+ years ) . strong excellent skills golang javas rusty "
+          "sqlserver reactive").split()
+
+
+def random_posting(rng):
+    vocabulary = [skill for skills in TECHNICAL_SKILLS.values() for skill in skills if skill not in SYMBOL_SKILLS]
+    vocabulary += SOFT_SKILLS
+    words = []
+    for _ in range(rng.randint(10, 60)):
+        if rng.random() < 0.3:
+            word = rng.choice(vocabulary)
+            word = rng.choice([word, word.upper(), word.title(), word + ",", "(" + word + ")"])
+        else:
+            word = rng.choice(FILLER)
+        words.append(word)
+    return rng.choice([" ", "\n", " / "]).join(words)
+
+
+def test_matches_the_old_per_skill_regex_loop():
+    matcher = SkillMatcher(TECHNICAL_SKILLS, SOFT_SKILLS)
+    rng = random.Random(3)
+    for _ in range(300):
+        text = random_posting(rng)
+        technical, soft = new_skills(matcher, text)
+        assert technical == old_technical_skills(text), text
+        assert soft == old_soft_skills(text), text
+
+
+def test_mentions_report_category_and_span():
+    matcher = SkillMatcher(TECHNICAL_SKILLS, SOFT_SKILLS)
+    text = "JavaScript and React.js, C++ and C#, CI/CD, Problem-Solving, scikit learn"
+    mentions = matcher.find_all(text)
+    found = [(mention["skill"], text[mention["start"]:mention["end"]]) for mention in mentions]
+    assert found == [("javascript", "JavaScript"), ("react", "React"), ("c++", "C++"), ("c#", "C#"),
+                     ("ci/cd", "CI/CD"), ("problem solving", "Problem-Solving"), ("scikit-learn", "scikit learn")]
+    assert mentions[0]["kind"] == "technical" and mentions[0]["category"] == "programming_languages"
+    assert mentions[5]["kind"] == "soft" and mentions[5]["category"] == "soft_skills"
+    # "java" is not found inside "javascript"
+    assert "java" not in {mention["skill"] for mention in mentions}
+
+
+def test_no_skills_inside_other_words():
+    # the old "<skill>\s*programming" and "<skill>\.js" patterns had no leading word boundary,
+    # "engineer programming" and "angular.js" both counted as r
+    matcher = SkillMatcher(TECHNICAL_SKILLS, SOFT_SKILLS)
+    text = "senior engineer programming daily, cargo development"
+    assert old_technical_skills(text) == {"programming_languages": {"r", "go"}}
+    assert matcher.find_all(text) == []
+    assert {mention["skill"] for mention in matcher.find_all("angular.js")} == {"angular"}